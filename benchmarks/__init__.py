@@ -0,0 +1,6 @@
+"""
+Micro benchmarks for tweakio-sdk hot paths.
+
+Run from the repository root, e.g.:
+    PYTHONPATH=src:. python -m benchmarks.bench_bulk_extraction
+"""
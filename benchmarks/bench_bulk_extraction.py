@@ -0,0 +1,115 @@
+"""
+Per-message vs bulk message extraction against a local HTML fixture.
+
+Renders a fake WhatsApp message panel in headless Chromium and times
+MessageProcessor._get_wrapped_Messages in both modes, counting the
+Playwright calls each mode issues.
+
+    PYTHONPATH=src:. python -m benchmarks.bench_bulk_extraction --rows 300
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import time
+
+from playwright.async_api import async_playwright
+
+from src.WhatsApp.DerivedTypes.Chat import whatsapp_chat
+from src.WhatsApp.message_processor import MessageProcessor
+from src.WhatsApp.web_ui_config import WebSelectorConfig
+
+_ROW = (
+    '<div role="row"><div data-id="false_bench@c.us_{i}">'
+    '<div class="{cls}"><span data-testid="selectable-text">message number {i}</span></div>'
+    '</div></div>'
+)
+
+
+def build_fixture(rows: int) -> str:
+    """HTML for a message panel with `rows` alternating in/out messages."""
+    body = "".join(
+        _ROW.format(i=i, cls="message-in" if i % 2 else "message-out")
+        for i in range(rows)
+    )
+    return f'<html><body><div id="main"><div role="application">{body}</div></div></body></html>'
+
+
+class _NoClick:
+    """Chat processor stand-in, the fixture has no chat list to click."""
+
+    async def _click_chat(self, chat) -> bool:
+        return True
+
+
+class _CallCounter:
+    """Counts awaited calls on Locator / ElementHandle as a proxy for IPC round trips."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self._patched = []
+
+    def __enter__(self) -> "_CallCounter":
+        from playwright.async_api import ElementHandle, Locator
+
+        for cls in (Locator, ElementHandle):
+            for name in ("count", "element_handle", "query_selector", "is_visible",
+                         "text_content", "inner_text", "get_attribute", "evaluate_all"):
+                if not hasattr(cls, name):
+                    continue
+                original = getattr(cls, name)
+                self._patched.append((cls, name, original))
+                setattr(cls, name, self._wrap(original))
+        return self
+
+    def _wrap(self, fn):
+        async def wrapper(*args, **kwargs):
+            self.calls += 1
+            return await fn(*args, **kwargs)
+
+        return wrapper
+
+    def __exit__(self, *exc) -> None:
+        for cls, name, original in self._patched:
+            setattr(cls, name, original)
+
+
+async def run(rows: int, repeat: int) -> None:
+    log = logging.getLogger("tweakio.bench")
+    async with async_playwright() as pw:
+        browser = await pw.chromium.launch(headless=True)
+        page = await browser.new_page()
+        await page.set_content(build_fixture(rows))
+
+        ui = WebSelectorConfig(page=page, log=log)
+        chat = whatsapp_chat(chat_name="bench", chat_ui=None)
+
+        for bulk in (False, True):
+            processor = MessageProcessor(
+                storage_obj=None, filter_obj=None, chat_processor=_NoClick(),
+                page=page, log=log, UIConfig=ui, bulk_extraction=bulk
+            )
+            with _CallCounter() as counter:
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    msgs = await processor._get_wrapped_Messages(chat, 1)
+                elapsed = (time.perf_counter() - start) / repeat
+
+            mode = "bulk" if bulk else "per-message"
+            print(f"{mode:>12}: {len(msgs)} msgs | {elapsed * 1000:8.1f} ms/poll "
+                  f"| {counter.calls // repeat} playwright calls/poll")
+
+        await browser.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
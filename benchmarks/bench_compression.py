@@ -0,0 +1,99 @@
+"""
+File size and speed of raw_data stored plain vs zstd + trained dictionary.
+
+Fills two databases with the same chat-like messages. The compressed one trains
+its dictionary on the first tenth, then stores the rest compressed and rewrites
+the training rows. Reports insert rate, full-scan read rate and file size
+after VACUUM.
+
+    PYTHONPATH=src:. python -m benchmarks.bench_compression --messages 50000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import random
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from src.StorageDB.codec import ZstdCodec
+from src.StorageDB.sqlite_db import SQLITE_DB
+
+PHRASES = (
+    "ok see you tomorrow", "can you send me the invoice for", "running late, be there in",
+    "happy birthday!! have a great day", "did you get my last message about", "the meeting is moved to",
+    "thanks a lot, that works for me", "please call me when you are free", "where should we meet for lunch",
+    "i'll check and get back to you on", "the package was delivered at", "good morning everyone",
+)
+
+
+def make_messages(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    chat = SimpleNamespace(chat_name="bench", chat_id="wa::bench")
+    return [
+        SimpleNamespace(
+            message_id=f"wa-msg::{i}",
+            raw_data=f"{rng.choice(PHRASES)} {rng.randint(1, 500)} {rng.choice(PHRASES)}",
+            encrypted_message=None, encryption_nonce=None, data_type="text",
+            direction="in" if i % 2 else "out", parent_chat=chat, system_hit_time=time.time()
+        )
+        for i in range(count)
+    ]
+
+
+async def bench(path: Path, msgs: list, batch_size: int, codec) -> dict:
+    db = SQLITE_DB(queue=asyncio.Queue(), log=logging.getLogger("tweakio.bench"), db_path=str(path),
+                   raw_data_codec=codec)
+    await db.init_db()
+    await db.create_table()
+
+    start = time.perf_counter()
+    head = len(msgs) // 10 if codec is not None else 0
+    for i in range(0, head, batch_size):
+        await db._insert_batch_internally(msgs[i:min(i + batch_size, head)])
+    if codec is not None:
+        await db.train_raw_data_dictionary()
+    for i in range(head, len(msgs), batch_size):
+        await db._insert_batch_internally(msgs[i:i + batch_size])
+    if codec is not None:
+        await db.recompress_raw_data()
+    insert_rate = len(msgs) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    count = 0
+    async for _ in db.iter_messages(row_format="tuple"):
+        count += 1
+    read_rate = count / (time.perf_counter() - start)
+
+    await db._conn.execute("VACUUM")
+    await db.close_db()
+    return {"insert": insert_rate, "read": read_rate, "bytes": path.stat().st_size}
+
+
+async def run(messages: int, batch_size: int) -> None:
+    msgs = make_messages(messages)
+    text_bytes = sum(len(m.raw_data.encode()) for m in msgs)
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = await bench(Path(tmp) / "plain.db", msgs, batch_size, None)
+        zstd = await bench(Path(tmp) / "zstd.db", msgs, batch_size, ZstdCodec())
+
+    print(f"raw_data total: {text_bytes / 1e6:.2f} MB over {messages} messages")
+    for name, r in (("plain", plain), ("zstd+dict", zstd)):
+        print(f"{name:>10}: file {r['bytes'] / 1e6:7.2f} MB  insert {r['insert']:9.0f} msgs/s  read {r['read']:9.0f} rows/s")
+    print("(zstd insert rate includes training the dictionary and rewriting the training rows)")
+    print(f"file size ratio: {zstd['bytes'] / plain['bytes']:.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.messages, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
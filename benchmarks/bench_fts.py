@@ -0,0 +1,69 @@
+"""
+Cost of maintaining the FTS5 index and latency of search().
+
+Inserts the same synthetic messages with full_text_search off and on, then
+times ranked searches against the indexed database.
+
+    PYTHONPATH=src:. python -m benchmarks.bench_fts --messages 20000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_sqlite_profiles import make_messages
+from src.StorageDB.sqlite_db import SQLITE_DB
+
+QUERIES = ("benchmark", "message 42", "nothing-matches-this")
+
+
+async def insert_rate(db: SQLITE_DB, messages: int, batch_size: int, prefix: str) -> float:
+    msgs = make_messages(messages, prefix)
+    start = time.perf_counter()
+    for i in range(0, len(msgs), batch_size):
+        await db._insert_batch_internally(msgs[i:i + batch_size])
+    return messages / (time.perf_counter() - start)
+
+
+async def run(messages: int, batch_size: int, searches: int) -> None:
+    log = logging.getLogger("tweakio.bench")
+    with tempfile.TemporaryDirectory() as tmp:
+        rates = {}
+        for fts in (False, True):
+            db = SQLITE_DB(
+                queue=asyncio.Queue(), log=log, db_path=str(Path(tmp) / f"fts_{fts}.db"),
+                batch_size=batch_size, full_text_search=fts
+            )
+            await db.init_db()
+            await db.create_table()
+            rates[fts] = await insert_rate(db, messages, batch_size, f"fts{int(fts)}")
+
+            if fts:
+                for query in QUERIES:
+                    start = time.perf_counter()
+                    for _ in range(searches):
+                        await db.search(query, limit=20)
+                    per_query = (time.perf_counter() - start) / searches * 1000
+                    print(f"search {query!r:>24}: {per_query:8.3f} ms")
+            await db.close_db()
+
+        overhead = (rates[False] / rates[True] - 1) * 100
+        print(f"insert without fts: {rates[False]:10.0f} msgs/s")
+        print(f"insert with fts:    {rates[True]:10.0f} msgs/s  ({overhead:+.1f}% cost per message)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--searches", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.messages, args.batch_size, args.searches))
+
+
+if __name__ == "__main__":
+    main()
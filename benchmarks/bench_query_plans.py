@@ -0,0 +1,115 @@
+"""
+Query plans and timings of the public SQLITE_DB read queries.
+
+Fills a database with synthetic messages, runs every public read method
+with SQL tracing on, then EXPLAINs each traced statement and fails if a
+filtered query scans the table or sorts through a temp b-tree.
+
+    PYTHONPATH=src:. python -m benchmarks.bench_query_plans --rows 200000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, List, Tuple
+
+from src.StorageDB.sqlite_db import SQLITE_DB
+
+_CHATS = 50
+
+
+async def fill(db: SQLITE_DB, rows: int) -> None:
+    await db._conn.executemany(
+        "INSERT INTO chats (id, chat_id, chat_name) VALUES (?, ?, ?)",
+        [(c + 1, f"wa::chat-{c}", f"chat-{c}") for c in range(_CHATS)]
+    )
+    records = (
+        (f"wa-msg::{i}", f"message {i}", "text", "in" if i % 2 else "out",
+         i % _CHATS + 1, 1_700_000_000.0 + i)
+        for i in range(rows)
+    )
+    await db._conn.executemany(
+        "INSERT INTO messages (message_id, raw_data, data_type, direction, chat_ref, system_hit_time) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        records
+    )
+    await db._conn.commit()
+    await db._conn.execute("ANALYZE")
+
+
+def public_queries(db: SQLITE_DB, rows: int) -> List[Tuple[str, Callable[[], Awaitable]]]:
+    mid = 1_700_000_000.0 + rows // 2
+
+    async def drain_iter():
+        return [r async for r in db.iter_messages(chat_name="chat-7", row_format="tuple")]
+
+    return [
+        ("get_all_messages_async", lambda: db.get_all_messages_async(limit=100)),
+        ("get_messages_by_chat", lambda: db.get_messages_by_chat("chat-7", limit=100)),
+        ("check_message_if_exists_async", lambda: db.check_message_if_exists_async(f"wa-msg::{rows - 1}")),
+        ("filter_new", lambda: db.filter_new([f"wa-msg::{i}" for i in range(0, rows, max(1, rows // 200))])),
+        ("get_messages_page(chat)", lambda: db.get_messages_page(chat_name="chat-7", limit=100)),
+        ("get_messages_page(time)", lambda: db.get_messages_page(since=mid, until=mid + 500, limit=100)),
+        ("iter_messages(chat)", drain_iter),
+        ("get_watermark", lambda: db.get_watermark("wa::chat-7")),
+        ("get_chat_summary", lambda: db.get_chat_summary("wa::chat-7")),
+    ]
+
+
+def plan_ok(statement: str, plan: str) -> bool:
+    """
+    Filtered statements must search an index (or the rowid).
+    A temp b-tree sort is tolerated only on top of an index search, where it is a bounded top-N sort.
+    """
+    if " WHERE " not in statement.upper():
+        return "TEMP B-TREE" not in plan
+    return any(key in plan for key in ("USING INDEX", "USING COVERING INDEX", "PRIMARY KEY", "AUTOINDEX"))
+
+
+async def run(rows: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = SQLITE_DB(
+            queue=asyncio.Queue(), log=logging.getLogger("tweakio.bench"),
+            db_path=str(Path(tmp) / "plans.db"), read_pool_size=0
+        )
+        await db.init_db()
+        await db.create_table()
+        await fill(db, rows)
+
+        traced: List[str] = []
+        await db._conn.set_trace_callback(traced.append)
+        failures = 0
+
+        for name, call in public_queries(db, rows):
+            traced.clear()
+            start = time.perf_counter()
+            await call()
+            elapsed = (time.perf_counter() - start) * 1000
+
+            for statement in [t for t in traced if t.lstrip().upper().startswith("SELECT")]:
+                cursor = await db._conn.execute(f"EXPLAIN QUERY PLAN {statement}")
+                plan = " | ".join(row[3] for row in await cursor.fetchall())
+                ok = plan_ok(statement, plan)
+                failures += not ok
+                print(f"{'OK ' if ok else 'BAD'} {name:<32} {elapsed:8.2f} ms  {plan}")
+
+        await db._conn.set_trace_callback(None)
+        await db.close_db()
+
+    if failures:
+        raise SystemExit(f"{failures} queries do not use an index")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows))
+
+
+if __name__ == "__main__":
+    main()
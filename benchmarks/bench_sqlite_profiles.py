@@ -0,0 +1,68 @@
+"""
+Insert rate of SQLITE_DB per PRAGMA profile.
+
+Pushes synthetic messages through _insert_batch_internally in writer-sized
+batches against a fresh database file for every profile.
+
+    PYTHONPATH=src:. python -m benchmarks.bench_sqlite_profiles --messages 20000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from src.StorageDB.sqlite_db import PRAGMA_PROFILES, SQLITE_DB
+
+
+def make_messages(count: int, prefix: str) -> list:
+    chat = SimpleNamespace(chat_name="bench", chat_id="wa::bench")
+    return [
+        SimpleNamespace(
+            message_id=f"wa-msg::{prefix}-{i}", raw_data=f"benchmark message {i}",
+            encrypted_message=None, encryption_nonce=None, data_type="text",
+            direction="in" if i % 2 else "out", parent_chat=chat, system_hit_time=time.time()
+        )
+        for i in range(count)
+    ]
+
+
+async def bench_profile(profile: str, messages: int, batch_size: int, workdir: Path) -> float:
+    db = SQLITE_DB(
+        queue=asyncio.Queue(), log=logging.getLogger("tweakio.bench"),
+        db_path=str(workdir / f"{profile}.db"), batch_size=batch_size, profile=profile
+    )
+    await db.init_db()
+    await db.create_table()
+    msgs = make_messages(messages, profile)
+
+    start = time.perf_counter()
+    for i in range(0, len(msgs), batch_size):
+        await db._insert_batch_internally(msgs[i:i + batch_size])
+    elapsed = time.perf_counter() - start
+
+    await db.close_db()
+    return messages / elapsed
+
+
+async def run(messages: int, batch_size: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in PRAGMA_PROFILES:
+            rate = await bench_profile(profile, messages, batch_size, Path(tmp))
+            print(f"{profile:>10}: {rate:10.0f} msgs/s  (batch={batch_size})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.messages, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
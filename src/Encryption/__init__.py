@@ -20,14 +20,20 @@ Usage:
     # Decrypt message
     decryptor = MessageDecryptor(key)
     plaintext = decryptor.decrypt_message(nonce, ciphertext)
+
+    # Keyword tokens for searching encrypted rows
+    indexer = BlindIndexer(key)
+    tokens = indexer.message_tokens("Hello, World!")
 """
 
 from src.Encryption.encryptor import MessageEncryptor
 from src.Encryption.decryptor import MessageDecryptor
 from src.Encryption.key_manager import KeyManager
+from src.Encryption.blind_index import BlindIndexer
 
 __all__ = [
     "MessageEncryptor",
     "MessageDecryptor",
     "KeyManager",
+    "BlindIndexer",
 ]
@@ -0,0 +1,95 @@
+"""
+Blind index tokens for searching encrypted messages.
+
+Words of a message are normalised and hashed with a keyed HMAC, so storage can
+match keywords (and whole-message equality) with indexed lookups while only
+ever seeing opaque tokens. Only rows whose tokens match need to be decrypted.
+
+Security properties:
+- The HMAC key is derived from the encryption key, never the key itself
+- Tokens are deterministic, so equal words leak equality (frequency) but not content
+- Tokens are truncated, a rare collision only costs one extra decryption
+"""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import re
+import unicodedata
+from typing import List, Optional, Set
+
+from src.Encryption.key_manager import KeyManager
+
+
+class BlindIndexer:
+    """
+    Produces keyed HMAC-SHA256 tokens for message words and whole messages.
+
+    Args:
+        key: 32-byte encryption key the index key is derived from
+        key_manager: KeyManager used for the derivation
+        token_bytes: Length of the stored tokens
+        min_word_length: Shorter words are not indexed
+        max_words: Max distinct words indexed per message
+    """
+
+    PURPOSE = "blind-index-v1"
+    _WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+    def __init__(
+        self,
+        key: bytes,
+        key_manager: Optional[KeyManager] = None,
+        token_bytes: int = 16,
+        min_word_length: int = 2,
+        max_words: int = 256
+    ) -> None:
+        if len(key) != 32:
+            raise ValueError(f"Key must be 32 bytes (256 bits), got {len(key)} bytes")
+
+        if not 8 <= token_bytes <= 32:
+            raise ValueError("token_bytes must be between 8 and 32")
+
+        self._index_key = (key_manager or KeyManager()).derive_subkey(key, self.PURPOSE)
+        self.token_bytes = token_bytes
+        self.min_word_length = min_word_length
+        self.max_words = max_words
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """NFKC + casefold + collapsed whitespace."""
+        return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+    def words(self, text: str) -> List[str]:
+        """Distinct normalised words of a text, in order of appearance."""
+        seen: Set[str] = set()
+        result: List[str] = []
+        for word in self._WORD_RE.findall(self.normalize(text)):
+            if len(word) >= self.min_word_length and word not in seen:
+                seen.add(word)
+                result.append(word)
+                if len(result) >= self.max_words:
+                    break
+        return result
+
+    def _token(self, kind: bytes, value: str) -> bytes:
+        digest = hmac.new(self._index_key, kind + b"\x00" + value.encode("utf-8"), hashlib.sha256).digest()
+        return digest[:self.token_bytes]
+
+    def word_token(self, word: str) -> bytes:
+        """Token of a single (already normalised) word."""
+        return self._token(b"w", word)
+
+    def exact_token(self, text: str) -> bytes:
+        """Token of the whole normalised message, for equality lookups."""
+        return self._token(b"e", self.normalize(text))
+
+    def message_tokens(self, text: str) -> List[bytes]:
+        """Every token stored for a message: its exact token followed by its word tokens."""
+        if not text:
+            return []
+        return [self.exact_token(text)] + [self.word_token(w) for w in self.words(text)]
+
+    def query_tokens(self, query: str) -> List[bytes]:
+        """Word tokens a message must all contain to match a keyword query."""
+        return [self.word_token(w) for w in self.words(query)]
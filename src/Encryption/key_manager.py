@@ -10,7 +10,9 @@ from pathlib import Path
 from typing import Optional
 
 from cryptography.exceptions import InvalidKey
+from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.argon2 import Argon2id
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 
 
 class KeyManager:
@@ -92,6 +94,44 @@ class KeyManager:
 
         return kdf.derive(password)
 
+    def derive_subkey(
+        self,
+        key: bytes,
+        purpose: str | bytes,
+        length: Optional[int] = None
+    ) -> bytes:
+        """
+        Derive an independent purpose-bound key from a master key using HKDF-SHA256.
+
+        Args:
+            key: Master key (e.g. the message encryption key)
+            purpose: Context label separating the derived key from other uses
+            length: Derived key length in bytes (defaults to key_length)
+
+        Returns:
+            Derived subkey
+
+        Raises:
+            ValueError: If key or purpose is empty
+        """
+        if isinstance(purpose, str):
+            purpose = purpose.encode('utf-8')
+
+        if not key:
+            raise ValueError("Key cannot be empty")
+
+        if not purpose:
+            raise ValueError("Purpose cannot be empty")
+
+        hkdf = HKDF(
+            algorithm=hashes.SHA256(),
+            length=length or self.key_length,
+            salt=None,
+            info=b"tweakio:" + purpose,
+        )
+
+        return hkdf.derive(key)
+
     def verify_key(
         self,
         password: str | bytes,
@@ -4,7 +4,7 @@ from __future__ import annotations
 import asyncio
 import logging
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import Iterable, List, Dict, Any, Optional, Set, Tuple
 
 from src.Interfaces.message_interface import MessageInterface
 
@@ -14,7 +14,9 @@ class StorageInterface(ABC):
     Abstract base class for storage implementations.
     
     All storage backends (SQLite, PostgreSQL, MongoDB, etc.) must implement
-    this interface to ensure consistent behavior across the SDK.
+    this interface to ensure consistent behavior across the SDK. The abstract
+    methods are required; filter_new, watermarks and backfill checkpoints have
+    working defaults that backends override when they can do better.
     """
 
     def __init__(self, queue: asyncio.Queue, log: logging.Logger, **kwargs) -> None:
@@ -45,12 +47,15 @@ class StorageInterface(ABC):
         ...
 
     @abstractmethod
-    async def enqueue_insert(self, msgs: List[MessageInterface], **kwargs) -> None:
+    async def enqueue_insert(self, msgs: List[MessageInterface], wait: bool = False, **kwargs) -> None:
         """
         Add messages to queue for batch insertion.
         
         Args:
             msgs: List of messages to insert
+            wait: Return only once the messages are committed (raises StorageError if their
+                batch fails), e.g. before moving a watermark or checkpoint past them.
+                Backends without a queue should simply store the messages before returning
         """
         ...
 
@@ -77,6 +82,20 @@ class StorageInterface(ABC):
         """
         ...
 
+    async def filter_new(self, msg_ids: Iterable[str], **kwargs) -> Set[str]:
+        """
+        Bulk existence check.
+        Falls back to one check_message_if_exists call per id, backends should override it
+        with a single query.
+
+        Args:
+            msg_ids: Message identifiers to check
+
+        Returns:
+            The subset of msg_ids not yet stored
+        """
+        return {msg_id for msg_id in msg_ids if not self.check_message_if_exists(msg_id)}
+
     @abstractmethod
     def get_all_messages(self, **kwargs) -> List[Dict[str, Any]]:
         """
@@ -90,6 +109,64 @@ class StorageInterface(ABC):
         """
         ...
 
+    async def get_watermark(self, chat_id: str, **kwargs) -> Optional[Tuple[str, int]]:
+        """
+        Get the high-water mark of a chat.
+        Backends that do not persist watermarks keep this default, every fetch is then a full one.
+
+        Args:
+            chat_id: Chat identifier
+
+        Returns:
+            (last processed message data-id, its DOM position) or None if the chat was never processed
+        """
+        return None
+
+    async def set_watermark(self, chat_id: str, data_id: str, position: int, **kwargs) -> None:
+        """
+        Persist the high-water mark of a chat, a no-op unless the backend overrides it.
+
+        Args:
+            chat_id: Chat identifier
+            data_id: Data-id of the newest processed message
+            position: DOM position that message was rendered at
+        """
+        return None
+
+    async def get_backfill_checkpoint(self, chat_id: str, **kwargs) -> Optional[Dict[str, Any]]:
+        """
+        Get the history backfill progress of a chat.
+        Backends that do not persist checkpoints keep this default, every backfill then starts over.
+
+        Args:
+            chat_id: Chat identifier
+
+        Returns:
+            Dict with oldest_data_id, collected, complete, updated_at or None if never backfilled
+        """
+        return None
+
+    async def set_backfill_checkpoint(
+            self,
+            chat_id: str,
+            oldest_data_id: Optional[str],
+            collected: int,
+            complete: bool = False,
+            **kwargs
+    ) -> None:
+        """
+        Persist the history backfill progress of a chat.
+
+        Args:
+            chat_id: Chat identifier
+            oldest_data_id: Data-id of the oldest message reached so far
+            collected: Messages stored by the backfill so far
+            complete: True once the start of the chat history was reached
+
+        A no-op unless the backend overrides it.
+        """
+        return None
+
     @abstractmethod
     async def close_db(self, **kwargs) -> None:
         """Close database connection and cleanup resources."""
@@ -4,6 +4,15 @@ Persistent storage backends for tweakio.
 Handles message caching, session persistence, and local data storage
 using SQLite and other lightweight database solutions.
 """
+from .batch_controller import AdaptiveBatchController
+from .commit_feed import CommitEvent, Subscription
+from .partitioned_db import PartitionedSQLiteDB
+from .records import StoredMessage
+from .retention import RetentionPolicy
+from .seen_index import SeenIndex
 from .sqlite_db import SQLITE_DB
 
-__all__ = ['SQLITE_DB']
+__all__ = [
+    'SQLITE_DB', 'PartitionedSQLiteDB', 'SeenIndex', 'StoredMessage', 'AdaptiveBatchController',
+    'CommitEvent', 'Subscription', 'RetentionPolicy'
+]
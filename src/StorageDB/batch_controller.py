@@ -0,0 +1,123 @@
+"""
+Adaptive batch size / flush interval for the SQLite writer.
+
+The writer reports every commit (rows, commit time, how long the oldest row
+waited since enqueue, queue depth). The controller steers toward a target
+end-to-end persistence latency:
+
+- backlog and cheap commits   -> larger batches (fewer fsyncs per row)
+- commits eating the budget   -> smaller batches
+- idle queue                  -> slowly back toward the minimum batch
+- flush interval              -> whatever is left of the target after a p99 commit
+"""
+from __future__ import annotations
+
+import math
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+def _percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+class AdaptiveBatchController:
+    """
+    AIMD-style controller for the writer's batch size and flush interval.
+
+    Args:
+        target_latency: Target p99 seconds from enqueue_insert to commit
+        min_batch: Smallest batch size
+        max_batch: Largest batch size
+        min_interval: Shortest flush interval (seconds)
+        max_interval: Longest flush interval (seconds)
+        window: Number of recent commits the percentiles are computed over
+    """
+
+    def __init__(
+            self,
+            target_latency: float = 1.0,
+            min_batch: int = 10,
+            max_batch: int = 2000,
+            min_interval: float = 0.01,
+            max_interval: float = 2.0,
+            window: int = 100
+    ) -> None:
+        if target_latency <= 0:
+            raise ValueError("target_latency must be positive")
+        if not 0 < min_batch <= max_batch:
+            raise ValueError("expected 0 < min_batch <= max_batch")
+        if not 0 < min_interval <= max_interval:
+            raise ValueError("expected 0 < min_interval <= max_interval")
+
+        self.target_latency = target_latency
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+        self.batch_size = min_batch
+        self.flush_interval = min(max_interval, max(min_interval, target_latency / 2))
+        self.last_decision = "init"
+
+        self._commit_times: Deque[float] = deque(maxlen=window)
+        self._persist_times: Deque[float] = deque(maxlen=window)
+        self.commits = 0
+        self.rows = 0
+
+    def record_commit(
+            self,
+            rows: int,
+            commit_seconds: float,
+            persist_seconds: Optional[float],
+            queue_depth: int
+    ) -> None:
+        """
+        Feed one commit and update batch_size / flush_interval.
+
+        Args:
+            rows: Rows in the committed batch
+            commit_seconds: Time spent in the insert + commit
+            persist_seconds: Enqueue-to-commit time of the oldest row of the batch
+            queue_depth: Messages still waiting after this commit
+        """
+        self.commits += 1
+        self.rows += rows
+        self._commit_times.append(commit_seconds)
+        if persist_seconds is not None:
+            self._persist_times.append(persist_seconds)
+
+        commit_p99 = _percentile(self._commit_times, 0.99)
+        budget = self.target_latency
+
+        if commit_seconds > budget / 2 and self.batch_size > self.min_batch:
+            self.batch_size = max(self.min_batch, self.batch_size // 2)
+            self.last_decision = "shrink"
+        elif queue_depth >= self.batch_size and commit_seconds < budget / 4:
+            self.batch_size = min(self.max_batch, self.batch_size * 2)
+            self.last_decision = "grow"
+        elif queue_depth == 0 and self.batch_size > self.min_batch:
+            self.batch_size = max(self.min_batch, self.batch_size - max(1, self.batch_size // 10))
+            self.last_decision = "decay"
+        else:
+            self.last_decision = "hold"
+
+        self.flush_interval = min(self.max_interval, max(self.min_interval, budget - commit_p99))
+
+    def stats(self) -> Dict[str, object]:
+        """Current decisions and latency percentiles."""
+        return {
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "last_decision": self.last_decision,
+            "target_latency": self.target_latency,
+            "commit_p50": _percentile(self._commit_times, 0.50),
+            "commit_p99": _percentile(self._commit_times, 0.99),
+            "persist_p50": _percentile(self._persist_times, 0.50),
+            "persist_p99": _percentile(self._persist_times, 0.99),
+            "commits": self.commits,
+            "rows": self.rows,
+        }
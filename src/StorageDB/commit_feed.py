@@ -0,0 +1,153 @@
+"""
+In-process publication of committed message batches.
+
+The writer publishes every committed batch once, each subscriber gets it
+through its own bounded buffer, so a slow consumer only ever loses its own
+oldest events (reported as lag) and never holds up the writer.
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, List, Optional, Union
+
+from src.StorageDB.records import StoredMessage
+
+
+@dataclass(slots=True)
+class CommitEvent:
+    """One committed batch, `seq` increases by one per commit."""
+    seq: int
+    committed_at: float
+    messages: List[StoredMessage]
+
+
+CommitCallback = Callable[[CommitEvent], Union[None, Awaitable[None]]]
+
+
+class Subscription:
+    """
+    Bounded buffer of CommitEvents, consumed with `async for`.
+
+    When full, the oldest buffered event is dropped and counted in `dropped`.
+    """
+
+    def __init__(self, feed: "CommitFeed", maxsize: int = 1000) -> None:
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self._feed = feed
+        self.maxsize = maxsize
+        self._buffer: Deque[CommitEvent] = deque()
+        self._ready = asyncio.Event()
+        self.closed = False
+        self.dropped = 0
+        self.delivered = 0
+        self.last_seq = feed.seq
+        self._task: Optional[asyncio.Task] = None
+
+    def _push(self, event: CommitEvent) -> None:
+        if len(self._buffer) >= self.maxsize:
+            self._buffer.popleft()
+            self.dropped += 1
+        self._buffer.append(event)
+        self._ready.set()
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> CommitEvent:
+        while not self._buffer:
+            if self.closed:
+                raise StopAsyncIteration
+            self._ready.clear()
+            await self._ready.wait()
+
+        event = self._buffer.popleft()
+        self.delivered += 1
+        self.last_seq = event.seq
+        return event
+
+    @property
+    def lag(self) -> int:
+        """Commits published but not yet consumed by this subscriber (dropped ones included)."""
+        return self._feed.seq - self.last_seq
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._buffer),
+            "maxsize": self.maxsize,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "last_seq": self.last_seq,
+            "lag": self.lag,
+        }
+
+    def close(self) -> None:
+        """Stop receiving events, buffered ones can still be consumed."""
+        if self.closed:
+            return
+        self.closed = True
+        self._ready.set()
+        self._feed._remove(self)
+
+
+class CommitFeed:
+    """Fan-out of CommitEvents to subscriptions."""
+
+    def __init__(self, log=None) -> None:
+        self.log = log
+        self.seq = 0
+        self._subscriptions: List[Subscription] = []
+
+    def __bool__(self) -> bool:
+        return bool(self._subscriptions)
+
+    def subscribe(self, maxsize: int = 1000, callback: Optional[CommitCallback] = None) -> Subscription:
+        """
+        Register a subscriber.
+
+        Args:
+            maxsize: Events buffered before the oldest are dropped
+            callback: Called (or awaited) with every event from a dedicated task instead of iterating
+
+        Returns:
+            The subscription, iterate it or close() it
+        """
+        sub = Subscription(self, maxsize=maxsize)
+        self._subscriptions.append(sub)
+        if callback is not None:
+            sub._task = asyncio.create_task(self._run_callback(sub, callback))
+        return sub
+
+    async def _run_callback(self, sub: Subscription, callback: CommitCallback) -> None:
+        async for event in sub:
+            try:
+                result = callback(event)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                if self.log is not None:
+                    self.log.error(f"Commit subscriber callback failed: {e}", exc_info=True)
+
+    def publish(self, messages: List[StoredMessage]) -> CommitEvent:
+        """Hand a committed batch to every subscription."""
+        self.seq += 1
+        event = CommitEvent(seq=self.seq, committed_at=time.time(), messages=messages)
+        for sub in self._subscriptions:
+            sub._push(event)
+        return event
+
+    def _remove(self, sub: Subscription) -> None:
+        if sub in self._subscriptions:
+            self._subscriptions.remove(sub)
+
+    def close(self) -> None:
+        """Close every subscription, iterators end after draining their buffers."""
+        for sub in list(self._subscriptions):
+            sub.close()
+
+    def stats(self) -> List[dict]:
+        return [sub.stats() for sub in self._subscriptions]
@@ -0,0 +1,809 @@
+"""
+Time-partitioned variant of SQLITE_DB.
+
+Messages are written to one SQLite file per month (or per N rows) next to a
+small router database. The router keeps everything that must stay global:
+
+- message_index: every stored message_id with its global row id (dedup, existence checks)
+- partitions: catalog with the id and system_hit_time range of each partition
+- chats / chat_watermarks / chat_backfill: same tables as SQLITE_DB
+
+Partitions follow ingest order: a row goes to the partition that is current when
+it is committed, so id ranges never overlap and reads simply walk the partitions
+newest (or oldest) first, skipping those whose time range cannot match. The
+writer ATTACHes the current partition and commits router and partition rows of a
+batch with one COMMIT; readers ATTACH partitions read-only on demand, keeping at
+most `max_attached` per connection.
+
+That COMMIT is only atomic across the files with a rollback journal (the "durable"
+profile). In WAL mode SQLite commits each file atomically but not the files together,
+so a crash can leave a batch in the router without its partition rows or the other way
+round. create_table reconciles the partition written last against the router before
+anything else is written: the router wins, ids it holds without partition rows are
+forgotten (those messages count as new again) and partition rows it does not know are
+deleted.
+
+A finished partition is a standalone SQLite file (chat_ref points into the router's
+chats table) that can be archived, compressed or deleted with drop_partition.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Set, Tuple, Union
+
+from src.Exceptions.base import StorageError
+from src.StorageDB.records import STORED_MESSAGE_COLUMNS, StoredMessage
+from src.StorageDB.sqlite_db import PRAGMA_PROFILES, SQLITE_DB, _MESSAGE_COLUMNS
+
+# SQLite refuses more than 10 attached databases unless compiled otherwise.
+_MAX_ATTACHED = 9
+
+_ROUTER_SCHEMA: Tuple[str, ...] = (
+    """
+    CREATE TABLE IF NOT EXISTS chats (
+        id INTEGER PRIMARY KEY,
+        chat_id TEXT UNIQUE NOT NULL,
+        chat_name TEXT,
+        message_count INTEGER NOT NULL DEFAULT 0,
+        first_seen REAL,
+        last_seen REAL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_chats_name ON chats(chat_name)",
+    """
+    CREATE TABLE IF NOT EXISTS chat_watermarks (
+        chat_id TEXT PRIMARY KEY,
+        last_data_id TEXT NOT NULL,
+        dom_position INTEGER,
+        updated_at REAL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS chat_backfill (
+        chat_id TEXT PRIMARY KEY,
+        oldest_data_id TEXT,
+        collected INTEGER NOT NULL DEFAULT 0,
+        complete INTEGER NOT NULL DEFAULT 0,
+        updated_at REAL
+    )
+    """,
+    # Global ids: allocated here, reused as the partition row id.
+    """
+    CREATE TABLE IF NOT EXISTS message_index (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        message_id TEXT UNIQUE NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS partitions (
+        name TEXT PRIMARY KEY,
+        row_count INTEGER NOT NULL DEFAULT 0,
+        min_id INTEGER,
+        max_id INTEGER,
+        min_time REAL,
+        max_time REAL,
+        created_at REAL
+    )
+    """,
+)
+
+# Created in every partition file, {schema} is its ATTACH alias.
+_PARTITION_SCHEMA: Tuple[str, ...] = (
+    """
+    CREATE TABLE IF NOT EXISTS {schema}.messages (
+        id INTEGER PRIMARY KEY,
+        message_id TEXT NOT NULL,
+        raw_data TEXT,
+        encrypted_message BLOB,
+        encryption_nonce BLOB,
+        data_type TEXT,
+        direction TEXT,
+        chat_ref INTEGER,
+        system_hit_time REAL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_messages_chat_ref_id ON messages(chat_ref, id)",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_messages_hit_time ON messages(system_hit_time)",
+)
+
+
+def _schema(name: str) -> str:
+    return f"p_{name}"
+
+
+class PartitionedSQLiteDB(SQLITE_DB):
+    """
+    SQLITE_DB storing messages in per-month or per-N-rows partition files.
+
+    Queue, writer, overflow policies, spool, chat summaries, watermarks and commit
+    subscriptions behave as in SQLITE_DB. Full-text search, the blind index and
+    raw_data compression are not available in partitioned mode, retention is
+    limited to max_age.
+    """
+
+    _ID_TABLE = "message_index"
+
+    def __init__(
+            self,
+            queue: asyncio.Queue,
+            log: logging.Logger,
+            db_path: str = "messages.db",
+            partition_by: Literal["month", "rows"] = "month",
+            rows_per_partition: int = 1_000_000,
+            max_attached: int = 8,
+            **kwargs
+    ) -> None:
+        """
+        Args:
+            queue / log / db_path: As SQLITE_DB, db_path is the router database,
+                partitions are written next to it as <stem>.<partition><suffix>
+            partition_by: "month" (UTC month of the commit) or "rows"
+            rows_per_partition: Rows after which partition_by="rows" starts a new partition
+                (checked per batch, so a partition may exceed it by one batch)
+            max_attached: Partitions kept attached per connection, least recently used are detached
+            **kwargs: Any other SQLITE_DB option
+
+        Raises:
+            ValueError: For an in-memory db_path, unknown partition_by, out of range limits,
+                or options partitioned mode does not support
+        """
+        if str(db_path) == ":memory:":
+            raise ValueError("Partitioned storage needs a database file")
+        if partition_by not in ("month", "rows"):
+            raise ValueError(f"Unknown partition_by '{partition_by}', expected 'month' or 'rows'")
+        if rows_per_partition <= 0:
+            raise ValueError("rows_per_partition must be positive")
+        if not 0 < max_attached <= _MAX_ATTACHED:
+            raise ValueError(f"max_attached must be between 1 and {_MAX_ATTACHED}")
+        for option in ("full_text_search", "blind_indexer", "raw_data_codec"):
+            if kwargs.get(option):
+                raise ValueError(f"{option} is not supported by partitioned storage")
+        retention = kwargs.get("retention")
+        if retention is not None and (retention.max_rows_per_chat is not None or retention.max_bytes is not None):
+            raise ValueError("Partitioned storage only supports max_age retention (whole partitions are dropped)")
+        super().__init__(queue=queue, log=log, db_path=db_path, **kwargs)
+
+        self.partition_by = partition_by
+        self.rows_per_partition = rows_per_partition
+        self.max_attached = max_attached
+        self._current: Optional[str] = None
+        self._current_rows = 0
+        # id(connection) -> attached partition names, least recently used first
+        self._attached: Dict[int, OrderedDict[str, None]] = {}
+        self._dropped: Set[str] = set()
+
+    def _partition_path(self, name: str) -> Path:
+        return self.db_path.with_name(f"{self.db_path.stem}.{name}{self.db_path.suffix}")
+
+    async def create_table(self, **kwargs) -> None:
+        """Create the router tables and load the partition catalog."""
+        if not self._conn:
+            raise StorageError("Database not initialized. Call init_db() first.")
+
+        try:
+            for statement in _ROUTER_SCHEMA:
+                await self._conn.execute(statement)
+            await self._conn.commit()
+            await self._load_current_partition()
+            await self._reconcile_current_partition()
+            self.log.info(f"Partition catalog created/verified, current partition: {self._current}.")
+        except Exception as e:
+            raise StorageError(f"Failed to create table: {e}") from e
+
+        await self._replay_spool()
+
+    async def _load_current_partition(self) -> None:
+        cursor = await self._conn.execute("SELECT name, row_count FROM partitions ORDER BY rowid DESC LIMIT 1")
+        row = await cursor.fetchone()
+        self._current, self._current_rows = (row[0], row[1]) if row else (None, 0)
+
+    async def _reconcile_current_partition(self) -> None:
+        """
+        Repair a batch a crash committed to only one of router and current partition (WAL only,
+        see the module docstring). Only the partition written last can be affected.
+        """
+        if self._current is None:
+            return
+
+        async with self._txn_lock:
+            schema = await self._attach(self._conn, self._current)
+            for statement in _PARTITION_SCHEMA:  # the file may not have survived at all
+                await self._conn.execute(statement.format(schema=schema))
+
+            # Partition rows of a batch the router lost: ids past the router's last one
+            cursor = await self._conn.execute(
+                f"DELETE FROM {schema}.messages WHERE id > (SELECT COALESCE(MAX(id), 0) FROM main.message_index)"
+            )
+            unknown_rows = cursor.rowcount
+
+            # Router ids of a batch the partition lost: past the partition's last row
+            cursor = await self._conn.execute(
+                f"""
+                SELECT COALESCE((SELECT MAX(id) FROM {schema}.messages), min_id - 1)
+                FROM partitions WHERE name = ?
+                """,
+                (self._current,)
+            )
+            row = await cursor.fetchone()
+            lost: List[str] = []
+            if row is not None and row[0] is not None:
+                cursor = await self._conn.execute("SELECT message_id FROM message_index WHERE id > ?", (row[0],))
+                lost = [r[0] for r in await cursor.fetchall()]
+                await self._conn.execute("DELETE FROM message_index WHERE id > ?", (row[0],))
+
+            if not unknown_rows and not lost:
+                return
+
+            await self._conn.execute(
+                f"""
+                UPDATE partitions SET
+                    (row_count, min_id, max_id, min_time, max_time) = (
+                        SELECT COUNT(*), MIN(id), MAX(id), MIN(system_hit_time), MAX(system_hit_time)
+                        FROM {schema}.messages
+                    )
+                WHERE name = ?
+                """,
+                (self._current,)
+            )
+            if lost:
+                await self._recount_chats()
+            await self._conn.commit()
+            await self._load_current_partition()
+
+        if self.seen_index is not None and lost:
+            self.seen_index.discard_many(lost)
+        self.log.warning(
+            f"Reconciled partition {self._current} after an interrupted commit: "
+            f"{unknown_rows} unindexed rows deleted, {len(lost)} lost message ids forgotten."
+        )
+
+    async def _recount_chats(self) -> None:
+        """
+        Recompute the chat summaries (message_count, first_seen, last_seen) from the partitions
+        still present, dropped ones are not counted, as in drop_partition.
+        """
+        cursor = await self._conn.execute("SELECT name FROM partitions WHERE row_count > 0")
+        summaries: Dict[int, List[float]] = {}
+        for (name,) in await cursor.fetchall():
+            schema = await self._attach(self._conn, name)
+            cursor = await self._conn.execute(
+                f"""
+                SELECT chat_ref, COUNT(*), MIN(system_hit_time), MAX(system_hit_time)
+                FROM {schema}.messages GROUP BY chat_ref
+                """
+            )
+            for ref, count, first, last in await cursor.fetchall():
+                summary = summaries.get(ref)
+                if summary is None:
+                    summaries[ref] = [count, first, last]
+                else:
+                    summary[0] += count
+                    summary[1] = min(summary[1], first)
+                    summary[2] = max(summary[2], last)
+        await self._conn.execute("UPDATE chats SET message_count = 0, first_seen = NULL, last_seen = NULL")
+        await self._conn.executemany(
+            "UPDATE chats SET message_count = ?, first_seen = ?, last_seen = ? WHERE id = ?",
+            [(count, first, last, ref) for ref, (count, first, last) in summaries.items()]
+        )
+
+    def _target_partition(self) -> str:
+        """Partition the next batch goes to."""
+        if self.partition_by == "month":
+            return time.strftime("%Y_%m", time.gmtime())
+        if self._current is None or not self._current.startswith("n"):
+            return "n000001"
+        if self._current_rows >= self.rows_per_partition:
+            return f"n{int(self._current[1:]) + 1:06d}"
+        return self._current
+
+    async def _write_partition(self) -> Tuple[str, str]:
+        """(name, schema) of the partition to write to, created and attached on first use."""
+        name = self._target_partition()
+        if name != self._current:
+            await self._create_partition(name)
+            self._current, self._current_rows = name, 0
+        return name, await self._attach(self._conn, name)
+
+    async def _create_partition(self, name: str) -> None:
+        schema = await self._attach(self._conn, name)
+        # journal_mode can only change outside a transaction, i.e. before the first INSERT of the batch
+        pragmas = PRAGMA_PROFILES[self.profile]["pragmas"]
+        for pragma in ("journal_mode", "synchronous"):
+            if pragma in pragmas:
+                await self._conn.execute(f"PRAGMA {schema}.{pragma} = {pragmas[pragma]}")
+        for statement in _PARTITION_SCHEMA:
+            await self._conn.execute(statement.format(schema=schema))
+        cursor = await self._conn.execute("SELECT 1 FROM partitions WHERE name = ?", (name,))
+        if await cursor.fetchone() is None:
+            # Left over from a WAL crash that lost the router side of its first batch
+            await self._conn.execute(
+                f"""
+                DELETE FROM {schema}.messages AS m WHERE NOT EXISTS (
+                    SELECT 1 FROM main.message_index i WHERE i.id = m.id AND i.message_id = m.message_id
+                )
+                """
+            )
+        await self._conn.execute(
+            "INSERT OR IGNORE INTO partitions (name, created_at) VALUES (?, ?)", (name, time.time())
+        )
+        self._dropped.discard(name)
+        self.log.info(f"Started partition {name}.")
+
+    def _attachments(self, conn: Any, name: str) -> Tuple[List[str], bool]:
+        """Partitions to detach from conn before `name` fits, and whether `name` still needs attaching."""
+        attached = self._attached.setdefault(id(conn), OrderedDict())
+        evict = [n for n in attached if n in self._dropped]
+        if name in attached and name not in evict:
+            attached.move_to_end(name)
+        else:
+            free = self.max_attached - (len(attached) - len(evict))
+            for n in attached:
+                if free > 0:
+                    break
+                if n not in evict and n != self._current:
+                    evict.append(n)
+                    free += 1
+        for n in evict:
+            del attached[n]
+        needs_attach = name not in attached
+        attached[name] = None
+        return evict, needs_attach
+
+    def _attach_target(self, conn: Any, name: str) -> str:
+        path = self._partition_path(name)
+        if conn is self._conn or isinstance(conn, sqlite3.Connection):
+            return str(path)
+        # Read pool connections are opened from a URI, attach read-only as well
+        return f"{path.resolve().as_uri()}?mode=ro"
+
+    async def _attach(self, conn: Any, name: str) -> str:
+        """Attach a partition to an aiosqlite connection (if needed), returns its schema name."""
+        evict, needs_attach = self._attachments(conn, name)
+        for n in evict:
+            await conn.execute(f"DETACH DATABASE {_schema(n)}")
+        if needs_attach:
+            await conn.execute(f"ATTACH DATABASE ? AS {_schema(name)}", (self._attach_target(conn, name),))
+        return _schema(name)
+
+    def _attach_sync(self, conn: sqlite3.Connection, name: str) -> str:
+        """_attach for the synchronous helper connection."""
+        evict, needs_attach = self._attachments(conn, name)
+        for n in evict:
+            conn.execute(f"DETACH DATABASE {_schema(n)}")
+        if needs_attach:
+            conn.execute(f"ATTACH DATABASE ? AS {_schema(name)}", (self._attach_target(conn, name),))
+        return _schema(name)
+
+    @asynccontextmanager
+    async def _reader(self) -> AsyncIterator[Any]:
+        """
+        Read connection; without a read pool the writer connection is used between transactions.
+        Never hold it across a yield to callers, writes wait for it.
+        """
+        if self._read_pool is not None:
+            async with self.acquire_reader() as conn:
+                yield conn
+        else:
+            async with self._txn_lock:
+                async with self.acquire_reader() as conn:
+                    yield conn
+
+    @staticmethod
+    def _select(schema: str) -> str:
+        return f"SELECT {_MESSAGE_COLUMNS} FROM {schema}.messages m LEFT JOIN main.chats c ON c.id = m.chat_ref"
+
+    @staticmethod
+    def _partition_query(
+            since: Optional[float] = None,
+            until: Optional[float] = None,
+            before_id: Optional[int] = None,
+            newest_first: bool = True
+    ) -> Tuple[str, List[Any]]:
+        """Catalog query for the partitions that can hold matching rows, in read order."""
+        clauses = ["row_count > 0"]
+        params: List[Any] = []
+        if before_id is not None:
+            clauses.append("min_id < ?")
+            params.append(before_id)
+        if since is not None:
+            clauses.append("max_time >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("min_time < ?")
+            params.append(until)
+        order = "DESC" if newest_first else "ASC"
+        return f"SELECT name FROM partitions WHERE {' AND '.join(clauses)} ORDER BY min_id {order}", params
+
+    async def _insert_records(self, records: List[tuple]) -> None:
+        """Insert record tuples into the current partition, router and partition rows under one COMMIT."""
+        if not self._conn:
+            raise StorageError("Database not initialized.")
+        if not records:
+            return
+
+        publish = bool(self._commit_feed)
+        inserted: List[StoredMessage] = []
+        async with self._txn_lock:
+            try:
+                name, schema = await self._write_partition()
+                cursor = await self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM message_index")
+                last_id = (await cursor.fetchone())[0]
+                await self._conn.executemany(
+                    "INSERT OR IGNORE INTO message_index (message_id) VALUES (?)", [(r[0],) for r in records]
+                )
+                cursor = await self._conn.execute("SELECT message_id, id FROM message_index WHERE id > ?", (last_id,))
+                new_ids = dict(await cursor.fetchall())
+
+                rows = []
+                if new_ids:
+                    chat_refs = await self._resolve_chats(records)
+                    for r in records:
+                        row_id = new_ids.pop(r[0], None)
+                        if row_id is not None:
+                            rows.append((row_id, *r[:6], chat_refs[self._chat_key(r)], r[8]))
+                    await self._conn.executemany(
+                        f"""
+                        INSERT INTO {schema}.messages
+                        (id, message_id, raw_data, encrypted_message, encryption_nonce, data_type, direction,
+                         chat_ref, system_hit_time)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        rows
+                    )
+                    await self._update_summaries(name, rows)
+                    if publish:
+                        cursor = await self._conn.execute(
+                            f"{self._select(schema)} WHERE m.id > ? ORDER BY m.id", (last_id,)
+                        )
+                        inserted = [StoredMessage(*row) for row in await cursor.fetchall()]
+                await self._conn.commit()
+                self._current_rows += len(rows)
+            except Exception as e:
+                self._chat_cache.clear()
+                try:
+                    await self._conn.rollback()
+                    await self._load_current_partition()
+                except Exception as reload_error:
+                    self.log.warning(f"Reloading the partition catalog failed: {reload_error}")
+                self.log.error(f"Batch insert failed: {e}", exc_info=True)
+                raise StorageError(f"Batch insert failed: {e}") from e
+
+        if self.seen_index is not None:
+            self.seen_index.add_many(record[0] for record in records)
+        self.log.debug(f"Inserted {len(records)} messages into partition {name}.")
+        if inserted:
+            self._commit_feed.publish(inserted)
+
+    async def _update_summaries(self, name: str, rows: List[tuple]) -> None:
+        """Chat summaries and the partition's catalog entry for freshly inserted rows (id ascending)."""
+        per_chat: Dict[int, List[float]] = {}
+        for row in rows:
+            ref, hit_time = row[7], row[8]
+            summary = per_chat.get(ref)
+            if summary is None:
+                per_chat[ref] = [1, hit_time, hit_time]
+            else:
+                summary[0] += 1
+                summary[1] = min(summary[1], hit_time)
+                summary[2] = max(summary[2], hit_time)
+
+        await self._conn.executemany(
+            """
+            UPDATE chats SET
+                message_count = message_count + ?,
+                first_seen = MIN(COALESCE(first_seen, ?), ?),
+                last_seen = MAX(COALESCE(last_seen, ?), ?)
+            WHERE id = ?
+            """,
+            [(count, first, first, last, last, ref) for ref, (count, first, last) in per_chat.items()]
+        )
+
+        times = [row[8] for row in rows]
+        await self._conn.execute(
+            """
+            UPDATE partitions SET
+                row_count = row_count + ?,
+                min_id = COALESCE(min_id, ?),
+                max_id = ?,
+                min_time = MIN(COALESCE(min_time, ?), ?),
+                max_time = MAX(COALESCE(max_time, ?), ?)
+            WHERE name = ?
+            """,
+            (len(rows), rows[0][0], rows[-1][0], min(times), min(times), max(times), max(times), name)
+        )
+
+    async def _collect(
+            self,
+            conn: Any,
+            limit: int,
+            before_id: Optional[int] = None,
+            chat_name: Optional[str] = None,
+            since: Optional[float] = None,
+            until: Optional[float] = None
+    ) -> List[Any]:
+        """Up to `limit` matching rows, newest first, reading partitions until enough are found."""
+        where, params = self._message_filters(
+            before_id=before_id, chat_refs=await self._chat_refs(conn, chat_name), since=since, until=until
+        )
+        sql, catalog_params = self._partition_query(since=since, until=until, before_id=before_id)
+        cursor = await conn.execute(sql, catalog_params)
+        names = [row[0] for row in await cursor.fetchall()]
+
+        rows: List[Any] = []
+        for name in names:
+            if len(rows) >= limit:
+                break
+            schema = await self._attach(conn, name)
+            cursor = await conn.execute(
+                f"{self._select(schema)}{where} ORDER BY m.id DESC LIMIT ?", [*params, limit - len(rows)]
+            )
+            rows.extend(await cursor.fetchall())
+        return rows
+
+    def get_all_messages(self, **kwargs) -> List[Dict[str, Any]]:
+        """Retrieve messages newest first across partitions (synchronous), limit/offset as SQLITE_DB."""
+        limit = kwargs.get('limit', 1000)
+        offset = kwargs.get('offset', 0)
+
+        try:
+            with self._sync_lock:
+                conn = self._sync_connection()
+                sql, params = self._partition_query()
+                names = [row[0] for row in conn.execute(sql, params).fetchall()]
+                rows: List[Any] = []
+                for name in names:
+                    if len(rows) >= limit + offset:
+                        break
+                    schema = self._attach_sync(conn, name)
+                    rows.extend(conn.execute(
+                        f"{self._select(schema)} ORDER BY m.id DESC LIMIT ?", (limit + offset - len(rows),)
+                    ).fetchall())
+            return [self._row_dict(row) for row in rows[offset:offset + limit]]
+        except Exception as e:
+            self.log.error(f"Get all messages failed: {e}")
+            return []
+
+    async def get_all_messages_async(self, **kwargs) -> List[Dict[str, Any]]:
+        """Async version of get_all_messages."""
+        if not self._conn:
+            return []
+
+        limit = kwargs.get('limit', 1000)
+        offset = kwargs.get('offset', 0)
+        try:
+            async with self._reader() as conn:
+                rows = await self._collect(conn, limit + offset)
+            return [self._row_dict(row) for row in rows[offset:offset + limit]]
+        except Exception as e:
+            self.log.error(f"Async get all messages failed: {e}")
+            return []
+
+    async def get_messages_page(
+            self,
+            cursor: Optional[str] = None,
+            limit: int = 100,
+            chat_name: Optional[str] = None,
+            since: Optional[float] = None,
+            until: Optional[float] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Keyset-paginated listing across partitions, same contract as SQLITE_DB.get_messages_page."""
+        if not self._conn:
+            return [], None
+
+        before_id = self._decode_cursor(cursor) if cursor else None
+        try:
+            async with self._reader() as conn:
+                rows = [
+                    self._row_dict(row)
+                    for row in await self._collect(conn, limit + 1, before_id, chat_name, since, until)
+                ]
+        except Exception as e:
+            self.log.error(f"Get messages page failed: {e}")
+            return [], None
+
+        if len(rows) > limit:
+            rows = rows[:limit]
+            return rows, self._encode_cursor(rows[-1]["id"])
+        return rows, None
+
+    async def get_messages_by_chat(self, chat_name: str, **kwargs) -> List[Dict[str, Any]]:
+        """Get messages filtered by chat name, newest first across partitions."""
+        if not self._conn:
+            return []
+
+        try:
+            async with self._reader() as conn:
+                rows = await self._collect(conn, kwargs.get('limit', 100), chat_name=chat_name)
+            return [self._row_dict(row) for row in rows]
+        except Exception as e:
+            self.log.error(f"Get messages by chat failed: {e}")
+            return []
+
+    async def iter_messages(
+            self,
+            chunk_size: int = 500,
+            row_format: Literal["dict", "tuple", "record"] = "dict",
+            newest_first: bool = False,
+            chat_name: Optional[str] = None,
+            since: Optional[float] = None,
+            until: Optional[float] = None
+    ) -> AsyncIterator[Union[Dict[str, Any], Tuple[Any, ...], StoredMessage]]:
+        """
+        Stream messages partition by partition, same arguments as SQLITE_DB.iter_messages.
+
+        Each chunk is a keyset query of its own and no connection or lock is held while rows
+        are yielded, so the consumer may write (even wait for commits) while iterating.
+        """
+        if row_format not in ("dict", "tuple", "record"):
+            raise ValueError(f"Unknown row_format: {row_format}")
+        if not self._conn:
+            return
+
+        async with self._reader() as conn:
+            where, params = self._message_filters(
+                chat_refs=await self._chat_refs(conn, chat_name), since=since, until=until
+            )
+            sql, catalog_params = self._partition_query(since=since, until=until, newest_first=newest_first)
+            cursor = await conn.execute(sql, catalog_params)
+            names = [row[0] for row in await cursor.fetchall()]
+
+        order, after = ("DESC", "<") if newest_first else ("ASC", ">")
+        keyset = f"{where} AND m.id {after} ?" if where else f" WHERE m.id {after} ?"
+        for name in names:
+            last_id = None
+            while name not in self._dropped:
+                async with self._reader() as conn:
+                    schema = await self._attach(conn, name)
+                    if last_id is None:
+                        query, query_params = f"{self._select(schema)}{where}", list(params)
+                    else:
+                        query, query_params = f"{self._select(schema)}{keyset}", [*params, last_id]
+                    cursor = await conn.execute(f"{query} ORDER BY m.id {order} LIMIT ?", (*query_params, chunk_size))
+                    rows = await cursor.fetchall()
+                    await cursor.close()
+
+                for row in rows:
+                    if row_format == "record":
+                        yield StoredMessage(*row)
+                    elif row_format == "tuple":
+                        yield tuple(row)
+                    else:
+                        yield dict(zip(STORED_MESSAGE_COLUMNS, row))
+                if len(rows) < chunk_size:
+                    break
+                last_id = rows[-1][0]
+
+    async def list_partitions(self) -> List[Dict[str, Any]]:
+        """Catalog entries (name, file, row_count, id and system_hit_time range), oldest first."""
+        if not self._conn:
+            return []
+        async with self._reader() as conn:
+            cursor = await conn.execute(
+                "SELECT name, row_count, min_id, max_id, min_time, max_time, created_at FROM partitions ORDER BY rowid"
+            )
+            partitions = [dict(row) for row in await cursor.fetchall()]
+        for partition in partitions:
+            partition["file"] = str(self._partition_path(partition["name"]))
+        return partitions
+
+    async def drop_partition(self, name: str, delete_file: bool = True, forget_ids: bool = False) -> int:
+        """
+        Remove a partition from the router, e.g. once its file is archived.
+
+        Args:
+            name: Partition name from list_partitions()
+            delete_file: Delete the partition file, pass False to move / compress it yourself
+            forget_ids: Also forget its message ids. By default they stay in message_index,
+                so the dropped messages count as seen and are not stored again
+
+        Returns:
+            Number of rows the partition held
+
+        Raises:
+            StorageError: If the partition is unknown or currently written to
+        """
+        if not self._conn:
+            raise StorageError("Database not initialized.")
+
+        async with self._txn_lock:
+            if name == self._current:
+                raise StorageError(f"Partition {name} is currently written to.")
+            cursor = await self._conn.execute(
+                "SELECT row_count, min_id, max_id FROM partitions WHERE name = ?", (name,)
+            )
+            row = await cursor.fetchone()
+            if row is None:
+                raise StorageError(f"Unknown partition '{name}'")
+            row_count, min_id, max_id = row
+
+            schema = await self._attach(self._conn, name)
+            cursor = await self._conn.execute(f"SELECT chat_ref, COUNT(*) FROM {schema}.messages GROUP BY chat_ref")
+            per_chat = await cursor.fetchall()
+            forgotten: List[str] = []
+            if forget_ids and min_id is not None:
+                cursor = await self._conn.execute(
+                    "SELECT message_id FROM message_index WHERE id BETWEEN ? AND ?", (min_id, max_id)
+                )
+                forgotten = [r[0] for r in await cursor.fetchall()]
+            await self._conn.execute(f"DETACH DATABASE {schema}")
+            self._attached.get(id(self._conn), {}).pop(name, None)
+
+            try:
+                await self._conn.executemany(
+                    "UPDATE chats SET message_count = MAX(message_count - ?, 0) WHERE id = ?",
+                    [(count, ref) for ref, count in per_chat]
+                )
+                await self._conn.execute("DELETE FROM partitions WHERE name = ?", (name,))
+                if forgotten:
+                    await self._conn.execute("DELETE FROM message_index WHERE id BETWEEN ? AND ?", (min_id, max_id))
+                await self._conn.commit()
+            except Exception as e:
+                await self._conn.rollback()
+                raise StorageError(f"Dropping partition {name} failed: {e}") from e
+
+        # Other connections detach it lazily, the next time they attach a partition
+        self._dropped.add(name)
+        if self.seen_index is not None and forgotten:
+            self.seen_index.discard_many(forgotten)
+        if delete_file:
+            path = self._partition_path(name)
+            for file in (path, path.with_name(path.name + "-wal"), path.with_name(path.name + "-shm")):
+                try:
+                    file.unlink(missing_ok=True)
+                except OSError as e:
+                    self.log.warning(f"Could not delete {file}: {e}")
+        self.log.info(f"Dropped partition {name} ({row_count} rows).")
+        return row_count
+
+    async def enforce_retention(self) -> Dict[str, Any]:
+        """
+        Apply max_age by dropping every partition whose newest row is older than the cutoff
+        (never the current one). Their message ids stay known, see drop_partition.
+
+        Returns:
+            Rows deleted ("expired", "deleted"), dropped_partitions, reclaimed_bytes and duration
+
+        Raises:
+            StorageError: If no policy is configured or the database is not initialized
+        """
+        policy = self.retention
+        if policy is None:
+            raise StorageError("No retention policy configured.")
+        if not self._conn:
+            raise StorageError("Database not initialized.")
+
+        started = time.perf_counter()
+        report: Dict[str, Any] = {"expired": 0, "dropped_partitions": [], "reclaimed_bytes": 0}
+        if policy.max_age is not None:
+            cursor = await self._conn.execute(
+                "SELECT name FROM partitions WHERE max_time < ? ORDER BY rowid", (time.time() - policy.max_age,)
+            )
+            for (name,) in await cursor.fetchall():
+                if name == self._current:
+                    continue
+                path = self._partition_path(name)
+                size = sum(
+                    p.stat().st_size
+                    for p in (path, path.with_name(path.name + "-wal"))
+                    if p.exists()
+                )
+                report["expired"] += await self.drop_partition(name)
+                report["dropped_partitions"].append(name)
+                report["reclaimed_bytes"] += size
+
+        report["deleted"] = report["expired"]
+        report["duration"] = time.perf_counter() - started
+        self.last_retention_report = report
+        return report
+
+    async def close_db(self, **kwargs) -> None:
+        """Close connections (attached partitions go with them) and stop the writer."""
+        await super().close_db(**kwargs)
+        self._attached.clear()
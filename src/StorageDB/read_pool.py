@@ -0,0 +1,109 @@
+"""
+Pool of read-only SQLite connections used next to the single writer connection.
+
+With WAL, readers never block the writer (and vice versa), so analytics
+queries can run while batches are being committed.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+
+import aiosqlite
+
+from src.Exceptions.base import StorageError
+
+
+class ReadPool:
+    """
+    Fixed-size pool of read-only aiosqlite connections.
+
+    `acquire()` hands out at most `size` connections at once, further callers wait
+    (optionally bounded by a timeout) until one is released.
+    """
+
+    def __init__(
+            self,
+            db_path: Path,
+            log: logging.Logger,
+            size: int = 4,
+            pragmas: Optional[Dict[str, object]] = None
+    ) -> None:
+        """
+        Args:
+            db_path: Path of an existing SQLite database file
+            log: Logger instance
+            size: Number of read connections
+            pragmas: Extra per-connection PRAGMAs (cache_size, mmap_size, ...)
+        """
+        if size <= 0:
+            raise ValueError("Read pool size must be positive")
+
+        self.db_path = Path(db_path)
+        self.log = log
+        self.size = size
+        self.pragmas = pragmas or {}
+        self._idle: Optional[asyncio.Queue] = None
+        self._conns: List[aiosqlite.Connection] = []
+
+    @property
+    def in_use(self) -> int:
+        """Number of connections currently checked out."""
+        return self.size - self._idle.qsize() if self._idle is not None else 0
+
+    async def open(self) -> None:
+        """Open all read connections."""
+        if self._idle is not None:
+            return
+
+        idle: asyncio.Queue = asyncio.Queue()
+        uri = f"{self.db_path.resolve().as_uri()}?mode=ro"
+        try:
+            for _ in range(self.size):
+                conn = await aiosqlite.connect(uri, uri=True)
+                conn.row_factory = aiosqlite.Row
+                await conn.execute("PRAGMA query_only = 1")
+                for name, value in self.pragmas.items():
+                    await conn.execute(f"PRAGMA {name} = {value}")
+                self._conns.append(conn)
+                idle.put_nowait(conn)
+        except Exception as e:
+            await self.close()
+            raise StorageError(f"Failed to open read pool: {e}") from e
+
+        self._idle = idle
+        self.log.debug(f"Read pool opened with {self.size} connections.")
+
+    @asynccontextmanager
+    async def acquire(self, timeout: Optional[float] = None) -> AsyncIterator[aiosqlite.Connection]:
+        """
+        Borrow a read connection.
+
+        Raises:
+            StorageError: If the pool is closed or no connection frees up within timeout
+        """
+        if self._idle is None:
+            raise StorageError("Read pool is not open.")
+
+        try:
+            conn = await asyncio.wait_for(self._idle.get(), timeout=timeout)
+        except asyncio.TimeoutError as e:
+            raise StorageError(f"No read connection available within {timeout}s") from e
+
+        try:
+            yield conn
+        finally:
+            self._idle.put_nowait(conn)
+
+    async def close(self) -> None:
+        """Close every connection of the pool."""
+        self._idle = None
+        conns, self._conns = self._conns, []
+        for conn in conns:
+            try:
+                await conn.close()
+            except Exception as e:
+                self.log.warning(f"Closing read connection failed: {e}")
@@ -0,0 +1,25 @@
+"""Lightweight row types returned by the storage backends."""
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
+from typing import Optional, Tuple
+
+
+@dataclass(slots=True)
+class StoredMessage:
+    """One row of the messages table, slotted to keep large scans cheap."""
+    id: int
+    message_id: str
+    raw_data: Optional[str]
+    encrypted_message: Optional[bytes]
+    encryption_nonce: Optional[bytes]
+    data_type: Optional[str]
+    direction: Optional[str]
+    parent_chat_name: Optional[str]
+    parent_chat_id: Optional[str]
+    system_hit_time: Optional[float]
+    created_at: Optional[str]
+
+
+STORED_MESSAGE_COLUMNS: Tuple[str, ...] = tuple(f.name for f in fields(StoredMessage))
+"""Column order of StoredMessage, also the order of tuple rows."""
@@ -0,0 +1,51 @@
+"""
+Retention limits for the message store.
+
+SQLITE_DB enforces a RetentionPolicy from a background task: expired and
+excess rows are deleted oldest first in small transactions (yielding to the
+writer in between), then free pages are returned to the OS with
+incremental_vacuum and the WAL is truncated.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class RetentionPolicy:
+    """
+    Limits enforced by SQLITE_DB, None disables a limit.
+
+    Attributes:
+        max_age: Seconds, rows whose system_hit_time is older are deleted
+        max_rows_per_chat: Newest rows kept per chat
+        max_bytes: Target size of the data in use (pages minus free pages), oldest rows go first
+        interval: Seconds between background enforcement runs
+        batch_size: Rows deleted per transaction
+        pause: Seconds yielded to the writer between two delete batches
+        vacuum_pages: Free pages released per incremental_vacuum step
+
+    Free pages only go back to the OS in databases created with auto_vacuum=INCREMENTAL,
+    which SQLITE_DB sets on new files when a policy is configured. Older files reuse
+    the freed pages for new rows instead of growing.
+    """
+    max_age: Optional[float] = None
+    max_rows_per_chat: Optional[int] = None
+    max_bytes: Optional[int] = None
+    interval: float = 300.0
+    batch_size: int = 500
+    pause: float = 0.01
+    vacuum_pages: int = 1000
+
+    def __post_init__(self) -> None:
+        for name in ("max_age", "max_rows_per_chat", "max_bytes"):
+            value = getattr(self, name)
+            if value is not None and value <= 0:
+                raise ValueError(f"{name} must be positive")
+        if self.interval <= 0:
+            raise ValueError("interval must be positive")
+        if self.batch_size <= 0 or self.vacuum_pages <= 0:
+            raise ValueError("batch_size and vacuum_pages must be positive")
+        if self.pause < 0:
+            raise ValueError("pause cannot be negative")
@@ -0,0 +1,214 @@
+"""
+In-memory index of stored message IDs, consulted before hitting SQLite.
+
+Two layers, both bounded:
+- an exact LRU of recently stored IDs (a hit means "definitely stored")
+- optionally a scalable Bloom filter over every stored ID (a miss means "definitely new")
+
+A Bloom hit is never trusted on its own, so the index can never report a
+stored message that does not exist; anything it cannot decide falls through
+to the database.
+"""
+from __future__ import annotations
+
+import hashlib
+import math
+from collections import OrderedDict
+from typing import Iterable, List, Literal, Set, Tuple
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter using double hashing over blake2b."""
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> List[int]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.capacity
+
+
+class ScalableBloomFilter:
+    """
+    Chain of Bloom filters, each twice as large with half the error rate of the previous,
+    so the compound false positive rate stays under `error_rate`.
+    Stops growing at `max_items`; after that `saturated` is True.
+    """
+
+    def __init__(self, initial_capacity: int = 10_000, error_rate: float = 0.01, max_items: int = 1_000_000) -> None:
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.max_items = max_items
+        self.filters: List[BloomFilter] = [BloomFilter(initial_capacity, error_rate / 2)]
+        self.saturated = False
+
+    def __len__(self) -> int:
+        return sum(f.count for f in self.filters)
+
+    def add(self, item: str) -> bool:
+        """Add an item, returns False once the filter is saturated."""
+        if self.saturated:
+            return False
+        if len(self) >= self.max_items:
+            self.saturated = True
+            return False
+
+        current = self.filters[-1]
+        if current.full:
+            current = BloomFilter(current.capacity * 2, current.error_rate / 2)
+            self.filters.append(current)
+        current.add(item)
+        return True
+
+    def __contains__(self, item: str) -> bool:
+        return any(item in f for f in self.filters)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(f.bits) for f in self.filters)
+
+
+class SeenIndex:
+    """
+    Bounded dedup index placed in front of a storage backend.
+
+    Args:
+        capacity: Max IDs kept in the exact recent-ID LRU
+        mode: "lru" for the exact LRU only, "bloom" to also keep a scalable Bloom filter
+        bloom_max_items: Upper bound of IDs the Bloom filter may hold
+        bloom_error_rate: Target false positive rate of the Bloom filter
+
+    The Bloom filter can only answer "definitely new" while it covers every stored ID
+    (`complete`). The storage marks it complete after warming it from the whole table.
+    """
+
+    def __init__(
+            self,
+            capacity: int = 50_000,
+            mode: Literal["lru", "bloom"] = "lru",
+            bloom_max_items: int = 1_000_000,
+            bloom_error_rate: float = 0.01
+    ) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if mode not in ("lru", "bloom"):
+            raise ValueError(f"Unknown seen index mode: {mode}")
+
+        self.capacity = capacity
+        self.mode = mode
+        self._recent: OrderedDict[str, None] = OrderedDict()
+        self.bloom = ScalableBloomFilter(
+            initial_capacity=min(capacity, bloom_max_items),
+            error_rate=bloom_error_rate,
+            max_items=bloom_max_items
+        ) if mode == "bloom" else None
+        self.complete = False
+
+        self.hits = 0
+        self.negatives = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._recent)
+
+    def __contains__(self, msg_id: str) -> bool:
+        return msg_id in self._recent
+
+    def add_many(self, msg_ids: Iterable[str]) -> None:
+        """Record IDs that were committed to storage."""
+        for msg_id in msg_ids:
+            self._recent[msg_id] = None
+            self._recent.move_to_end(msg_id)
+            if self.bloom is not None and not self.bloom.add(msg_id):
+                self.complete = False
+
+        while len(self._recent) > self.capacity:
+            self._recent.popitem(last=False)
+
+    def discard_many(self, msg_ids: Iterable[str]) -> None:
+        """
+        Forget IDs deleted from storage.
+        A Bloom filter cannot delete, stale bits only cost an extra DB lookup.
+        """
+        for msg_id in msg_ids:
+            self._recent.pop(msg_id, None)
+
+    def warm_recent(self, msg_ids: Iterable[str]) -> None:
+        """Load IDs (oldest first) into the exact LRU only."""
+        for msg_id in msg_ids:
+            self._recent[msg_id] = None
+            self._recent.move_to_end(msg_id)
+        while len(self._recent) > self.capacity:
+            self._recent.popitem(last=False)
+
+    def warm_bloom(self, msg_ids: Iterable[str], complete: bool) -> None:
+        """Load IDs into the Bloom filter only, `complete` if they are the whole table."""
+        if self.bloom is None:
+            return
+        for msg_id in msg_ids:
+            if not self.bloom.add(msg_id):
+                complete = False
+                break
+        self.complete = complete and not self.bloom.saturated
+
+    def partition(self, msg_ids: Iterable[str]) -> Tuple[Set[str], Set[str], Set[str]]:
+        """
+        Split IDs into (stored, new, uncertain).
+        Only `uncertain` needs to be confirmed against the database.
+        """
+        stored: Set[str] = set()
+        new: Set[str] = set()
+        uncertain: Set[str] = set()
+        bloom_decides = self.bloom is not None and self.complete
+
+        for msg_id in msg_ids:
+            if msg_id in self._recent:
+                self._recent.move_to_end(msg_id)
+                stored.add(msg_id)
+            elif bloom_decides and msg_id not in self.bloom:
+                new.add(msg_id)
+            else:
+                uncertain.add(msg_id)
+
+        self.hits += len(stored)
+        self.negatives += len(new)
+        self.misses += len(uncertain)
+        return stored, new, uncertain
+
+    def stats(self) -> dict:
+        """Counters and memory footprint of the index."""
+        return {
+            "mode": self.mode,
+            "recent_size": len(self._recent),
+            "capacity": self.capacity,
+            "bloom_items": len(self.bloom) if self.bloom is not None else 0,
+            "bloom_bytes": self.bloom.nbytes if self.bloom is not None else 0,
+            "bloom_complete": self.complete,
+            "hits": self.hits,
+            "negatives": self.negatives,
+            "misses": self.misses,
+        }
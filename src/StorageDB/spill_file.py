@@ -0,0 +1,97 @@
+"""
+Append-only JSON-lines file of message records kept on disk instead of in memory.
+
+Used by SQLITE_DB when the writer queue is full and the overflow policy is
+"spill": records are written here and replayed by the writer once it catches up.
+Lines left behind by a previous run are replayed as well.
+"""
+from __future__ import annotations
+
+import base64
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Iterable, List
+
+# Positions of BLOB columns (encrypted_message, encryption_nonce) in a message record.
+_BLOB_FIELDS = (2, 3)
+
+
+def encode_record(record: tuple) -> str:
+    """Serialize a message record tuple to one JSON line."""
+    fields = list(record)
+    for i in _BLOB_FIELDS:
+        if fields[i] is not None:
+            fields[i] = base64.b64encode(fields[i]).decode("ascii")
+    return json.dumps(fields, ensure_ascii=False)
+
+
+def decode_record(line: str) -> tuple:
+    """Inverse of encode_record."""
+    fields = json.loads(line)
+    for i in _BLOB_FIELDS:
+        if fields[i] is not None:
+            fields[i] = base64.b64decode(fields[i])
+    return tuple(fields)
+
+
+class SpillFile:
+    """
+    Thread-safe append / take-all file of records.
+
+    Args:
+        path: File location, created on first append
+        fsync: fsync after every append (slower, survives power loss)
+    """
+
+    def __init__(self, path: Path, fsync: bool = False) -> None:
+        self.path = Path(path)
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self.pending = self._count_lines()
+
+    def _count_lines(self) -> int:
+        if not self.path.exists():
+            return 0
+        with open(self.path, "rb") as f:
+            return sum(1 for line in f if line.strip())
+
+    def append(self, records: Iterable[tuple]) -> int:
+        """Append records, returns how many were written."""
+        lines = [encode_record(r) + "\n" for r in records]
+        if not lines:
+            return 0
+
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            self.pending += len(lines)
+        return len(lines)
+
+    def take_all(self) -> List[tuple]:
+        """Read every spilled record and empty the file."""
+        with self._lock:
+            if not self.pending and not self.path.exists():
+                return []
+            records: List[tuple] = []
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            records.append(decode_record(line))
+                        except (ValueError, IndexError, TypeError):
+                            # Torn last line after a crash
+                            continue
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+            self.pending = 0
+            return records
@@ -0,0 +1,172 @@
+"""
+Write-ahead spool for messages accepted by enqueue_insert but not yet committed.
+
+Records are appended to numbered segment files before they reach the writer
+queue, fsync'd in groups, and a segment is deleted once every record written to
+it has been committed. Whatever is left on disk after a crash is replayed into
+the database on the next start, giving at-least-once persistence
+(INSERT OR IGNORE makes the replay idempotent).
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from src.StorageDB.spill_file import decode_record, encode_record
+
+
+class Spool:
+    """
+    Segmented append-only spool with group fsync.
+
+    Args:
+        path: Base path, segments are written as <path>.<n>
+        fsync_window: Seconds appends wait so one fsync covers all of them, 0 syncs immediately
+        segment_bytes: Size after which a new segment is started
+    """
+
+    def __init__(self, path: Path, fsync_window: float = 0.005, segment_bytes: int = 4 * 1024 * 1024) -> None:
+        self.path = Path(path)
+        self.fsync_window = fsync_window
+        self.segment_bytes = segment_bytes
+
+        existing = self.segments()
+        self._segment = (max(existing) + 1) if existing else 0
+        self._file = None
+        self._outstanding: Dict[int, int] = {}
+        self._sync_future: Optional[asyncio.Future] = None
+        self.fsyncs = 0
+        self.appended = 0
+
+    def _segment_path(self, n: int) -> Path:
+        return self.path.with_name(f"{self.path.name}.{n}")
+
+    def segments(self) -> List[int]:
+        """Numbers of the segment files currently on disk."""
+        numbers = []
+        for p in self.path.parent.glob(f"{self.path.name}.*"):
+            suffix = p.name[len(self.path.name) + 1:]
+            if suffix.isdigit():
+                numbers.append(int(suffix))
+        return sorted(numbers)
+
+    @property
+    def pending(self) -> int:
+        """Records written but not yet acknowledged as committed."""
+        return sum(self._outstanding.values())
+
+    def _open_segment(self):
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self._segment_path(self._segment), "a", encoding="utf-8")
+        return self._file
+
+    async def append(self, records: Iterable[tuple]) -> int:
+        """
+        Durably append records.
+
+        Returns:
+            Segment number the records were written to, pass it to ack() after commit
+        """
+        lines = [encode_record(r) + "\n" for r in records]
+        segment = self._segment
+        if not lines:
+            return segment
+
+        f = self._open_segment()
+        f.writelines(lines)
+        f.flush()
+        self._outstanding[segment] = self._outstanding.get(segment, 0) + len(lines)
+        self.appended += len(lines)
+
+        if f.tell() >= self.segment_bytes:
+            self._rotate()
+
+        await self._group_fsync(f)
+        return segment
+
+    def _rotate(self) -> None:
+        """Start a new segment, the old one is fsync'd on close."""
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+        finished = self._segment
+        self._segment += 1
+        if not self._outstanding.get(finished):
+            self._delete(finished)
+
+    async def _group_fsync(self, f) -> None:
+        """Coalesce concurrent appends into one fsync."""
+        if self._sync_future is None:
+            self._sync_future = asyncio.get_running_loop().create_future()
+            asyncio.create_task(self._fsync_later(self._sync_future))
+        await asyncio.shield(self._sync_future)
+
+    async def _fsync_later(self, future: asyncio.Future) -> None:
+        if self.fsync_window:
+            await asyncio.sleep(self.fsync_window)
+        # Appends arriving from now on wait for the next fsync
+        self._sync_future = None
+        try:
+            if self._file is not None and not self._file.closed:
+                await asyncio.to_thread(os.fsync, self._file.fileno())
+            self.fsyncs += 1
+            future.set_result(None)
+        except Exception as e:
+            future.set_exception(e)
+
+    def ack(self, segment: int, count: int) -> None:
+        """Mark `count` records of a segment as committed, removing or truncating finished segments."""
+        left = self._outstanding.get(segment, 0) - count
+        if left > 0:
+            self._outstanding[segment] = left
+            return
+
+        self._outstanding.pop(segment, None)
+        if segment != self._segment:
+            self._delete(segment)
+        elif self._file is not None:
+            self._file.truncate(0)
+            self._file.seek(0)
+
+    def _delete(self, segment: int) -> None:
+        try:
+            self._segment_path(segment).unlink()
+        except FileNotFoundError:
+            pass
+
+    def read_leftovers(self) -> List[tuple]:
+        """Records of segments left by a previous run (not written by this instance)."""
+        records: List[tuple] = []
+        for n in self.segments():
+            if n >= self._segment:
+                continue
+            with open(self._segment_path(n), "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        records.append(decode_record(line))
+                    except (ValueError, IndexError, TypeError):
+                        # Torn last line after a crash
+                        continue
+        return records
+
+    def discard_leftovers(self) -> None:
+        """Delete segments of a previous run once they are replayed."""
+        for n in self.segments():
+            if n < self._segment:
+                self._delete(n)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+        if not self._outstanding:
+            self._delete(self._segment)
@@ -5,16 +5,194 @@ Uses async operations via aiosqlite for non-blocking performance.
 from __future__ import annotations
 
 import asyncio
+import base64
+import binascii
+import json
 import logging
 import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import TYPE_CHECKING, AsyncIterator, Deque, Iterable, List, Dict, Any, Literal, Optional, Set, Tuple, Union
 
 import aiosqlite
 
 from src.Exceptions.base import StorageError
 from src.Interfaces.message_interface import MessageInterface
 from src.Interfaces.storage_interface import StorageInterface
+from src.StorageDB.batch_controller import AdaptiveBatchController
+from src.StorageDB.commit_feed import CommitCallback, CommitFeed, Subscription
+from src.StorageDB.read_pool import ReadPool
+from src.StorageDB.records import STORED_MESSAGE_COLUMNS, StoredMessage
+from src.StorageDB.seen_index import SeenIndex
+from src.StorageDB.spill_file import SpillFile
+from src.StorageDB.retention import RetentionPolicy
+from src.StorageDB.spool import Spool
+
+if TYPE_CHECKING:
+    from src.Encryption.blind_index import BlindIndexer
+    from src.Encryption.decryptor import MessageDecryptor
+    from src.StorageDB.codec import ZstdCodec
+
+# PRAGMAs that only concern the writer / database file, not copied to read connections.
+_WRITER_ONLY_PRAGMAS = {"journal_mode", "synchronous", "wal_autocheckpoint"}
+
+# Named PRAGMA profiles selectable at construction.
+# journal_mode is applied first; checkpoint_interval (seconds) drives the
+# background WAL checkpoint task, None disables it.
+PRAGMA_PROFILES: Dict[str, Dict[str, Any]] = {
+    "durable": {
+        "pragmas": {"journal_mode": "DELETE", "synchronous": "FULL", "busy_timeout": 5000},
+        "checkpoint_interval": None,
+    },
+    "balanced": {
+        "pragmas": {"journal_mode": "WAL", "synchronous": "NORMAL", "busy_timeout": 5000},
+        "checkpoint_interval": 60.0,
+    },
+    "throughput": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 5000,
+            "cache_size": -65536,  # 64 MiB
+            "mmap_size": 268435456,  # 256 MiB
+            "temp_store": "MEMORY",
+            "wal_autocheckpoint": 10000,  # pages, background task keeps the WAL short instead
+        },
+        "checkpoint_interval": 15.0,
+    },
+}
+
+# Schema migrations applied by create_table, keyed by PRAGMA user_version.
+# Append new steps, never edit released ones.
+_SCHEMA_MIGRATIONS: List[Tuple[int, Tuple[str, ...]]] = [
+    (1, (
+        # message_id is UNIQUE, its automatic index already serves id lookups.
+        "DROP INDEX IF EXISTS idx_message_id",
+        # get_messages_by_chat / chat-filtered pages: equality on the chat, newest id first.
+        "CREATE INDEX IF NOT EXISTS idx_messages_chat_name_id ON messages(parent_chat_name, id)",
+        # Time-range pages and iteration.
+        "CREATE INDEX IF NOT EXISTS idx_messages_hit_time ON messages(system_hit_time)",
+    )),
+    (2, (
+        # Chats dimension: messages reference it by integer key instead of repeating name/id text.
+        """
+        CREATE TABLE IF NOT EXISTS chats (
+            id INTEGER PRIMARY KEY,
+            chat_id TEXT UNIQUE NOT NULL,
+            chat_name TEXT,
+            message_count INTEGER NOT NULL DEFAULT 0,
+            first_seen REAL,
+            last_seen REAL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_chats_name ON chats(chat_name)",
+        """
+        INSERT OR IGNORE INTO chats (chat_id, chat_name, message_count, first_seen, last_seen)
+        SELECT COALESCE(NULLIF(parent_chat_id, ''), COALESCE(parent_chat_name, '')),
+               MAX(parent_chat_name), COUNT(*), MIN(system_hit_time), MAX(system_hit_time)
+        FROM messages GROUP BY 1
+        """,
+        """
+        CREATE TABLE messages_v2 (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message_id TEXT UNIQUE NOT NULL,
+            raw_data TEXT,
+            encrypted_message BLOB,
+            encryption_nonce BLOB,
+            data_type TEXT,
+            direction TEXT,
+            chat_ref INTEGER REFERENCES chats(id),
+            system_hit_time REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        INSERT INTO messages_v2 (id, message_id, raw_data, encrypted_message, encryption_nonce, data_type,
+                                 direction, chat_ref, system_hit_time, created_at)
+        SELECT m.id, m.message_id, m.raw_data, m.encrypted_message, m.encryption_nonce, m.data_type,
+               m.direction, c.id, m.system_hit_time, m.created_at
+        FROM messages m
+        LEFT JOIN chats c ON c.chat_id = COALESCE(NULLIF(m.parent_chat_id, ''), COALESCE(m.parent_chat_name, ''))
+        """,
+        "DROP TABLE messages",
+        "ALTER TABLE messages_v2 RENAME TO messages",
+        "CREATE INDEX IF NOT EXISTS idx_messages_chat_ref_id ON messages(chat_ref, id)",
+        "CREATE INDEX IF NOT EXISTS idx_messages_hit_time ON messages(system_hit_time)",
+        # Per-chat summary maintained at insert time (INSERT OR IGNORE duplicates do not fire).
+        """
+        CREATE TRIGGER IF NOT EXISTS chats_summary_ai AFTER INSERT ON messages BEGIN
+            UPDATE chats SET
+                message_count = message_count + 1,
+                first_seen = MIN(COALESCE(first_seen, new.system_hit_time), new.system_hit_time),
+                last_seen = MAX(COALESCE(last_seen, new.system_hit_time), new.system_hit_time)
+            WHERE id = new.chat_ref;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS chats_summary_ad AFTER DELETE ON messages BEGIN
+            UPDATE chats SET message_count = message_count - 1 WHERE id = old.chat_ref;
+        END
+        """,
+    )),
+]
+
+# Message rows in STORED_MESSAGE_COLUMNS order, chat name / id resolved through the chats table.
+_MESSAGE_COLUMNS = (
+    "m.id, m.message_id, m.raw_data, m.encrypted_message, m.encryption_nonce, m.data_type, m.direction, "
+    "c.chat_name AS parent_chat_name, c.chat_id AS parent_chat_id, m.system_hit_time, m.created_at"
+)
+_MESSAGE_SELECT = f"SELECT {_MESSAGE_COLUMNS} FROM messages m LEFT JOIN chats c ON c.id = m.chat_ref"
+
+# Optional external-content FTS5 index over messages.raw_data, kept in sync by triggers.
+_FTS_SCHEMA: Tuple[str, ...] = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+        raw_data, content='messages', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts(rowid, raw_data) VALUES (new.id, new.raw_data);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, raw_data) VALUES ('delete', old.id, old.raw_data);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE OF raw_data ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, raw_data) VALUES ('delete', old.id, old.raw_data);
+        INSERT INTO messages_fts(rowid, raw_data) VALUES (new.id, new.raw_data);
+    END
+    """,
+)
+_FTS_DROP: Tuple[str, ...] = (
+    "DROP TRIGGER IF EXISTS messages_fts_ai",
+    "DROP TRIGGER IF EXISTS messages_fts_ad",
+    "DROP TRIGGER IF EXISTS messages_fts_au",
+    "DROP TABLE IF EXISTS messages_fts",
+)
+
+# Blind index side table: keyed HMAC tokens of message words -> message row.
+_BLIND_INDEX_SCHEMA: Tuple[str, ...] = (
+    """
+    CREATE TABLE IF NOT EXISTS message_tokens (
+        token BLOB NOT NULL,
+        message_rowid INTEGER NOT NULL,
+        PRIMARY KEY (token, message_rowid)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_message_tokens_rowid ON message_tokens(message_rowid)",
+    """
+    CREATE TRIGGER IF NOT EXISTS message_tokens_ad AFTER DELETE ON messages BEGIN
+        DELETE FROM message_tokens WHERE message_rowid = old.id;
+    END
+    """,
+)
 
 
 class SQLITE_DB(StorageInterface):
@@ -25,15 +203,43 @@ class SQLITE_DB(StorageInterface):
     - Async queue-based batch insertion
     - Background writer task for performance
     - Generic message storage (works with any MessageInterface implementation)
+    - Optional in-memory SeenIndex answering most existence checks without a query
+    - Pool of read-only connections (WAL profiles) so reads never queue behind commits
+    - Optional FTS5 full-text index with ranked search
+    - Optional blind index (keyed word tokens) to search encrypted rows
+    - Bounded in-flight messages with a block / drop-oldest / spill-to-disk overflow policy
+    - Optional adaptive batch size / flush interval driven by commit latency
+    - Optional write-ahead spool so queued, uncommitted messages survive a crash
+    - Commit notifications pushed to in-process subscribers
+    - Optional zstd dictionary compression of raw_data, decoded transparently on read
+    - Chats dimension table (integer key per chat) with a per-chat summary
+    - Optional retention (max age, rows per chat, size) enforced in the background
     """
 
+    # Table with one row per stored message_id, answers existence checks and warms the seen index
+    _ID_TABLE = "messages"
+
     def __init__(
             self,
             queue: asyncio.Queue,
             log: logging.Logger,
             db_path: str = "messages.db",
             batch_size: int = 50,
-            flush_interval: float = 2.0
+            flush_interval: float = 2.0,
+            seen_index: Optional[SeenIndex] = None,
+            profile: str = "durable",
+            read_pool_size: int = 4,
+            full_text_search: bool = False,
+            blind_indexer: Optional[BlindIndexer] = None,
+            max_in_flight: Optional[int] = None,
+            overflow: Literal["block", "drop_oldest", "spill"] = "block",
+            spill_path: Optional[str] = None,
+            batch_controller: Optional[AdaptiveBatchController] = None,
+            spool: bool = False,
+            spool_path: Optional[str] = None,
+            drain_timeout: float = 5.0,
+            raw_data_codec: Optional[ZstdCodec] = None,
+            retention: Optional[RetentionPolicy] = None
     ) -> None:
         """
         Initialize SQLite storage.
@@ -44,7 +250,42 @@ class SQLITE_DB(StorageInterface):
             db_path: Path to SQLite database file
             batch_size: Max messages before auto-flush
             flush_interval: Seconds before auto-flush even if batch not full
+            seen_index: Optional bounded dedup index, warmed at init_db and updated on every insert
+            profile: PRAGMA profile, one of PRAGMA_PROFILES ("durable", "balanced", "throughput").
+                The default "durable" keeps the rollback journal; the WAL profiles are opt-in and
+                convert the database file to WAL (reopening it as "durable" converts it back)
+            read_pool_size: Read-only connections kept for queries (WAL profiles only), 0 disables the pool
+            full_text_search: Maintain the FTS5 index used by search(). Turning it off drops the
+                index and its triggers on the next create_table, so ingest pays nothing for it
+            blind_indexer: Tokenizer keyed from the encryption key, enables the message_tokens
+                side table and search_encrypted()
+            max_in_flight: Max messages enqueued but not yet committed, None for unbounded
+            overflow: What enqueue_insert does when max_in_flight is reached: "block" until the
+                writer catches up, "drop_oldest" queued batches, or "spill" the new batch to disk
+            spill_path: Spill file for overflow="spill" (defaults to <db_path>.spill)
+            batch_controller: Adapts batch_size / flush_interval to commit latency and queue depth,
+                its initial decisions replace the fixed values
+            spool: Write every enqueued batch to an fsync'd spool before queueing it and replay
+                leftovers at the end of create_table (at-least-once persistence across crashes)
+            spool_path: Spool base path (defaults to <db_path>.spool, i.e. the profile directory)
+            drain_timeout: Seconds close_db lets the writer commit what is queued before cancelling it
+            raw_data_codec: Compresses raw_data once a dictionary is trained
+                (train_raw_data_dictionary), dictionaries are versioned in codec_dictionaries
+            retention: Limits enforced by a background task started with the writer
+                (see enforce_retention), new database files are created with auto_vacuum=INCREMENTAL
+
+        Raises:
+            ValueError: If the profile or overflow policy is unknown, or compression is
+                combined with full-text search (FTS5 indexes the stored column)
         """
+        if profile not in PRAGMA_PROFILES:
+            raise ValueError(f"Unknown SQLite profile '{profile}', expected one of {list(PRAGMA_PROFILES)}")
+        if overflow not in ("block", "drop_oldest", "spill"):
+            raise ValueError(f"Unknown overflow policy '{overflow}'")
+        if max_in_flight is not None and max_in_flight <= 0:
+            raise ValueError("max_in_flight must be positive")
+        if raw_data_codec is not None and full_text_search:
+            raise ValueError("raw_data compression cannot be combined with full_text_search")
         super().__init__(queue=queue, log=log)
         self.db_path = Path(db_path)
         self.batch_size = batch_size
@@ -52,6 +293,43 @@ class SQLITE_DB(StorageInterface):
         self._conn: Optional[aiosqlite.Connection] = None
         self._writer_task: Optional[asyncio.Task] = None
         self._running = False
+        self.seen_index = seen_index
+        self.profile = profile
+        self._checkpoint_task: Optional[asyncio.Task] = None
+        self.read_pool_size = read_pool_size
+        self._read_pool: Optional[ReadPool] = None
+        self._sync_conn: Optional[sqlite3.Connection] = None
+        self._sync_lock = threading.Lock()
+        self.full_text_search = full_text_search
+        self.blind_indexer = blind_indexer
+
+        self.max_in_flight = max_in_flight
+        self.overflow = overflow
+        self._in_flight = 0
+        self._capacity = asyncio.Condition()
+        self._spill: Optional[SpillFile] = None
+        if overflow == "spill":
+            self._spill = SpillFile(Path(spill_path) if spill_path else self.db_path.with_name(self.db_path.name + ".spill"))
+        # (enqueued_at, spool segment, spooled records, commit waiter) per queued batch, in queue order
+        self._enqueue_entries: Deque[Tuple[float, Optional[int], int, Optional[asyncio.Future]]] = deque()
+        self.spool_path = Path(spool_path) if spool_path else self.db_path.with_name(self.db_path.name + ".spool")
+        self._spool: Optional[Spool] = None
+        self.use_spool = spool
+        self.drain_timeout = drain_timeout
+        self._commit_feed = CommitFeed(log)
+        self.raw_data_codec = raw_data_codec
+        self._chat_cache: Dict[str, int] = {}
+        self.retention = retention
+        self._retention_task: Optional[asyncio.Task] = None
+        self.last_retention_report: Optional[Dict[str, Any]] = None
+        # Keeps writer batches, retention deletes and the other direct commits, which share the
+        # connection, in separate transactions
+        self._txn_lock = asyncio.Lock()
+        self.batch_controller = batch_controller
+        if batch_controller is not None:
+            self.batch_size = batch_controller.batch_size
+            self.flush_interval = batch_controller.flush_interval
+        self._queue_metrics: Dict[str, int] = {"enqueued": 0, "high_water": 0, "dropped": 0, "spilled": 0, "blocked": 0}
 
     async def init_db(self, **kwargs) -> None:
         """Initialize SQLite connection asynchronously."""
@@ -59,12 +337,242 @@ class SQLITE_DB(StorageInterface):
             self.db_path.parent.mkdir(parents=True, exist_ok=True)
             self._conn = await aiosqlite.connect(str(self.db_path))
             self._conn.row_factory = aiosqlite.Row
+            if self.retention is not None:
+                # Only takes effect before the first table is created, i.e. for new files
+                await self._conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            await self._apply_profile()
+            await self._open_read_pool()
+            await self._warm_seen_index()
+            if self.use_spool and self._spool is None:
+                # Replayed at the end of create_table, once migrations and codecs are in place
+                self._spool = Spool(self.spool_path)
             self.log.info(f"SQLite DB initialized at: {self.db_path}")
         except Exception as e:
             raise StorageError(f"Failed to initialize SQLite DB: {e}") from e
 
+    async def _apply_profile(self) -> None:
+        """Apply the PRAGMAs of the selected profile on the connection."""
+        for name, value in PRAGMA_PROFILES[self.profile]["pragmas"].items():
+            await self._conn.execute(f"PRAGMA {name} = {value}")
+        self.log.debug(f"SQLite profile '{self.profile}' applied.")
+
+    async def _open_read_pool(self) -> None:
+        """Open the read-only pool when the database is a WAL file."""
+        pragmas = PRAGMA_PROFILES[self.profile]["pragmas"]
+        if self.read_pool_size <= 0 or pragmas.get("journal_mode") != "WAL" or str(self.db_path) == ":memory:":
+            return
+
+        self._read_pool = ReadPool(
+            db_path=self.db_path,
+            log=self.log,
+            size=self.read_pool_size,
+            pragmas={k: v for k, v in pragmas.items() if k not in _WRITER_ONLY_PRAGMAS}
+        )
+        await self._read_pool.open()
+
+    @asynccontextmanager
+    async def acquire_reader(self, timeout: Optional[float] = None) -> AsyncIterator[aiosqlite.Connection]:
+        """
+        Borrow a connection for read queries.
+
+        Uses the read-only pool (bounded by read_pool_size, waiting up to `timeout`)
+        and falls back to the writer connection when no pool is open.
+        """
+        if self._read_pool is not None:
+            async with self._read_pool.acquire(timeout=timeout) as conn:
+                yield conn
+        else:
+            if not self._conn:
+                raise StorageError("Database not initialized.")
+            yield self._conn
+
+    def _sync_connection(self) -> sqlite3.Connection:
+        """Lazily opened connection reused by the synchronous read helpers."""
+        if self._sync_conn is None:
+            self._sync_conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            self._sync_conn.row_factory = sqlite3.Row
+        return self._sync_conn
+
+    async def _checkpoint_loop(self, interval: float) -> None:
+        """Periodically move WAL frames back into the main database without blocking readers."""
+        while self._running:
+            await asyncio.sleep(interval)
+            try:
+                await self._checkpoint("PASSIVE")
+            except Exception as e:
+                self.log.warning(f"WAL checkpoint failed: {e}")
+
+    async def _checkpoint(self, mode: str = "PASSIVE") -> Optional[Tuple[int, int, int]]:
+        """Run a WAL checkpoint, returns (busy, wal_frames, checkpointed_frames)."""
+        if not self._conn or PRAGMA_PROFILES[self.profile]["pragmas"].get("journal_mode") != "WAL":
+            return None
+        cursor = await self._conn.execute(f"PRAGMA wal_checkpoint({mode})")
+        row = await cursor.fetchone()
+        return tuple(row) if row else None
+
+    async def _retention_loop(self, interval: float) -> None:
+        """Periodically enforce the retention policy."""
+        while self._running:
+            await asyncio.sleep(interval)
+            try:
+                report = await self.enforce_retention()
+                if report["deleted"]:
+                    self.log.info(f"Retention: {report}")
+            except Exception as e:
+                self.log.warning(f"Retention run failed: {e}")
+
+    async def enforce_retention(self) -> Dict[str, Any]:
+        """
+        Apply the retention policy once: delete expired / excess rows oldest first in
+        batch_size transactions, then release free pages and truncate the WAL.
+
+        Returns:
+            Rows deleted per limit ("expired", "chat_overflow", "size_overflow") and in total,
+            reclaimed_bytes (database + WAL file size before minus after) and duration
+
+        Raises:
+            StorageError: If no policy is configured or the database is not initialized
+        """
+        policy = self.retention
+        if policy is None:
+            raise StorageError("No retention policy configured.")
+        if not self._conn:
+            raise StorageError("Database not initialized.")
+
+        started = time.perf_counter()
+        size_before = self._file_bytes()
+        report: Dict[str, Any] = {"expired": 0, "chat_overflow": 0, "size_overflow": 0}
+
+        if policy.max_age is not None:
+            report["expired"] = await self._delete_oldest(
+                "system_hit_time < ?", (time.time() - policy.max_age,)
+            )
+
+        if policy.max_rows_per_chat is not None:
+            cursor = await self._conn.execute(
+                "SELECT id, message_count FROM chats WHERE message_count > ?", (policy.max_rows_per_chat,)
+            )
+            for ref, count in await cursor.fetchall():
+                report["chat_overflow"] += await self._delete_oldest(
+                    "chat_ref = ?", (ref,), limit=count - policy.max_rows_per_chat
+                )
+
+        if policy.max_bytes is not None:
+            while await self._used_bytes() > policy.max_bytes:
+                deleted = await self._delete_oldest(limit=policy.batch_size)
+                if not deleted:
+                    break
+                report["size_overflow"] += deleted
+
+        report["deleted"] = report["expired"] + report["chat_overflow"] + report["size_overflow"]
+        await self._reclaim_space()
+        report["reclaimed_bytes"] = max(size_before - self._file_bytes(), 0)
+        report["duration"] = time.perf_counter() - started
+        self.last_retention_report = report
+        return report
+
+    async def _delete_oldest(self, where: str = "", params: tuple = (), limit: Optional[int] = None) -> int:
+        """Delete matching rows oldest first, one short transaction per batch. Returns rows deleted."""
+        policy = self.retention
+        sql = f"SELECT id, message_id FROM messages{f' WHERE {where}' if where else ''} ORDER BY id LIMIT ?"
+        deleted = 0
+        while limit is None or deleted < limit:
+            size = policy.batch_size if limit is None else min(policy.batch_size, limit - deleted)
+            async with self._txn_lock:
+                cursor = await self._conn.execute(sql, (*params, size))
+                rows = await cursor.fetchall()
+                if not rows:
+                    break
+                # FTS, blind index and chat summary triggers clean up after each row
+                await self._conn.execute(
+                    "DELETE FROM messages WHERE id IN (SELECT value FROM json_each(?))",
+                    (json.dumps([row[0] for row in rows]),)
+                )
+                await self._conn.commit()
+            if self.seen_index is not None:
+                self.seen_index.discard_many(row[1] for row in rows)
+            deleted += len(rows)
+            if len(rows) < size:
+                break
+            await asyncio.sleep(policy.pause)
+        return deleted
+
+    async def _used_bytes(self) -> int:
+        """Bytes of the database pages holding data (free pages excluded)."""
+        values = []
+        for pragma in ("page_count", "freelist_count", "page_size"):
+            cursor = await self._conn.execute(f"PRAGMA {pragma}")
+            values.append((await cursor.fetchone())[0])
+        page_count, freelist, page_size = values
+        return (page_count - freelist) * page_size
+
+    def _file_bytes(self) -> int:
+        """Size of the database file plus its WAL."""
+        if str(self.db_path) == ":memory:":
+            return 0
+        total = 0
+        for path in (self.db_path, self.db_path.with_name(self.db_path.name + "-wal")):
+            try:
+                total += path.stat().st_size
+            except FileNotFoundError:
+                pass
+        return total
+
+    async def _reclaim_space(self) -> None:
+        """Return free pages to the OS (auto_vacuum=INCREMENTAL files only) and truncate the WAL."""
+        cursor = await self._conn.execute("PRAGMA auto_vacuum")
+        if (await cursor.fetchone())[0] == 2:
+            while True:
+                cursor = await self._conn.execute("PRAGMA freelist_count")
+                free = (await cursor.fetchone())[0]
+                if not free:
+                    break
+                async with self._txn_lock:
+                    # executescript steps the pragma to completion, execute would free a single page
+                    await self._conn.executescript(f"PRAGMA incremental_vacuum({self.retention.vacuum_pages})")
+                cursor = await self._conn.execute("PRAGMA freelist_count")
+                if (await cursor.fetchone())[0] >= free:
+                    break
+                await asyncio.sleep(self.retention.pause)
+        await self._checkpoint("TRUNCATE")
+
+    async def _warm_seen_index(self) -> None:
+        """Fill the seen index from the newest rows (and the whole table for a Bloom index)."""
+        if self.seen_index is None:
+            return
+
+        if not await self._table_exists(self._ID_TABLE):
+            # Fresh database, an empty Bloom filter covers every stored ID.
+            self.seen_index.warm_bloom([], complete=True)
+            return
+
+        cursor = await self._conn.execute(
+            f"SELECT message_id FROM {self._ID_TABLE} ORDER BY id DESC LIMIT ?",
+            (self.seen_index.capacity,)
+        )
+        recent = [row[0] for row in await cursor.fetchall()]
+        self.seen_index.warm_recent(reversed(recent))
+
+        bloom = self.seen_index.bloom
+        if bloom is not None:
+            cursor = await self._conn.execute(f"SELECT COUNT(*) FROM {self._ID_TABLE}")
+            total = (await cursor.fetchone())[0]
+            if total > bloom.max_items:
+                self.log.info(f"Seen index: {total} rows exceed Bloom capacity, negatives fall through to DB.")
+                return
+
+            cursor = await self._conn.execute(f"SELECT message_id FROM {self._ID_TABLE}")
+            while True:
+                rows = await cursor.fetchmany(5000)
+                if not rows:
+                    break
+                self.seen_index.warm_bloom((row[0] for row in rows), complete=False)
+            self.seen_index.complete = not bloom.saturated
+
+        self.log.debug(f"Seen index warmed: {self.seen_index.stats()}")
+
     async def create_table(self, **kwargs) -> None:
-        """Create messages table if not exists."""
+        """Create messages table if not exists and migrate the schema to the latest version."""
         if not self._conn:
             raise StorageError("Database not initialized. Call init_db() first.")
 
@@ -83,17 +591,192 @@ class SQLITE_DB(StorageInterface):
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
         """
-        index_sql = """
-        CREATE INDEX IF NOT EXISTS idx_message_id ON messages(message_id);
+        watermark_sql = """
+        CREATE TABLE IF NOT EXISTS chat_watermarks (
+            chat_id TEXT PRIMARY KEY,
+            last_data_id TEXT NOT NULL,
+            dom_position INTEGER,
+            updated_at REAL
+        );
+        """
+        backfill_sql = """
+        CREATE TABLE IF NOT EXISTS chat_backfill (
+            chat_id TEXT PRIMARY KEY,
+            oldest_data_id TEXT,
+            collected INTEGER NOT NULL DEFAULT 0,
+            complete INTEGER NOT NULL DEFAULT 0,
+            updated_at REAL
+        );
         """
         try:
             await self._conn.execute(table_sql)
-            await self._conn.execute(index_sql)
+            await self._conn.execute(watermark_sql)
+            await self._conn.execute(backfill_sql)
+            await self._migrate()
+            await self._sync_fts()
+            if self.blind_indexer is not None:
+                for statement in _BLIND_INDEX_SCHEMA:
+                    await self._conn.execute(statement)
+            if self.raw_data_codec is not None:
+                await self._load_codec_dictionaries()
             await self._conn.commit()
             self.log.info("Messages table created/verified.")
         except Exception as e:
             raise StorageError(f"Failed to create table: {e}") from e
 
+        await self._replay_spool()
+
+    async def _table_exists(self, name: str) -> bool:
+        cursor = await self._conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+        return await cursor.fetchone() is not None
+
+    async def _replay_spool(self) -> None:
+        """Insert records a previous run spooled but never committed."""
+        if self._spool is None:
+            return
+
+        records = await asyncio.to_thread(self._spool.read_leftovers)
+        for start in range(0, len(records), self.batch_size):
+            await self._insert_records(records[start:start + self.batch_size])
+        self._spool.discard_leftovers()
+        if records:
+            self.log.info(f"Replayed {len(records)} spooled messages.")
+
+    async def _migrate(self) -> None:
+        """Apply pending _SCHEMA_MIGRATIONS and bump PRAGMA user_version."""
+        cursor = await self._conn.execute("PRAGMA user_version")
+        row = await cursor.fetchone()
+        version = row[0] if row else 0
+
+        for target, statements in _SCHEMA_MIGRATIONS:
+            if target <= version:
+                continue
+            for statement in statements:
+                await self._conn.execute(statement)
+            await self._conn.execute(f"PRAGMA user_version = {target}")
+            version = target
+            self.log.info(f"SQLite schema migrated to version {target}.")
+
+    async def _sync_fts(self) -> None:
+        """Create (and backfill) or drop the FTS5 index according to full_text_search."""
+        cursor = await self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'"
+        )
+        exists = await cursor.fetchone() is not None
+
+        if not self.full_text_search:
+            if exists:
+                for statement in _FTS_DROP:
+                    await self._conn.execute(statement)
+                self.log.info("Full-text index dropped.")
+            return
+
+        for statement in _FTS_SCHEMA:
+            await self._conn.execute(statement)
+        if not exists:
+            await self._conn.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+            self.log.info("Full-text index created.")
+
+    async def _load_codec_dictionaries(self) -> None:
+        """Create the dictionary metadata table and hand every stored version to the codec."""
+        await self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS codec_dictionaries (
+            version INTEGER PRIMARY KEY,
+            algorithm TEXT NOT NULL,
+            dictionary BLOB NOT NULL,
+            sample_rows INTEGER,
+            created_at REAL
+        )
+        """)
+        cursor = await self._conn.execute("SELECT version, dictionary FROM codec_dictionaries ORDER BY version")
+        for version, dictionary in await cursor.fetchall():
+            self.raw_data_codec.load(version, dictionary)
+
+    async def train_raw_data_dictionary(self, sample_size: int = 5000, dict_size: int = 16 * 1024) -> int:
+        """
+        Train a new compression dictionary on the most recent rows and make it current.
+        Rows written earlier keep decoding with their own version.
+
+        Returns:
+            The new dictionary version
+
+        Raises:
+            StorageError: If no codec is configured or there is too little data to train on
+        """
+        if self.raw_data_codec is None:
+            raise StorageError("raw_data compression is not enabled for this database.")
+        if not self._conn:
+            raise StorageError("Database not initialized.")
+
+        cursor = await self._conn.execute(
+            "SELECT raw_data FROM messages WHERE raw_data IS NOT NULL AND raw_data != '' ORDER BY id DESC LIMIT ?",
+            (sample_size,)
+        )
+        samples = [self.raw_data_codec.decode(row[0]) for row in await cursor.fetchall()]
+        try:
+            dictionary = await asyncio.to_thread(self.raw_data_codec.train, samples, dict_size)
+        except ValueError as e:
+            raise StorageError(str(e)) from e
+
+        async with self._txn_lock:
+            cursor = await self._conn.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM codec_dictionaries")
+            version = (await cursor.fetchone())[0]
+            await self._conn.execute(
+                "INSERT INTO codec_dictionaries (version, algorithm, dictionary, sample_rows, created_at) VALUES (?, 'zstd', ?, ?, ?)",
+                (version, dictionary, len(samples), time.time())
+            )
+            await self._conn.commit()
+        self.raw_data_codec.load(version, dictionary)
+        self.log.info(f"Trained raw_data dictionary v{version} ({len(dictionary)} bytes) on {len(samples)} rows.")
+        return version
+
+    async def recompress_raw_data(self, batch_size: int = 1000) -> int:
+        """
+        Rewrite rows not encoded with the current dictionary, in small transactions.
+
+        Returns:
+            Number of rows rewritten
+        """
+        codec = self.raw_data_codec
+        if codec is None or codec.current_version is None or not self._conn:
+            return 0
+
+        current_prefix = b"Z" + codec.current_version.to_bytes(2, "big")
+        last_id, rewritten = 0, 0
+        while True:
+            cursor = await self._conn.execute(
+                "SELECT id, raw_data FROM messages WHERE id > ? AND raw_data IS NOT NULL ORDER BY id LIMIT ?",
+                (last_id, batch_size)
+            )
+            rows = await cursor.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            updates = []
+            for row_id, value in rows:
+                if isinstance(value, bytes) and value[:3] == current_prefix:
+                    continue
+                encoded = codec.encode(codec.decode(value))
+                if encoded != value:
+                    updates.append((encoded, row_id))
+            if updates:
+                async with self._txn_lock:
+                    await self._conn.executemany("UPDATE messages SET raw_data = ? WHERE id = ?", updates)
+                    await self._conn.commit()
+                rewritten += len(updates)
+        return rewritten
+
+    def _decode_raw(self, value: Any) -> Any:
+        return self.raw_data_codec.decode(value) if self.raw_data_codec is not None else value
+
+    def _row_dict(self, row: Any) -> Dict[str, Any]:
+        """Row as dict with raw_data decoded."""
+        data = dict(row)
+        if self.raw_data_codec is not None and "raw_data" in data:
+            data["raw_data"] = self.raw_data_codec.decode(data["raw_data"])
+        return data
+
     async def start_writer(self, **kwargs) -> None:
         """Start background task to consume queue and write batches."""
         if self._writer_task and not self._writer_task.done():
@@ -102,55 +785,233 @@ class SQLITE_DB(StorageInterface):
 
         self._running = True
         self._writer_task = asyncio.create_task(self._writer_loop())
+
+        interval = PRAGMA_PROFILES[self.profile]["checkpoint_interval"]
+        if interval and (self._checkpoint_task is None or self._checkpoint_task.done()):
+            self._checkpoint_task = asyncio.create_task(self._checkpoint_loop(interval))
+        if self.retention is not None and (self._retention_task is None or self._retention_task.done()):
+            self._retention_task = asyncio.create_task(self._retention_loop(self.retention.interval))
         self.log.info("Background writer started.")
 
     async def _writer_loop(self) -> None:
         """Background loop that consumes queue and writes batches."""
+        loop = asyncio.get_event_loop()
         batch: List[MessageInterface] = []
-        last_flush = asyncio.get_event_loop().time()
+        batch_started: Optional[float] = None
 
-        while self._running:
-            try:
+        segments: List[Tuple[int, int]] = []
+        waiters: List[asyncio.Future] = []
+
+        try:
+            # After close_db clears _running, keep going until the queue is drained
+            while self._running or not self.queue.empty():
                 try:
-                    msg = await asyncio.wait_for(
-                        self.queue.get(),
-                        timeout=self.flush_interval
+                    # Wait at most until the oldest row of the batch is due
+                    timeout = self.flush_interval
+                    if batch_started is not None:
+                        timeout = max(0.0, batch_started + self.flush_interval - loop.time())
+                    try:
+                        msg = await asyncio.wait_for(self.queue.get(), timeout=timeout)
+                        self.queue.task_done()
+                        if msg is not None:  # None only wakes the loop up (close_db)
+                            enqueued_at, segment, spooled, waiter = (
+                                self._enqueue_entries.popleft() if self._enqueue_entries else (loop.time(), None, 0, None)
+                            )
+                            if batch_started is None:
+                                batch_started = enqueued_at
+                            if segment is not None:
+                                segments.append((segment, spooled))
+                            if waiter is not None:
+                                waiters.append(waiter)
+                            if isinstance(msg, list):
+                                batch.extend(msg)
+                            else:
+                                batch.append(msg)
+                    except asyncio.TimeoutError:
+                        pass
+
+                    current_time = loop.time()
+                    should_flush = (
+                            len(batch) >= self.batch_size or
+                            not self._running or
+                            (batch and current_time - batch_started >= self.flush_interval)
                     )
-                    if isinstance(msg, list):
-                        batch.extend(msg)
-                    else:
-                        batch.append(msg)
-                    self.queue.task_done()
-                except asyncio.TimeoutError:
-                    pass
 
-                current_time = asyncio.get_event_loop().time()
-                should_flush = (
-                        len(batch) >= self.batch_size or
-                        (batch and current_time - last_flush >= self.flush_interval)
-                )
+                    if should_flush and batch:
+                        await self._flush(batch, batch_started, segments, waiters)
+                        batch, batch_started, segments, waiters = [], None, [], []
+                    elif not batch and self.queue.empty() and self._running:
+                        await self._replay_spill()
 
-                if should_flush and batch:
-                    await self._insert_batch_internally(batch)
-                    batch.clear()
-                    last_flush = current_time
+                except Exception as e:
+                    self.log.error(f"Writer loop error: {e}", exc_info=True)
+                    await asyncio.sleep(1)
 
-            except Exception as e:
-                self.log.error(f"Writer loop error: {e}", exc_info=True)
-                await asyncio.sleep(1)
+            if batch:
+                await self._flush(batch, batch_started, segments, waiters)
+        finally:
+            # Cancelled by close_db: whoever waits on the batch in hand must not hang
+            self._resolve_waiters(waiters, StorageError("Writer stopped before the batch was committed"))
 
-        if batch:
+    async def _flush(
+            self,
+            batch: List[MessageInterface],
+            batch_started: Optional[float],
+            segments: Optional[List[Tuple[int, int]]] = None,
+            waiters: Optional[List[asyncio.Future]] = None
+    ) -> None:
+        """
+        Commit a writer batch, advance the spool, release its capacity and feed the batch controller.
+        Callers waiting on the batch are woken once it is committed. When it fails they get the
+        error right away (and are dropped) while the writer keeps retrying the batch.
+        """
+        loop = asyncio.get_event_loop()
+        started = loop.time()
+        try:
             await self._insert_batch_internally(batch)
+        except Exception as e:
+            self._resolve_waiters(waiters or [], e)
+            if waiters:
+                waiters.clear()
+            raise
+        self._resolve_waiters(waiters or [])
+        if self._spool is not None:
+            for segment, count in segments or ():
+                self._spool.ack(segment, count)
+        await self._release(len(batch))
+
+        if self.batch_controller is not None:
+            finished = loop.time()
+            self.batch_controller.record_commit(
+                rows=len(batch),
+                commit_seconds=finished - started,
+                persist_seconds=finished - batch_started if batch_started is not None else None,
+                queue_depth=self._in_flight
+            )
+            self.batch_size = self.batch_controller.batch_size
+            self.flush_interval = self.batch_controller.flush_interval
 
-    async def enqueue_insert(self, msgs: List[MessageInterface], **kwargs) -> None:
-        """Add messages to queue for batch insertion."""
+    async def enqueue_insert(self, msgs: List[MessageInterface], wait: bool = False, **kwargs) -> None:
+        """
+        Add messages to the queue for batch insertion, as one queue item.
+        Applies the overflow policy when max_in_flight would be exceeded.
+
+        With `wait` this returns once the writer committed the batch and raises StorageError if
+        the batch failed or was dropped by the overflow policy. A waiting batch is never spilled
+        ("spill" blocks for it instead), and without a running writer it is committed directly.
+        """
         if not msgs:
             return
 
-        for msg in msgs:
-            await self.queue.put(msg)
+        batch = list(msgs)
+        count = len(batch)
+
+        if wait and (self._writer_task is None or self._writer_task.done()):
+            await self._insert_batch_internally(batch)
+            return
+
+        if self.max_in_flight is not None and self._in_flight + count > self.max_in_flight:
+            if self.overflow == "spill" and not wait:
+                records = self._records(batch)
+                spilled = await asyncio.to_thread(self._spill.append, records)
+                self._queue_metrics["spilled"] += spilled
+                self.log.debug(f"Writer queue full, spilled {spilled} messages to {self._spill.path}.")
+                return
+            if self.overflow == "drop_oldest":
+                self._drop_oldest(count)
+            else:
+                self._queue_metrics["blocked"] += 1
+                async with self._capacity:
+                    # A batch larger than the limit is let through once nothing else is in flight
+                    await self._capacity.wait_for(
+                        lambda: self._in_flight == 0 or self._in_flight + count <= self.max_in_flight
+                    )
+
+        segment, spooled = None, 0
+        if self._spool is not None:
+            records = self._records(batch)
+            segment = await self._spool.append(records)
+            spooled = len(records)
+
+        loop = asyncio.get_event_loop()
+        waiter = loop.create_future() if wait else None
+        await self.queue.put(batch)
+        self._enqueue_entries.append((loop.time(), segment, spooled, waiter))
+        self._in_flight += count
+        self._queue_metrics["enqueued"] += count
+        self._queue_metrics["high_water"] = max(self._queue_metrics["high_water"], self._in_flight)
 
-        self.log.debug(f"Enqueued {len(msgs)} messages for insertion.")
+        self.log.debug(f"Enqueued {count} messages for insertion.")
+        if waiter is not None:
+            await waiter
+
+    @staticmethod
+    def _resolve_waiters(waiters: List[asyncio.Future], error: Optional[BaseException] = None) -> None:
+        """Wake enqueue_insert(wait=True) callers, with StorageError if their batch did not commit."""
+        for waiter in waiters:
+            if waiter.done():
+                continue
+            if error is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(error if isinstance(error, StorageError) else StorageError(str(error)))
+
+    def _drop_oldest(self, incoming: int) -> None:
+        """Discard queued (not yet taken by the writer) batches until `incoming` messages fit."""
+        dropped = 0
+        while self._in_flight + incoming > self.max_in_flight and not self.queue.empty():
+            item = self.queue.get_nowait()
+            self.queue.task_done()
+            if self._enqueue_entries:
+                _, segment, spooled, waiter = self._enqueue_entries.popleft()
+                if segment is not None:
+                    self._spool.ack(segment, spooled)
+                if waiter is not None:
+                    self._resolve_waiters([waiter], StorageError("Batch dropped by the drop_oldest overflow policy"))
+            size = len(item) if isinstance(item, list) else 1
+            self._in_flight = max(0, self._in_flight - size)
+            dropped += size
+
+        if dropped:
+            self._queue_metrics["dropped"] += dropped
+            self.log.warning(f"Writer queue full, dropped {dropped} oldest messages.")
+
+    async def _release(self, count: int) -> None:
+        """Mark `count` in-flight messages as committed and wake blocked producers."""
+        self._in_flight = max(0, self._in_flight - count)
+        async with self._capacity:
+            self._capacity.notify_all()
+
+    async def _replay_spill(self) -> None:
+        """Insert spilled records once the writer is idle."""
+        if self._spill is None or not self._spill.pending:
+            return
+
+        records = await asyncio.to_thread(self._spill.take_all)
+        for start in range(0, len(records), self.batch_size):
+            chunk = records[start:start + self.batch_size]
+            try:
+                await self._insert_records(chunk)
+            except StorageError:
+                await asyncio.to_thread(self._spill.append, records[start:])
+                raise
+        if records:
+            self.log.info(f"Replayed {len(records)} spilled messages.")
+
+    def queue_stats(self) -> Dict[str, Any]:
+        """Writer queue depth, overflow counters and current batching decisions."""
+        return {
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queued_batches": self.queue.qsize(),
+            "overflow": self.overflow,
+            "spill_pending": self._spill.pending if self._spill is not None else 0,
+            "spool_pending": self._spool.pending if self._spool is not None else 0,
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "batch_controller": self.batch_controller.stats() if self.batch_controller is not None else None,
+            **self._queue_metrics,
+        }
 
     async def _insert_batch_internally(self, msgs: List[MessageInterface], **kwargs) -> None:
         """Insert batch of messages into DB."""
@@ -160,31 +1021,155 @@ class SQLITE_DB(StorageInterface):
         if not msgs:
             return
 
-        insert_sql = """
-        INSERT OR IGNORE INTO messages
-        (message_id, raw_data, encrypted_message, encryption_nonce, data_type, direction, parent_chat_name, parent_chat_id, system_hit_time)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
+        await self._insert_records(self._records(msgs))
 
+    def _records(self, msgs: List[MessageInterface]) -> List[tuple]:
+        """Convert messages to record tuples, skipping those that fail."""
         records = []
         for msg in msgs:
             try:
-                record = self._message_to_record(msg)
-                records.append(record)
+                records.append(self._message_to_record(msg))
             except Exception as e:
                 self.log.warning(f"Failed to convert message: {e}")
-                continue
+        return records
+
+    async def _insert_records(self, records: List[tuple]) -> None:
+        """Insert record tuples (see _message_to_record) in one transaction."""
+        if not self._conn:
+            raise StorageError("Database not initialized.")
+
+        insert_sql = """
+        INSERT OR IGNORE INTO messages
+        (message_id, raw_data, encrypted_message, encryption_nonce, data_type, direction, chat_ref, system_hit_time)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """
 
         if not records:
             return
 
-        try:
-            await self._conn.executemany(insert_sql, records)
-            await self._conn.commit()
-            self.log.debug(f"Inserted {len(records)} messages.")
-        except Exception as e:
-            self.log.error(f"Batch insert failed: {e}", exc_info=True)
-            raise StorageError(f"Batch insert failed: {e}") from e
+        # Rows actually inserted (duplicates are ignored) are only read back for subscribers
+        publish = bool(self._commit_feed)
+        async with self._txn_lock:
+            try:
+                if publish:
+                    cursor = await self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM messages")
+                    last_id = (await cursor.fetchone())[0]
+                chat_refs = await self._resolve_chats(records)
+                encode = self.raw_data_codec.encode if self.raw_data_codec is not None else None
+                await self._conn.executemany(insert_sql, [
+                    (r[0], encode(r[1]) if encode else r[1], *r[2:6], chat_refs[self._chat_key(r)], r[8])
+                    for r in records
+                ])
+                if self.blind_indexer is not None:
+                    await self._index_tokens(records)
+                if publish:
+                    cursor = await self._conn.execute(f"{_MESSAGE_SELECT} WHERE m.id > ? ORDER BY m.id", (last_id,))
+                    inserted = [StoredMessage(*row) for row in await cursor.fetchall()]
+                    for message in inserted:
+                        message.raw_data = self._decode_raw(message.raw_data)
+                await self._conn.commit()
+                if self.seen_index is not None:
+                    self.seen_index.add_many(record[0] for record in records)
+                self.log.debug(f"Inserted {len(records)} messages.")
+            except Exception as e:
+                await self._conn.rollback()
+                self._chat_cache.clear()  # ids of chats created in the rolled back transaction are gone
+                self.log.error(f"Batch insert failed: {e}", exc_info=True)
+                raise StorageError(f"Batch insert failed: {e}") from e
+
+        if publish and inserted:
+            self._commit_feed.publish(inserted)
+
+    @staticmethod
+    def _chat_key(record: tuple) -> str:
+        """Unique chat key of a record: its chat id, or the name when there is no id."""
+        return record[7] or record[6]
+
+    async def _resolve_chats(self, records: List[tuple]) -> Dict[str, int]:
+        """Integer chats.id for every chat of the records, through the in-memory cache."""
+        refs: Dict[str, int] = {}
+        missing: Dict[str, str] = {}
+        for record in records:
+            key = self._chat_key(record)
+            if key in self._chat_cache:
+                refs[key] = self._chat_cache[key]
+            else:
+                missing[key] = record[6]
+
+        if missing:
+            await self._conn.executemany(
+                "INSERT OR IGNORE INTO chats (chat_id, chat_name) VALUES (?, ?)",
+                list(missing.items())
+            )
+            cursor = await self._conn.execute(
+                "SELECT chat_id, id FROM chats WHERE chat_id IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(missing)),)
+            )
+            for chat_id, ref in await cursor.fetchall():
+                self._chat_cache[chat_id] = refs[chat_id] = ref
+        return refs
+
+    async def get_chat_summaries(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Per-chat message count and first / last seen time, most recently active first.
+        Read from the chats table, which inserts keep up to date, without scanning messages.
+        """
+        if not self._conn:
+            return []
+        sql = ("SELECT chat_id, chat_name, message_count, first_seen, last_seen FROM chats "
+               "ORDER BY last_seen DESC LIMIT ?")
+        async with self.acquire_reader() as conn:
+            cursor = await conn.execute(sql, (limit if limit is not None else -1,))
+            return [dict(row) for row in await cursor.fetchall()]
+
+    async def get_chat_summary(self, chat_id: str) -> Optional[Dict[str, Any]]:
+        """Summary of one chat by chat id, None if it has no stored messages."""
+        if not self._conn:
+            return None
+        async with self.acquire_reader() as conn:
+            cursor = await conn.execute(
+                "SELECT chat_id, chat_name, message_count, first_seen, last_seen FROM chats WHERE chat_id = ?",
+                (chat_id,)
+            )
+            row = await cursor.fetchone()
+        return dict(row) if row else None
+
+    def subscribe(self, maxsize: int = 1000, callback: Optional[CommitCallback] = None) -> Subscription:
+        """
+        Receive every committed batch as a CommitEvent (newly inserted rows only).
+
+        Args:
+            maxsize: Events buffered for this subscriber, the oldest are dropped beyond that
+            callback: Called (or awaited) per event from its own task, instead of `async for`
+
+        Returns:
+            Subscription to iterate; close() it to unsubscribe, stats() reports its lag
+        """
+        return self._commit_feed.subscribe(maxsize=maxsize, callback=callback)
+
+    def subscriber_stats(self) -> List[Dict[str, Any]]:
+        """Buffer depth, drops and lag of every subscriber."""
+        return self._commit_feed.stats()
+
+    async def _index_tokens(self, records: List[tuple]) -> None:
+        """Write blind index tokens of the given records, inside the insert transaction."""
+        texts = {record[0]: record[1] for record in records if record[1]}
+        if not texts:
+            return
+
+        cursor = await self._conn.execute(
+            "SELECT id, message_id FROM messages WHERE message_id IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(texts)),)
+        )
+        rows = await cursor.fetchall()
+        await self._conn.executemany(
+            "INSERT OR IGNORE INTO message_tokens (token, message_rowid) VALUES (?, ?)",
+            [
+                (token, row_id)
+                for row_id, message_id in rows
+                for token in self.blind_indexer.message_tokens(texts[message_id])
+            ]
+        )
 
     def _message_to_record(self, msg: MessageInterface) -> tuple:
         """Convert MessageInterface to database record tuple."""
@@ -218,9 +1203,9 @@ class SQLITE_DB(StorageInterface):
     def check_message_if_exists(self, msg_id: str, **kwargs) -> bool:
         """Check if message exists by ID (synchronous for quick checks)."""
         try:
-            with sqlite3.connect(str(self.db_path)) as conn:
-                cursor = conn.execute(
-                    "SELECT 1 FROM messages WHERE message_id = ? LIMIT 1",
+            with self._sync_lock:
+                cursor = self._sync_connection().execute(
+                    f"SELECT 1 FROM {self._ID_TABLE} WHERE message_id = ? LIMIT 1",
                     (msg_id,)
                 )
                 return cursor.fetchone() is not None
@@ -230,40 +1215,82 @@ class SQLITE_DB(StorageInterface):
 
     async def check_message_if_exists_async(self, msg_id: str) -> bool:
         """Async version of existence check."""
+        if self.seen_index is not None and msg_id in self.seen_index:
+            return True
         if not self._conn:
             return False
 
         try:
-            cursor = await self._conn.execute(
-                "SELECT 1 FROM messages WHERE message_id = ? LIMIT 1",
-                (msg_id,)
-            )
-            row = await cursor.fetchone()
+            async with self.acquire_reader() as conn:
+                cursor = await conn.execute(
+                    f"SELECT 1 FROM {self._ID_TABLE} WHERE message_id = ? LIMIT 1",
+                    (msg_id,)
+                )
+                row = await cursor.fetchone()
             return row is not None
         except Exception as e:
             self.log.error(f"Async existence check failed: {e}")
             return False
 
+    async def filter_new(self, msg_ids: Iterable[str], **kwargs) -> Set[str]:
+        """
+        Return the subset of msg_ids not stored yet, in a single query on the async connection.
+        On failure every id is treated as new (inserts are INSERT OR IGNORE anyway).
+        """
+        ids = list(dict.fromkeys(msg_ids))
+        if not ids:
+            return set()
+
+        new: Set[str] = set()
+        if self.seen_index is not None:
+            _, new, uncertain = self.seen_index.partition(ids)
+            ids = [i for i in ids if i in uncertain]
+            if not ids:
+                return new
+
+        if not self._conn:
+            return new | set(ids)
+
+        try:
+            async with self.acquire_reader() as conn:
+                cursor = await conn.execute(
+                    f"""
+                    SELECT j.value FROM json_each(?) AS j
+                    WHERE NOT EXISTS (SELECT 1 FROM {self._ID_TABLE} m WHERE m.message_id = j.value)
+                    """,
+                    (json.dumps(ids),)
+                )
+                rows = await cursor.fetchall()
+            return new | {row[0] for row in rows}
+        except Exception as e:
+            self.log.error(f"Bulk existence check failed: {e}")
+            return new | set(ids)
+
     def get_all_messages(self, **kwargs) -> List[Dict[str, Any]]:
-        """Retrieve all messages from DB (synchronous)."""
+        """
+        Retrieve all messages from DB (synchronous).
+        limit/offset paging is kept for compatibility, deep pages should use get_messages_page.
+        """
         limit = kwargs.get('limit', 1000)
         offset = kwargs.get('offset', 0)
 
         try:
-            with sqlite3.connect(str(self.db_path)) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.execute(
-                    "SELECT * FROM messages ORDER BY id DESC LIMIT ? OFFSET ?",
+            with self._sync_lock:
+                cursor = self._sync_connection().execute(
+                    f"{_MESSAGE_SELECT} ORDER BY m.id DESC LIMIT ? OFFSET ?",
                     (limit, offset)
                 )
                 rows = cursor.fetchall()
-                return [dict(row) for row in rows]
+            return [self._row_dict(row) for row in rows]
         except Exception as e:
             self.log.error(f"Get all messages failed: {e}")
             return []
 
     async def get_all_messages_async(self, **kwargs) -> List[Dict[str, Any]]:
-        """Async version of get all messages."""
+        """
+        Async version of get all messages.
+        limit/offset paging is kept for compatibility, deep pages should use get_messages_page.
+        """
         if not self._conn:
             return []
 
@@ -271,16 +1298,312 @@ class SQLITE_DB(StorageInterface):
         offset = kwargs.get('offset', 0)
 
         try:
-            cursor = await self._conn.execute(
-                "SELECT * FROM messages ORDER BY id DESC LIMIT ? OFFSET ?",
-                (limit, offset)
-            )
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+            async with self.acquire_reader() as conn:
+                cursor = await conn.execute(
+                    f"{_MESSAGE_SELECT} ORDER BY m.id DESC LIMIT ? OFFSET ?",
+                    (limit, offset)
+                )
+                rows = await cursor.fetchall()
+            return [self._row_dict(row) for row in rows]
         except Exception as e:
             self.log.error(f"Async get all messages failed: {e}")
             return []
 
+    async def get_messages_page(
+            self,
+            cursor: Optional[str] = None,
+            limit: int = 100,
+            chat_name: Optional[str] = None,
+            since: Optional[float] = None,
+            until: Optional[float] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Keyset-paginated message listing, newest first.
+
+        Unlike the LIMIT/OFFSET of get_all_messages*, every page costs the same
+        regardless of how deep it is.
+
+        Args:
+            cursor: Opaque cursor from the previous page, None for the first page
+            limit: Max rows per page
+            chat_name: Only messages of this chat
+            since: Only messages with system_hit_time >= since
+            until: Only messages with system_hit_time < until
+
+        Returns:
+            (rows, next_cursor), next_cursor is None on the last page
+
+        Raises:
+            StorageError: If the cursor is malformed
+        """
+        if not self._conn:
+            return [], None
+
+        before_id = self._decode_cursor(cursor) if cursor else None
+
+        try:
+            async with self.acquire_reader() as conn:
+                where, params = self._message_filters(
+                    before_id=before_id,
+                    chat_refs=await self._chat_refs(conn, chat_name),
+                    since=since,
+                    until=until
+                )
+                params.append(limit + 1)
+                cur = await conn.execute(f"{_MESSAGE_SELECT}{where} ORDER BY m.id DESC LIMIT ?", params)
+                rows = [self._row_dict(row) for row in await cur.fetchall()]
+        except Exception as e:
+            self.log.error(f"Get messages page failed: {e}")
+            return [], None
+
+        if len(rows) > limit:
+            rows = rows[:limit]
+            return rows, self._encode_cursor(rows[-1]["id"])
+        return rows, None
+
+    async def search(
+            self,
+            query: str,
+            chat_name: Optional[str] = None,
+            limit: int = 20,
+            cursor: Optional[str] = None,
+            raw_query: bool = False
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Ranked full-text search over raw_data (requires full_text_search=True).
+
+        Args:
+            query: Words to match (all must appear), or an FTS5 expression with raw_query=True
+            chat_name: Only messages of this chat
+            limit: Max results per page
+            cursor: Opaque cursor from the previous page
+
+        Returns:
+            (results, next_cursor), each result has id, message_id, parent_chat_name,
+            direction, system_hit_time, snippet and rank (lower is better)
+
+        Raises:
+            StorageError: If full-text search is disabled, or the query / cursor is malformed
+        """
+        if not self.full_text_search:
+            raise StorageError("Full-text search is disabled for this database.")
+        if not self._conn:
+            return [], None
+
+        match = query if raw_query else " ".join(
+            '"' + term.replace('"', '""') + '"' for term in query.split()
+        )
+        if not match:
+            return [], None
+
+        offset = self._decode_cursor(cursor, key="offset") if cursor else 0
+        sql = """
+        SELECT m.id, m.message_id, c.chat_name AS parent_chat_name, m.direction, m.system_hit_time,
+               snippet(messages_fts, 0, '[', ']', '...', 12) AS snippet,
+               bm25(messages_fts) AS rank
+        FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid
+        LEFT JOIN chats c ON c.id = m.chat_ref
+        WHERE messages_fts MATCH ?
+        """
+        params: List[Any] = [match]
+
+        try:
+            async with self.acquire_reader() as conn:
+                if chat_name is not None:
+                    clause, refs = self._chat_ref_clause(await self._chat_refs(conn, chat_name))
+                    sql += f" AND {clause}"
+                    params.extend(refs)
+                sql += " ORDER BY rank LIMIT ? OFFSET ?"
+                params.extend([limit + 1, offset])
+                cur = await conn.execute(sql, params)
+                rows = [self._row_dict(row) for row in await cur.fetchall()]
+        except sqlite3.OperationalError as e:
+            raise StorageError(f"Full-text search failed: {e}") from e
+
+        if len(rows) > limit:
+            return rows[:limit], self._encode_cursor(offset + limit, key="offset")
+        return rows, None
+
+    async def search_encrypted(
+            self,
+            query: str,
+            decryptor: Optional[MessageDecryptor] = None,
+            chat_name: Optional[str] = None,
+            exact: bool = False,
+            limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """
+        Keyword (or whole-message equality) lookup through the blind index.
+        Candidate rows come from an indexed join on message_tokens, only those are decrypted.
+
+        Args:
+            query: Words that must all appear, or the whole message with exact=True
+            decryptor: Decrypts the matches into a "text" key, rows that fail to decrypt are dropped
+            chat_name: Only messages of this chat
+            exact: Match the whole normalised message instead of keywords
+            limit: Max rows returned, newest first
+
+        Returns:
+            Matching message rows
+
+        Raises:
+            StorageError: If no blind indexer is configured
+        """
+        if self.blind_indexer is None:
+            raise StorageError("Blind index is not enabled for this database.")
+        if not self._conn:
+            return []
+
+        tokens = [self.blind_indexer.exact_token(query)] if exact else self.blind_indexer.query_tokens(query)
+        tokens = list(dict.fromkeys(tokens))
+        if not tokens:
+            return []
+
+        placeholders = ", ".join("?" for _ in tokens)
+        sql = f"""
+        {_MESSAGE_SELECT}
+        JOIN (
+            SELECT message_rowid FROM message_tokens
+            WHERE token IN ({placeholders})
+            GROUP BY message_rowid HAVING COUNT(*) = ?
+        ) t ON t.message_rowid = m.id
+        """
+        params: List[Any] = [*tokens, len(tokens)]
+
+        async with self.acquire_reader() as conn:
+            if chat_name is not None:
+                clause, refs = self._chat_ref_clause(await self._chat_refs(conn, chat_name))
+                sql += f" WHERE {clause}"
+                params.extend(refs)
+            sql += " ORDER BY m.id DESC LIMIT ?"
+            params.append(limit)
+            cursor = await conn.execute(sql, params)
+            rows = [self._row_dict(row) for row in await cursor.fetchall()]
+
+        if decryptor is None:
+            return rows
+
+        matches = []
+        for row in rows:
+            if not row["encrypted_message"] or not row["encryption_nonce"]:
+                continue
+            # MessageProcessor authenticates the platform data id, the part after the "<platform>-msg::" prefix
+            data_id = row["message_id"].split("::", 1)[-1]
+            text = decryptor.decrypt_safe(row["encryption_nonce"], row["encrypted_message"], data_id.encode("utf-8"))
+            if text is not None:
+                row["text"] = text
+                matches.append(row)
+        return matches
+
+    async def iter_messages(
+            self,
+            chunk_size: int = 500,
+            row_format: Literal["dict", "tuple", "record"] = "dict",
+            newest_first: bool = False,
+            chat_name: Optional[str] = None,
+            since: Optional[float] = None,
+            until: Optional[float] = None
+    ) -> AsyncIterator[Union[Dict[str, Any], Tuple[Any, ...], StoredMessage]]:
+        """
+        Stream stored messages with fetchmany, keeping at most `chunk_size` rows in memory.
+
+        Args:
+            chunk_size: Rows pulled per fetchmany call
+            row_format: "dict", "tuple" (STORED_MESSAGE_COLUMNS order) or "record" (StoredMessage)
+            newest_first: Order by id descending instead of insertion order
+            chat_name / since / until: Same filters as get_messages_page
+
+        Holds one read connection for the whole iteration, when breaking out early
+        close the iterator (e.g. contextlib.aclosing) to hand it back right away.
+        """
+        if row_format not in ("dict", "tuple", "record"):
+            raise ValueError(f"Unknown row_format: {row_format}")
+        if not self._conn:
+            return
+
+        async with self.acquire_reader() as conn:
+            where, params = self._message_filters(
+                chat_refs=await self._chat_refs(conn, chat_name), since=since, until=until
+            )
+            sql = f"{_MESSAGE_SELECT}{where} ORDER BY m.id {'DESC' if newest_first else 'ASC'}"
+            cursor = await conn.execute(sql, params)
+            try:
+                while True:
+                    rows = await cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        if self.raw_data_codec is not None:
+                            row = (*row[:2], self.raw_data_codec.decode(row[2]), *row[3:])
+                        if row_format == "record":
+                            yield StoredMessage(*row)
+                        elif row_format == "tuple":
+                            yield tuple(row)
+                        else:
+                            yield dict(zip(STORED_MESSAGE_COLUMNS, row))
+            finally:
+                await cursor.close()
+
+    @staticmethod
+    def _message_filters(
+            before_id: Optional[int] = None,
+            chat_refs: Optional[List[int]] = None,
+            since: Optional[float] = None,
+            until: Optional[float] = None
+    ) -> Tuple[str, List[Any]]:
+        """WHERE clause (with leading space, or empty) and params for the message listing filters."""
+        clauses: List[str] = []
+        params: List[Any] = []
+        if before_id is not None:
+            clauses.append("m.id < ?")
+            params.append(before_id)
+        if chat_refs is not None:
+            clause, refs = SQLITE_DB._chat_ref_clause(chat_refs)
+            clauses.append(clause)
+            params.extend(refs)
+        if since is not None:
+            clauses.append("m.system_hit_time >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("m.system_hit_time < ?")
+            params.append(until)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    @staticmethod
+    async def _chat_refs(conn, chat_name: Optional[str]) -> Optional[List[int]]:
+        """
+        chats.id values carrying a name, None without a name filter.
+
+        Resolved up front so a single chat filters on `chat_ref = ?`, which walks
+        idx_messages_chat_ref_id in id order instead of scanning the whole table.
+        """
+        if chat_name is None:
+            return None
+        cursor = await conn.execute("SELECT id FROM chats WHERE chat_name = ?", (chat_name,))
+        return [row[0] for row in await cursor.fetchall()]
+
+    @staticmethod
+    def _chat_ref_clause(chat_refs: List[int]) -> Tuple[str, List[int]]:
+        """Filter on resolved chat refs (names are not unique, several chats may share one)."""
+        if len(chat_refs) == 1:
+            return "m.chat_ref = ?", list(chat_refs)
+        return f"m.chat_ref IN ({', '.join('?' for _ in chat_refs)})", list(chat_refs)
+
+    @staticmethod
+    def _encode_cursor(value: int, key: str = "id") -> str:
+        """Opaque page cursor, by default for the last returned row id."""
+        raw = json.dumps({key: int(value)}).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def _decode_cursor(cursor: str, key: str = "id") -> int:
+        """Value encoded in a page cursor."""
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            return int(json.loads(base64.urlsafe_b64decode(padded))[key])
+        except (binascii.Error, ValueError, KeyError, TypeError) as e:
+            raise StorageError(f"Invalid page cursor: {cursor!r}") from e
+
     async def get_messages_by_chat(self, chat_name: str, **kwargs) -> List[Dict[str, Any]]:
         """Get messages filtered by chat name."""
         if not self._conn:
@@ -289,29 +1612,168 @@ class SQLITE_DB(StorageInterface):
         limit = kwargs.get('limit', 100)
 
         try:
-            cursor = await self._conn.execute(
-                "SELECT * FROM messages WHERE parent_chat_name = ? ORDER BY id DESC LIMIT ?",
-                (chat_name, limit)
-            )
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+            async with self.acquire_reader() as conn:
+                clause, refs = self._chat_ref_clause(await self._chat_refs(conn, chat_name))
+                cursor = await conn.execute(
+                    f"{_MESSAGE_SELECT} WHERE {clause} ORDER BY m.id DESC LIMIT ?",
+                    (*refs, limit)
+                )
+                rows = await cursor.fetchall()
+            return [self._row_dict(row) for row in rows]
         except Exception as e:
             self.log.error(f"Get messages by chat failed: {e}")
             return []
 
+    async def get_watermark(self, chat_id: str, **kwargs) -> Optional[Tuple[str, int]]:
+        """Get (last_data_id, dom_position) for a chat, None if never processed."""
+        if not self._conn:
+            return None
+
+        try:
+            async with self.acquire_reader() as conn:
+                cursor = await conn.execute(
+                    "SELECT last_data_id, dom_position FROM chat_watermarks WHERE chat_id = ?",
+                    (chat_id,)
+                )
+                row = await cursor.fetchone()
+            if row is None:
+                return None
+            return row[0], int(row[1]) if row[1] is not None else -1
+        except Exception as e:
+            self.log.error(f"Get watermark failed: {e}")
+            return None
+
+    async def set_watermark(self, chat_id: str, data_id: str, position: int, **kwargs) -> None:
+        """Upsert the high-water mark of a chat."""
+        if not self._conn:
+            raise StorageError("Database not initialized.")
+
+        try:
+            async with self._txn_lock:
+                await self._conn.execute(
+                    """
+                    INSERT INTO chat_watermarks (chat_id, last_data_id, dom_position, updated_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(chat_id) DO UPDATE SET
+                        last_data_id = excluded.last_data_id,
+                        dom_position = excluded.dom_position,
+                        updated_at = excluded.updated_at
+                    """,
+                    (chat_id, data_id, position, time.time())
+                )
+                await self._conn.commit()
+        except Exception as e:
+            self.log.error(f"Set watermark failed: {e}")
+            raise StorageError(f"Set watermark failed: {e}") from e
+
+    async def get_backfill_checkpoint(self, chat_id: str, **kwargs) -> Optional[Dict[str, Any]]:
+        """Get the backfill progress of a chat, None if it was never backfilled."""
+        if not self._conn:
+            return None
+
+        try:
+            async with self.acquire_reader() as conn:
+                cursor = await conn.execute(
+                    "SELECT oldest_data_id, collected, complete, updated_at FROM chat_backfill WHERE chat_id = ?",
+                    (chat_id,)
+                )
+                row = await cursor.fetchone()
+            if row is None:
+                return None
+            return {"oldest_data_id": row[0], "collected": int(row[1]), "complete": bool(row[2]), "updated_at": row[3]}
+        except Exception as e:
+            self.log.error(f"Get backfill checkpoint failed: {e}")
+            return None
+
+    async def set_backfill_checkpoint(
+            self,
+            chat_id: str,
+            oldest_data_id: Optional[str],
+            collected: int,
+            complete: bool = False,
+            **kwargs
+    ) -> None:
+        """Upsert the backfill progress of a chat."""
+        if not self._conn:
+            raise StorageError("Database not initialized.")
+
+        try:
+            async with self._txn_lock:
+                await self._conn.execute(
+                    """
+                    INSERT INTO chat_backfill (chat_id, oldest_data_id, collected, complete, updated_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(chat_id) DO UPDATE SET
+                        oldest_data_id = excluded.oldest_data_id,
+                        collected = excluded.collected,
+                        complete = excluded.complete,
+                        updated_at = excluded.updated_at
+                    """,
+                    (chat_id, oldest_data_id, collected, int(complete), time.time())
+                )
+                await self._conn.commit()
+        except Exception as e:
+            self.log.error(f"Set backfill checkpoint failed: {e}")
+            raise StorageError(f"Set backfill checkpoint failed: {e}") from e
+
     async def close_db(self, **kwargs) -> None:
-        """Close connection and stop writer."""
+        """
+        Close connection and stop writer.
+        The writer first gets drain_timeout seconds to commit what is queued; anything
+        left after that stays in the spool (if enabled) and is replayed on the next start.
+        """
         self._running = False
 
         if self._writer_task:
-            self._writer_task.cancel()
+            if not self._writer_task.done():
+                self.queue.put_nowait(None)
             try:
-                await self._writer_task
-            except asyncio.CancelledError:
-                pass
+                await asyncio.wait_for(asyncio.shield(self._writer_task), timeout=self.drain_timeout)
+            except asyncio.TimeoutError:
+                self.log.warning(f"Writer did not drain within {self.drain_timeout}s, cancelling it.")
+                self._writer_task.cancel()
+                try:
+                    await self._writer_task
+                except asyncio.CancelledError:
+                    pass
+            except Exception as e:
+                self.log.error(f"Writer failed while draining: {e}")
             self._writer_task = None
+        self._resolve_waiters(
+            [entry[3] for entry in self._enqueue_entries if entry[3] is not None],
+            StorageError("Database closed before the batch was committed")
+        )
+
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+        self._commit_feed.close()
+
+        for task in (self._checkpoint_task, self._retention_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._checkpoint_task = None
+        self._retention_task = None
+
+        if self._read_pool is not None:
+            await self._read_pool.close()
+            self._read_pool = None
+
+        if self._sync_conn is not None:
+            with self._sync_lock:
+                self._sync_conn.close()
+                self._sync_conn = None
 
         if self._conn:
+            try:
+                await self._checkpoint("TRUNCATE")
+            except Exception as e:
+                self.log.warning(f"Final WAL checkpoint failed: {e}")
             await self._conn.close()
             self._conn = None
             self.log.info("SQLite DB connection closed.")
@@ -16,6 +16,12 @@ class whatsapp_chat:
     chat_id: str = field(init=False)
     System_Hit_Time: float = field(default_factory=time.time)
 
+    # Chat list row details, filled by the bulk chat list extraction
+    preview: Optional[str] = None
+    last_activity: Optional[str] = None
+    unread_count: int = 0
+    is_community: bool = False
+
     def __post_init__(self):
         self.chat_id = self._chat_key()
 
@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import time
 from dataclasses import dataclass, field
+from enum import Enum
 from typing import Union, Literal, Optional
 
 from playwright.async_api import ElementHandle, Locator
@@ -11,6 +12,26 @@ from playwright.async_api import ElementHandle, Locator
 from src.WhatsApp.DerivedTypes.Chat import whatsapp_chat
 
 
+class MessageType(str, Enum):
+    """Content type of a WhatsApp message, stored in whatsapp_message.data_type."""
+    TEXT = "text"
+    QUOTED = "quoted"
+    IMAGE = "image"
+    VIDEO = "video"
+    VOICE = "voice"
+    GIF = "gif"
+    STICKER = "sticker"
+    UNKNOWN = "unknown"
+
+    @classmethod
+    def parse(cls, value: Optional[str]) -> "MessageType":
+        """Enum member for a classifier value, UNKNOWN for anything unexpected."""
+        try:
+            return cls(value)
+        except ValueError:
+            return cls.UNKNOWN
+
+
 @dataclass
 class whatsapp_message:
     """Should inherit the protocol from Message Interface Template"""
@@ -18,10 +39,10 @@ class whatsapp_message:
     data_id: str
 
     raw_data: str
-    encrypted_message: Optional[bytes] = None
-    encryption_nonce: Optional[bytes] = None
     parent_chat: whatsapp_chat
     message_ui: Optional[Union[ElementHandle, Locator]]
+    encrypted_message: Optional[bytes] = None
+    encryption_nonce: Optional[bytes] = None
 
     data_type: Optional[str] = None
     message_id: str = field(init=False)
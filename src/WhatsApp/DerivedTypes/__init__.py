@@ -5,9 +5,10 @@ Concrete implementations of chat and message objects
 tailored for WhatsApp Web's data model and behavior.
 """
 from .Chat import whatsapp_chat
-from .Message import whatsapp_message
+from .Message import MessageType, whatsapp_message
 
 __all__ = [
     'whatsapp_message',
-    'whatsapp_chat'
+    'whatsapp_chat',
+    'MessageType'
 ]
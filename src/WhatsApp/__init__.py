@@ -5,8 +5,10 @@ Provides chat processing, message handling, media operations,
 and human-like interaction capabilities for WhatsApp Web automation.
 """
 from .chat_processor import ChatProcessor
+from .chat_scheduler import ChatScheduler
 from .login import Login
 from .message_processor import MessageProcessor
+from .indexeddb_processor import IndexedDBMessageProcessor, IndexedDBSchema
 from .media_capable import MediaCapable
 from .humanized_operations import HumanizedOperations
 from .web_ui_config import WebSelectorConfig
@@ -15,8 +17,11 @@ from .reply_capable import ReplyCapable
 
 __all__ = [
     'ChatProcessor',
+    'ChatScheduler',
     'Login',
     'MessageProcessor',
+    'IndexedDBMessageProcessor',
+    'IndexedDBSchema',
     'MediaCapable',
     'HumanizedOperations',
     'ReplyCapable',
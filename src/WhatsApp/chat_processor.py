@@ -3,7 +3,7 @@ from __future__ import annotations
 
 import logging
 import random
-from typing import Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
 
 from playwright.async_api import Page, ElementHandle, Locator
 from playwright.async_api import TimeoutError as PlaywrightTimeoutError
@@ -12,6 +12,7 @@ from src.Exceptions import ChatNotFoundError, ChatClickError, TweakioError
 from src.Exceptions.whatsapp import ChatProcessorError, ChatUnreadError, ChatMenuError, ChatError
 from src.Interfaces.chat_processor_interface import ChatProcessorInterface
 from src.WhatsApp.DerivedTypes.Chat import whatsapp_chat
+from src.WhatsApp.chat_scheduler import ChatScheduler
 from src.WhatsApp.web_ui_config import WebSelectorConfig
 
 
@@ -61,6 +62,128 @@ class ChatProcessor(ChatProcessorInterface):
         except TweakioError as e:
             raise ChatProcessorError("Failed to extract chat") from e
 
+    async def fetch_all_chats(self, max_chats: Optional[int] = None, **kwargs) -> List[whatsapp_chat]:
+        """Fetch every chat of the account, not only the rendered ones (see `iter_all_chats`)."""
+        ChatList = [chat async for chat in self.iter_all_chats(max_chats=max_chats, **kwargs)]
+
+        if not ChatList:
+            raise ChatNotFoundError("Chats Not Found on the Page.")
+
+        return ChatList
+
+    async def iter_all_chats(
+            self,
+            max_chats: Optional[int] = None,
+            step: float = 0.8,
+            settle: int = 300,
+            retry: int = 2
+    ) -> AsyncIterator[whatsapp_chat]:
+        """
+        Crawl the virtualised chat list from the top, yielding every chat once in list order.
+
+        Each viewport is extracted with one evaluate (name, preview, time, unread count,
+        community flag), then the list is scrolled by `step` viewports. Crawling stops at the
+        bottom of the list, once `aria-rowcount` chats were seen or after `max_chats`.
+
+        Args:
+            max_chats: Stop after this many chats, None = all
+            step: Viewport heights scrolled per round, below 1 so consecutive viewports overlap
+            settle: Milliseconds given to the list to render rows after a scroll
+            retry: Extra extractions of a viewport that brought no new chat (rows still rendering)
+        """
+        sc = self.UIConfig
+        seen: Set[str] = set()
+        try:
+            state = await sc.scroll_chat_list(to_top=True)
+            await self.page.wait_for_timeout(settle)
+            misses = 0
+            while True:
+                fresh = 0
+                for row in sorted(await sc.extract_chat_rows(), key=lambda r: r.get("index", 0)):
+                    if not row.get("name"):
+                        continue
+                    chat = self._wrap_chat_row(row)
+                    if chat.chat_id in seen:
+                        continue
+                    seen.add(chat.chat_id)
+                    fresh += 1
+                    yield chat
+                    if max_chats is not None and len(seen) >= max_chats:
+                        return
+
+                if state.get("total") and len(seen) >= state["total"]:
+                    return
+                if not fresh and misses < retry:
+                    misses += 1
+                    await self.page.wait_for_timeout(settle)
+                    continue
+                if state.get("at_end"):
+                    return
+
+                misses = 0
+                state = await sc.scroll_chat_list(step)
+                await self.page.wait_for_timeout(settle)
+        except TweakioError as e:
+            raise ChatProcessorError("Failed to crawl the chat list") from e
+        finally:
+            self.log.debug(f"Chat list crawl saw {len(seen)} chats.")
+
+    async def scan_unread(self) -> Dict[str, int]:
+        """
+        Unread counts of every rendered chat list row from one in-page evaluation.
+
+        Returns:
+            chat_id -> unread count (0 for read chats, 1 for a chat marked unread), in list order
+        """
+        try:
+            rows = await self.UIConfig.extract_chat_rows()
+        except TweakioError as e:
+            raise ChatUnreadError("Error in scan_unread") from e
+        return {
+            whatsapp_chat(chat_name=row["name"], chat_ui=None).chat_id: int(row.get("unread") or 0)
+            for row in sorted(rows, key=lambda r: r.get("index", 0))
+            if row.get("name")
+        }
+
+    async def prioritised_chats(
+            self,
+            scheduler: ChatScheduler,
+            limit: Optional[int] = None,
+            only_unread: bool = True
+    ) -> List[whatsapp_chat]:
+        """
+        Rendered chats ordered by `scheduler` (unread count and staleness), from one extraction.
+
+        Args:
+            scheduler: Ranks the chats, call its `mark_served` after fetching a chat
+            limit: Return at most this many chats
+            only_unread: Leave out chats without unread messages
+        """
+        try:
+            rows = await self.UIConfig.extract_chat_rows()
+        except TweakioError as e:
+            raise ChatUnreadError("Error in prioritised_chats") from e
+
+        chats: Dict[str, whatsapp_chat] = {}
+        for row in sorted(rows, key=lambda r: r.get("index", 0)):
+            if row.get("name"):
+                chat = self._wrap_chat_row(row)
+                chats.setdefault(chat.chat_id, chat)
+
+        ranked = scheduler.rank({chat_id: chat.unread_count for chat_id, chat in chats.items()}, only_unread)
+        return [chats[chat_id] for chat_id, _ in ranked[:limit]]
+
+    def _wrap_chat_row(self, row: Dict[str, Any]) -> whatsapp_chat:
+        """Wrap a row of `extract_chat_rows` into a `whatsapp_chat` with a lazy row locator."""
+        return whatsapp_chat(
+            chat_name=row["name"],
+            chat_ui=self.UIConfig.chat_by_name(row["name"]),
+            preview=row.get("preview") or None,
+            last_activity=row.get("time") or None,
+            unread_count=int(row.get("unread") or 0),
+            is_community=bool(row.get("community"))
+        )
+
     async def _click_chat(self, chat: Optional[whatsapp_chat], **kwargs) -> bool:
         """Click on a chat to open it."""
         try:
@@ -83,7 +206,10 @@ class ChatProcessor(ChatProcessorInterface):
 
     @staticmethod
     async def is_unread(chat: Optional[whatsapp_chat]) -> int:
-        """Check unread status. Returns 1 if unread with count, 0 otherwise."""
+        """
+        Check unread status. Returns 1 if unread with count, 0 otherwise.
+        Several round trips per chat, use `scan_unread` to check the whole rendered list.
+        """
         try:
             if chat is None:
                 raise ChatNotFoundError("none passed , expected chat in is_unread")
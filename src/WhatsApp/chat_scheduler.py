@@ -0,0 +1,84 @@
+"""
+Polling order for chats, based on the chat list's unread badges and how long ago each chat was served.
+
+    scheduler = ChatScheduler()
+    for chat in await chat_processor.prioritised_chats(scheduler, limit=5):
+        await message_processor.Fetcher(chat, retry=3)
+        scheduler.mark_served(chat.chat_id)
+"""
+from __future__ import annotations
+
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class ChatScheduler:
+    """
+    Ranks chats by unread count and staleness.
+
+    score = unread_weight * unread_count + staleness_weight * min(seconds since served, max_staleness)
+
+    Chats never served count as `max_staleness` stale, so quiet chats still come up once in a while
+    when `only_unread` is off.
+
+    Args:
+        unread_weight: Score per unread message
+        staleness_weight: Score per second since the chat was last served
+        max_staleness: Cap (seconds) of the staleness term, keeps unread counts decisive
+    """
+
+    def __init__(
+            self,
+            unread_weight: float = 1.0,
+            staleness_weight: float = 1 / 60,
+            max_staleness: float = 3600.0
+    ) -> None:
+        if unread_weight < 0 or staleness_weight < 0:
+            raise ValueError("weights cannot be negative")
+        if max_staleness <= 0:
+            raise ValueError("max_staleness must be positive")
+
+        self.unread_weight = unread_weight
+        self.staleness_weight = staleness_weight
+        self.max_staleness = max_staleness
+        self._served: Dict[str, float] = {}
+
+    def mark_served(self, chat_id: str, at: Optional[float] = None) -> None:
+        """Record that the chat's messages were fetched."""
+        self._served[chat_id] = time.time() if at is None else at
+
+    def last_served(self, chat_id: str) -> Optional[float]:
+        """Time the chat was last served, None if never."""
+        return self._served.get(chat_id)
+
+    def score(self, chat_id: str, unread: int, now: Optional[float] = None) -> float:
+        """Priority of a chat with `unread` unread messages."""
+        now = time.time() if now is None else now
+        served = self._served.get(chat_id)
+        staleness = self.max_staleness if served is None else min(max(0.0, now - served), self.max_staleness)
+        return self.unread_weight * unread + self.staleness_weight * staleness
+
+    def rank(
+            self,
+            unread: Dict[str, int],
+            only_unread: bool = False,
+            now: Optional[float] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Order chats for serving, highest score first.
+
+        Args:
+            unread: chat_id -> unread count, e.g. from `ChatProcessor.scan_unread`
+            only_unread: Leave out chats without unread messages
+
+        Returns:
+            (chat_id, score) pairs, ties keep the order of `unread` (chat list order)
+        """
+        now = time.time() if now is None else now
+        ranked = [
+            (chat_id, self.score(chat_id, count, now))
+            for chat_id, count in unread.items()
+            if count > 0 or not only_unread
+        ]
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        return ranked
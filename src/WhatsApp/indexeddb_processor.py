@@ -0,0 +1,399 @@
+"""
+Message processor that reads WhatsApp Web's own IndexedDB stores instead of the rendered DOM.
+
+WhatsApp Web keeps its chat / contact / message models in the `model-storage` database.
+Message keys there are the same serialized ids the DOM exposes as `data-id`
+(`<fromMe>_<chat jid>_<stanza id>`), so rows read from either source dedupe against each other.
+"""
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.WhatsApp.DerivedTypes.Chat import whatsapp_chat
+from src.WhatsApp.DerivedTypes.Message import whatsapp_message
+from src.WhatsApp.message_processor import MessageProcessor
+
+# Shared in-page helpers. `openDB` never creates the database: an upgrade request
+# (database missing) is aborted, which rejects the promise.
+_IDB_HELPERS_JS = """
+    const request = (req) => new Promise((resolve, reject) => {
+        req.onsuccess = () => resolve(req.result);
+        req.onerror = () => reject(req.error);
+    });
+    const openDB = (name) => new Promise((resolve, reject) => {
+        const req = indexedDB.open(name);
+        req.onupgradeneeded = () => req.transaction.abort();
+        req.onsuccess = () => resolve(req.result);
+        req.onerror = () => reject(req.error);
+        req.onblocked = () => reject(new Error("open blocked"));
+    });
+"""
+
+# In-page script for `IndexedDBMessageProcessor.indexeddb_available`.
+_IDB_PROBE_JS = """
+async (schema) => {
+""" + _IDB_HELPERS_JS + """
+    if (!self.indexedDB) return { ok: false, reason: "IndexedDB unavailable" };
+    if (indexedDB.databases) {
+        const dbs = await indexedDB.databases();
+        if (!dbs.some((d) => d.name === schema.db_name)) return { ok: false, reason: "database not found" };
+    }
+    let db;
+    try {
+        db = await openDB(schema.db_name);
+    } catch (e) {
+        return { ok: false, reason: String(e) };
+    }
+    try {
+        const missing = [schema.message_store, schema.chat_store, schema.contact_store]
+            .filter((name) => !db.objectStoreNames.contains(name));
+        if (missing.length) return { ok: false, reason: "missing stores: " + missing.join(", ") };
+
+        const store = db.transaction(schema.message_store, "readonly").objectStore(schema.message_store);
+        const cursor = await request(store.openCursor());
+        if (cursor) {
+            const key = cursor.primaryKey, value = cursor.value || {};
+            if (typeof key !== "string" || !/^(true|false)_/.test(key) || !("t" in value) || !("type" in value)) {
+                return { ok: false, reason: "unrecognised message record" };
+            }
+        }
+        return { ok: true, reason: "", time_index: store.indexNames.contains(schema.time_index) };
+    } finally {
+        db.close();
+    }
+}
+"""
+
+# In-page script for `IndexedDBMessageProcessor._load_chats`: every chat jid with the names it shows up under.
+_IDB_CHATS_JS = """
+async (schema) => {
+""" + _IDB_HELPERS_JS + """
+    const db = await openDB(schema.db_name);
+    try {
+        const stores = [schema.chat_store, schema.contact_store];
+        const hasGroups = db.objectStoreNames.contains(schema.group_store);
+        if (hasGroups) stores.push(schema.group_store);
+        const tx = db.transaction(stores, "readonly");
+        const [chats, contacts, groups] = await Promise.all([
+            request(tx.objectStore(schema.chat_store).getAll()),
+            request(tx.objectStore(schema.contact_store).getAll()),
+            hasGroups ? request(tx.objectStore(schema.group_store).getAll()) : Promise.resolve([]),
+        ]);
+        const byId = (records) => new Map(records.map((r) => [String(r.id && r.id._serialized || r.id), r]));
+        const contactById = byId(contacts), groupById = byId(groups);
+        return chats.map((chat) => {
+            const id = String(chat.id && chat.id._serialized || chat.id);
+            const contact = contactById.get(id) || {}, group = groupById.get(id) || {};
+            return {
+                id: id,
+                primary: [contact.name, group.subject, chat.name].filter(Boolean),
+                secondary: [contact.shortName, contact.pushname, contact.verifiedName, "+" + id.split("@")[0]]
+                    .filter(Boolean),
+            };
+        });
+    } finally {
+        db.close();
+    }
+}
+"""
+
+# Message record -> row, shared by the message readers.
+_IDB_ROW_JS = """
+    const TYPES = { chat: "text", image: "image", video: "video", ptt: "voice", audio: "voice", sticker: "sticker" };
+    const toRow = (key, v) => {
+        let type = TYPES[v.type] || "unknown";
+        if (type === "video" && v.isGif) type = "gif";
+        if (type === "text" && (v.quotedStanzaID || v.quotedMsg)) type = "quoted";
+        return {
+            data_id: key,
+            t: v.t || 0,
+            text: v.type === "chat" ? (v.body || "") : (v.caption || ""),
+            direction: key.startsWith("true_") ? "out" : "in",
+            data_type: type,
+        };
+    };
+"""
+
+# In-page script for `IndexedDBMessageProcessor._read_recent`: one bounded step of a newest-first walk.
+# Walks the message store's time index backwards (key cursor, values are only read for the chat's own
+# keys) and stops at `stopAt`, which also bounds the range by its timestamp, or after `limit` index
+# entries. `before` = [t, key] of the last entry of the previous step; entries of one timestamp come
+# in descending key order, so the rest of that timestamp are the keys below it.
+_IDB_RECENT_JS = """
+async ({ schema, jid, stopAt, before, limit }) => {
+""" + _IDB_HELPERS_JS + _IDB_ROW_JS + """
+    const prefixes = ["false_" + jid + "_", "true_" + jid + "_"];
+    const ours = (key) => typeof key === "string" && prefixes.some((p) => key.startsWith(p));
+    const db = await openDB(schema.db_name);
+    try {
+        let since = null;
+        if (stopAt) {
+            const store = db.transaction(schema.message_store, "readonly").objectStore(schema.message_store);
+            const mark = await request(store.get(stopAt));
+            if (mark && mark.t != null) since = mark.t;
+        }
+        const upper = before ? before[0] : null;
+        const range = since !== null && upper !== null ? IDBKeyRange.bound(since, upper)
+            : since !== null ? IDBKeyRange.lowerBound(since)
+            : upper !== null ? IDBKeyRange.upperBound(upper)
+            : null;
+
+        const keys = [];
+        let scanned = 0, next = null, stopped = false;
+        const index = db.transaction(schema.message_store, "readonly")
+            .objectStore(schema.message_store).index(schema.time_index);
+        await new Promise((resolve, reject) => {
+            const req = index.openKeyCursor(range, "prev");
+            req.onerror = () => reject(req.error);
+            req.onsuccess = () => {
+                const cursor = req.result;
+                if (!cursor) return resolve();
+                const t = cursor.key, key = cursor.primaryKey;
+                if (before && t === before[0] && key >= before[1]) return cursor.continue();
+                if (key === stopAt) {
+                    stopped = true;
+                    return resolve();
+                }
+                if (ours(key)) keys.push(key);
+                if (++scanned >= limit) {
+                    next = [t, key];
+                    return resolve();
+                }
+                cursor.continue();
+            };
+        });
+
+        const store = db.transaction(schema.message_store, "readonly").objectStore(schema.message_store);
+        const values = await Promise.all(keys.map((key) => request(store.get(key))));
+        return {
+            rows: keys.map((key, i) => toRow(key, values[i] || {})),
+            next: next,
+            stopped: stopped,
+            bounded: since !== null,
+        };
+    } finally {
+        db.close();
+    }
+}
+"""
+
+# In-page script for `IndexedDBMessageProcessor._read_messages`: one bounded batch of a chat's messages,
+# used when the message store has no time index (every record of the chat is read, in key order).
+# Keys of a chat are `false_<jid>_*` (incoming) and `true_<jid>_*` (outgoing), read as two key ranges;
+# `after` = [range index, last key read] continues where the previous batch stopped.
+_IDB_MESSAGES_JS = """
+async ({ schema, jid, after, limit }) => {
+""" + _IDB_HELPERS_JS + _IDB_ROW_JS + """
+    const prefixes = ["false_" + jid + "_", "true_" + jid + "_"];
+    let [phase, last] = after || [0, null];
+    const rows = [];
+    const db = await openDB(schema.db_name);
+    try {
+        while (phase < prefixes.length && rows.length < limit) {
+            const upper = prefixes[phase] + "\\uffff";
+            const range = last === null
+                ? IDBKeyRange.bound(prefixes[phase], upper)
+                : IDBKeyRange.bound(last, upper, true, false);
+            const wanted = limit - rows.length;
+            const store = db.transaction(schema.message_store, "readonly").objectStore(schema.message_store);
+            const [keys, values] = await Promise.all([
+                request(store.getAllKeys(range, wanted)),
+                request(store.getAll(range, wanted)),
+            ]);
+            keys.forEach((key, i) => rows.push(toRow(key, values[i] || {})));
+            if (keys.length < wanted) {
+                phase += 1;
+                last = null;
+            } else {
+                last = keys[keys.length - 1];
+            }
+        }
+        return { rows: rows, next: phase < prefixes.length ? [phase, last] : null };
+    } finally {
+        db.close();
+    }
+}
+"""
+
+
+@dataclass
+class IndexedDBSchema:
+    """Names of the WhatsApp Web IndexedDB database and the object stores read from it."""
+    db_name: str = "model-storage"
+    message_store: str = "message"
+    chat_store: str = "chat"
+    contact_store: str = "contact"
+    group_store: str = "group-metadata"
+    time_index: str = "t"
+
+
+class IndexedDBMessageProcessor(MessageProcessor):
+    """
+    MessageProcessor that reads messages from the page's IndexedDB instead of scraping rendered rows.
+
+    Chats are neither clicked nor rendered, so many chats can be fetched back to back.
+    Messages are read newest first over the message store's time index, in bounded steps (one
+    evaluate per `batch_size` index entries), until the watermark row or `max_messages` is
+    reached; without that index every record of the chat is read. When the
+    database / stores are not in the expected shape, or the chat is not found in them, it falls
+    back to the DOM extraction of MessageProcessor for that fetch.
+
+    Storage, filtering, encryption and incremental watermarks work as in MessageProcessor.
+    Watermarks written from here carry position -1 (no DOM position), which the DOM
+    extractor treats as "search for the data-id".
+    """
+
+    def __init__(
+            self,
+            *args,
+            schema: Optional[IndexedDBSchema] = None,
+            batch_size: int = 500,
+            max_messages: Optional[int] = 200,
+            **kwargs
+    ) -> None:
+        """
+        Args:
+            schema: Database / store names, defaults to WhatsApp Web's current layout
+            batch_size: Index entries (records without time index) read per evaluate call
+            max_messages: Newest messages returned per fetch without watermark, None = all
+
+        Other arguments are those of MessageProcessor.
+        """
+        super().__init__(*args, **kwargs)
+        if batch_size <= 0:
+            raise ValueError("batch_size must be positive")
+        self.schema = schema or IndexedDBSchema()
+        self.batch_size = batch_size
+        self.max_messages = max_messages
+
+        self._idb_ok: Optional[bool] = None
+        self._time_index = False
+        self._chat_jids: Dict[str, str] = {}
+
+    async def indexeddb_available(self, refresh: bool = False) -> bool:
+        """Whether the page's IndexedDB has the expected schema, the result is cached until `refresh`."""
+        if self._idb_ok is None or refresh:
+            try:
+                result = await self.page.evaluate(_IDB_PROBE_JS, asdict(self.schema)) or {}
+            except Exception as e:
+                result = {"ok": False, "reason": str(e)}
+            self._idb_ok = bool(result.get("ok"))
+            self._time_index = bool(result.get("time_index"))
+            if not self._idb_ok:
+                self.log.warning(f"IndexedDB schema not recognised ({result.get('reason')}), using DOM extraction.")
+        return self._idb_ok
+
+    async def _get_wrapped_Messages(
+            self,
+            chat: whatsapp_chat,
+            retry: int = 3, *args, **kwargs) \
+            -> List[whatsapp_message]:
+        rows = await self._read_indexeddb(chat, kwargs.get("watermark"))
+        if rows is None:
+            return await super()._get_wrapped_Messages(chat, retry, *args, **kwargs)
+
+        return [
+            self._wrap_message(
+                chat=chat,
+                data_id=row["data_id"],
+                text=row.get("text") or "",
+                direction=row.get("direction") or "out",
+                data_type=row.get("data_type"),
+                message_ui=self.UIConfig.message_by_dataID(row["data_id"])
+            )
+            for row in rows
+        ]
+
+    async def _read_indexeddb(
+            self,
+            chat: whatsapp_chat,
+            watermark: Optional[Tuple[str, int]] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Rows of `chat` oldest first (after the watermark if given), None if IndexedDB cannot serve it."""
+        if not await self.indexeddb_available():
+            return None
+
+        try:
+            jid = await self._resolve_chat(chat)
+            if jid is None:
+                self.log.debug(f"Chat {chat.chat_name!r} not found in IndexedDB, using DOM extraction.")
+                return None
+            stop_at = watermark[0] if watermark else None
+            if self._time_index:
+                rows = await self._read_recent(jid, stop_at)
+            else:
+                rows = self._after_watermark(await self._read_messages(jid), stop_at)
+        except Exception as e:
+            self.log.warning(f"IndexedDB read failed for {chat.chat_name!r}, using DOM extraction: {e}")
+            self._idb_ok = None
+            return None
+
+        if rows:
+            self._pending_watermarks[chat.chat_id] = (rows[-1]["data_id"], -1)
+        return rows
+
+    async def _resolve_chat(self, chat: whatsapp_chat) -> Optional[str]:
+        """Jid of the chat shown as `chat.chat_name`, the name map is reloaded once on a miss."""
+        name = chat.chat_name.lower().strip()
+        if name not in self._chat_jids:
+            await self._load_chats()
+        return self._chat_jids.get(name)
+
+    async def _load_chats(self) -> None:
+        records = await self.page.evaluate(_IDB_CHATS_JS, asdict(self.schema)) or []
+        jids: Dict[str, str] = {}
+        # Saved names / group subjects win over push names and numbers shared by several chats.
+        for field in ("primary", "secondary"):
+            for record in records:
+                for name in record.get(field) or []:
+                    jids.setdefault(str(name).lower().strip(), record["id"])
+        self._chat_jids = jids
+
+    async def _read_recent(self, jid: str, stop_at: Optional[str]) -> List[Dict[str, Any]]:
+        """
+        Rows after `stop_at`, or the newest `max_messages` when `stop_at` is not stored, oldest first.
+        A stored `stop_at` bounds the walk by its timestamp, so it is read up to regardless of max_messages.
+        """
+        rows: List[Dict[str, Any]] = []
+        before = None
+        while True:
+            batch = await self.page.evaluate(
+                _IDB_RECENT_JS,
+                {"schema": asdict(self.schema), "jid": jid, "stopAt": stop_at, "before": before,
+                 "limit": self.batch_size}
+            )
+            rows.extend(row for row in batch.get("rows") or [] if row.get("data_id"))
+            stopped = bool(batch.get("stopped"))
+            before = batch.get("next")
+            capped = not batch.get("bounded") and self.max_messages is not None and len(rows) >= self.max_messages
+            if stopped or not before or capped:
+                break
+
+        if not stopped and self.max_messages is not None:
+            rows = rows[:self.max_messages]
+        rows.reverse()
+        return rows
+
+    def _after_watermark(self, rows: List[Dict[str, Any]], stop_at: Optional[str]) -> List[Dict[str, Any]]:
+        """Sort a full read oldest first and cut it at the watermark / max_messages."""
+        rows.sort(key=lambda row: (row.get("t") or 0, row["data_id"]))
+        ids = [row["data_id"] for row in rows]
+        if stop_at in ids:
+            return rows[ids.index(stop_at) + 1:]
+        if self.max_messages is not None:
+            return rows[-self.max_messages:] if self.max_messages else []
+        return rows
+
+    async def _read_messages(self, jid: str) -> List[Dict[str, Any]]:
+        rows: List[Dict[str, Any]] = []
+        after = None
+        while True:
+            batch = await self.page.evaluate(
+                _IDB_MESSAGES_JS,
+                {"schema": asdict(self.schema), "jid": jid, "after": after, "limit": self.batch_size}
+            )
+            rows.extend(row for row in batch.get("rows") or [] if row.get("data_id"))
+            after = batch.get("next")
+            if not after:
+                return rows
@@ -1,19 +1,22 @@
 """WhatsApp message processor with storage and filtering support."""
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import List, Optional, Sequence
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Set, Tuple, Union
 
-from playwright.async_api import Page
+from playwright.async_api import ElementHandle, Locator, Page
 
 from src.Decorators.Chat_Click_decorator import ensure_chat_clicked
 from src.Encryption import MessageEncryptor
+from src.Exceptions.base import StorageError
 from src.Exceptions.whatsapp import MessageNotFoundError, WhatsAppError, MessageProcessorError, MessageListEmptyError
 from src.FIlter.message_filter import MessageFilter
 from src.Interfaces.message_processor_interface import MessageProcessorInterface
 from src.Interfaces.storage_interface import StorageInterface
 from src.WhatsApp.DerivedTypes.Chat import whatsapp_chat
-from src.WhatsApp.DerivedTypes.Message import whatsapp_message
+from src.WhatsApp.DerivedTypes.Message import MessageType, whatsapp_message
 from src.WhatsApp.chat_processor import ChatProcessor
 from src.WhatsApp.web_ui_config import WebSelectorConfig
 
@@ -29,7 +32,9 @@ class MessageProcessor(MessageProcessorInterface):
             page: Page,
             log: logging.Logger,
             UIConfig: WebSelectorConfig,
-            encryption_key: Optional[bytes] = None
+            encryption_key: Optional[bytes] = None,
+            bulk_extraction: bool = False,
+            incremental: bool = False
     ) -> None:
         super().__init__(
             storage_obj=storage_obj,
@@ -43,6 +48,16 @@ class MessageProcessor(MessageProcessorInterface):
 
         self.encryption_key = encryption_key
         self.encryptor = MessageEncryptor(encryption_key) if encryption_key else None
+        # Incremental mode walks back from the newest row to the per-chat watermark,
+        # which only the bulk extractor can do in a single evaluate.
+        self.incremental = incremental
+        self.bulk_extraction = bulk_extraction or incremental
+        self._pending_watermarks: Dict[str, Tuple[str, int]] = {}
+
+        # Push stream state, the page binding can only be exposed once per name.
+        self._stream_binding: Optional[str] = None
+        self._stream_queue: Optional[asyncio.Queue] = None
+        self._stream_chat: Optional[whatsapp_chat] = None
 
     @staticmethod
     async def sort_messages(msgList: Sequence[whatsapp_message], incoming: bool) -> List[whatsapp_message]:
@@ -61,6 +76,9 @@ class MessageProcessor(MessageProcessorInterface):
             retry: int = 3, *args, **kwargs) \
             -> List[whatsapp_message]:
 
+        if self.bulk_extraction:
+            return await self._get_wrapped_Messages_bulk(chat, retry, watermark=kwargs.get("watermark"))
+
         wrapped_list: List[whatsapp_message] = []
         try:
             sc = self.UIConfig
@@ -89,48 +107,403 @@ class MessageProcessor(MessageProcessorInterface):
                     self.log.debug("Data ID in WA / get wrapped Messages , None/Empty. Skipping")
                     continue
 
-                encrypted_message = None
-                encryption_nonce = None
-
-                if self.encryptor and text:
-                    try:
-                        encryption_nonce, encrypted_message = self.encryptor.encrypt_message(
-                            text,
-                            data_id
-                        )
-                    except Exception as e:
-                        self.log.warning(f"Encryption failed for message {data_id}: {e}")
-                        encrypted_message = None
-                        encryption_nonce = None
-
                 wrapped_list.append(
-                    whatsapp_message(
-                        message_ui=msg,
+                    self._wrap_message(
+                        chat=chat,
+                        data_id=data_id,
+                        text=text,
                         direction="in" if await msg.locator(".message-in").count() > 0 else "out",
-                        raw_data=text,
-                        encrypted_message=encrypted_message,
-                        encryption_nonce=encryption_nonce,
-                        parent_chat=chat,
-                        data_id=data_id
+                        message_ui=msg
                     )
                 )
 
+            if wrapped_list:
+                try:
+                    types = await sc.classify_messages([m.data_id for m in wrapped_list])
+                    for m in wrapped_list:
+                        m.data_type = self._type_value(types.get(m.data_id))
+                except Exception as e:
+                    self.log.debug(f"Message type classification failed: {e}")
+
             return wrapped_list
         except WhatsAppError as e:
             raise MessageProcessorError("failed to wrap messages") from e
 
+    async def _get_wrapped_Messages_bulk(
+            self,
+            chat: whatsapp_chat,
+            retry: int,
+            watermark: Optional[Tuple[str, int]] = None
+    ) -> List[whatsapp_message]:
+        """
+        Bulk variant of `_get_wrapped_Messages`.
+        Pulls data-id, text and direction of all rendered messages in one evaluate call
+        instead of several round trips per message.
+
+        With a watermark (last data-id, DOM position) only rows newer than it are wrapped.
+        The newest extracted row is kept as the chat's pending watermark for `Fetcher`.
+        """
+        try:
+            sc = self.UIConfig
+            stop_at, hint = watermark if watermark else (None, None)
+            rows = await sc.extract_messages_bulk(stop_at=stop_at, hint=hint)
+            c = 0
+            while c < retry and not rows:
+                rows = await sc.extract_messages_bulk(stop_at=stop_at, hint=hint)
+                c += 1
+
+            if not rows:
+                raise MessageNotFoundError("Messages Not able to extract")
+
+            newest = rows[-1]
+            if newest.get("data_id"):
+                self._pending_watermarks[chat.chat_id] = (newest["data_id"], newest.get("index", -1))
+
+            if stop_at and rows[0].get("data_id") == stop_at:
+                rows = rows[1:]
+
+            return [
+                self._wrap_message(
+                    chat=chat,
+                    data_id=row["data_id"],
+                    text=row.get("text") or "",
+                    direction=row.get("direction") or "out",
+                    data_type=row.get("data_type"),
+                    message_ui=sc.message_by_dataID(row["data_id"])
+                )
+                for row in rows
+                if row.get("data_id")
+            ]
+        except WhatsAppError as e:
+            raise MessageProcessorError("failed to wrap messages") from e
+
+    def _wrap_message(
+            self,
+            chat: whatsapp_chat,
+            data_id: str,
+            text: str,
+            direction: str,
+            message_ui: Optional[Union[ElementHandle, Locator]],
+            data_type: Optional[Union[str, MessageType]] = None
+    ) -> whatsapp_message:
+        """Wrap extracted fields into a `whatsapp_message`, encrypting the text if a key is set."""
+        encrypted_message = None
+        encryption_nonce = None
+
+        if self.encryptor and text:
+            try:
+                encryption_nonce, encrypted_message = self.encryptor.encrypt_message(
+                    text,
+                    data_id
+                )
+            except Exception as e:
+                self.log.warning(f"Encryption failed for message {data_id}: {e}")
+                encrypted_message = None
+                encryption_nonce = None
+
+        return whatsapp_message(
+            message_ui=message_ui,
+            direction=direction,
+            raw_data=text,
+            encrypted_message=encrypted_message,
+            encryption_nonce=encryption_nonce,
+            parent_chat=chat,
+            data_id=data_id,
+            data_type=self._type_value(data_type)
+        )
+
+    @staticmethod
+    def _type_value(data_type: Optional[Union[str, MessageType]]) -> Optional[str]:
+        """Plain string stored in `whatsapp_message.data_type`, unknown classifier values become "unknown"."""
+        if data_type is None:
+            return None
+        return MessageType.parse(data_type).value
+
     async def Fetcher(self, chat: whatsapp_chat, retry: int, *args, **kwargs) -> List[whatsapp_message]:
-        """Fetch, store, and filter messages from a chat."""
+        """
+        Fetch, store, and filter messages from a chat.
+        In incremental mode only messages newer than the chat's stored watermark are returned.
+        """
+        track_watermark = self.incremental and self.storage is not None
+        if track_watermark:
+            kwargs["watermark"] = await self.storage.get_watermark(chat.chat_id)
+
         msgList = await self._get_wrapped_Messages(chat, retry, *args, **kwargs)
 
+        stored = True
         if self.storage and msgList:
-            new_msgs = [
-                msg for msg in msgList
-                if not self.storage.check_message_if_exists(msg.message_id)
-            ]
+            new_ids = await self.storage.filter_new([msg.message_id for msg in msgList])
+            new_msgs = [msg for msg in msgList if msg.message_id in new_ids]
+            if new_msgs:
+                # The watermark may only move past rows that are committed
+                try:
+                    await self.storage.enqueue_insert(new_msgs, wait=track_watermark)
+                    self.log.debug(f"Enqueued {len(new_msgs)}/{len(msgList)} new messages for storage.")
+                except StorageError as e:
+                    stored = False
+                    self.log.warning(f"Messages of {chat.chat_name!r} not committed, keeping the old watermark: {e}")
+
+        if track_watermark:
+            pending = self._pending_watermarks.pop(chat.chat_id, None)
+            if pending and stored:
+                await self.storage.set_watermark(chat.chat_id, *pending)
+
+        if self.filter:
+            msgList = self.filter.apply(msgList)
+
+        return msgList
+
+    async def backfill(
+            self,
+            chat: whatsapp_chat,
+            until: Optional[str] = None,
+            limit: Optional[int] = None,
+            resume: bool = True,
+            min_step: int = 300,
+            max_step: int = 6000,
+            settle_timeout: float = 4.0,
+            idle_rounds: int = 3
+    ) -> Dict[str, Any]:
+        """
+        Harvest the older history of a chat by scrolling its virtualised message panel upward.
+
+        Every rendered window is extracted with one bulk evaluate, deduplicated by data-id and
+        stored right away, then the oldest data-id reached is checkpointed in storage. A resumed
+        run scrolls back up to the checkpoint at full step (stored rows are skipped) and carries on.
+
+        The scroll step adapts to the UI: it doubles while older rows render within a quarter of
+        `settle_timeout` and halves when WhatsApp takes longer to load them.
+
+        Args:
+            chat: Chat to backfill
+            until: Data-id to stop at (exclusive), e.g. the oldest message already stored by Fetcher
+            limit: Stop after storing this many messages in this run
+            resume: Continue from the stored checkpoint, False starts again from the newest message
+            min_step: Smallest scroll step in pixels
+            max_step: Largest scroll step in pixels
+            settle_timeout: Seconds to wait for older rows once the top of the panel is reached
+            idle_rounds: Timed-out waits at the top after which the start of the history is assumed
+
+        Returns:
+            Report dict: stored (this run), collected (all runs), oldest_data_id, complete,
+            reason ("complete" | "until" | "limit" | "already_complete"), steps, duration
+        """
+        if self.storage is None:
+            raise MessageProcessorError("backfill needs a storage object to store and checkpoint into.")
+        if not 0 < min_step <= max_step:
+            raise ValueError("expected 0 < min_step <= max_step")
+
+        started = time.perf_counter()
+        checkpoint = await self.storage.get_backfill_checkpoint(chat.chat_id) if resume else None
+        collected = checkpoint["collected"] if checkpoint else 0
+        oldest = checkpoint["oldest_data_id"] if checkpoint else None
+        report: Dict[str, Any] = {
+            "stored": 0, "collected": collected, "oldest_data_id": oldest, "complete": False,
+            "reason": "complete", "steps": 0, "duration": 0.0
+        }
+        if checkpoint and checkpoint["complete"]:
+            report.update(complete=True, reason="already_complete")
+            return report
+
+        if not await self.chat_processor._click_chat(chat):
+            raise MessageProcessorError("Chat click failed, cannot backfill.")
+
+        sc = self.UIConfig
+        seeking = oldest
+        seen: Set[str] = set()
+        step = max_step if seeking else min_step
+        idle = 0
+
+        while True:
+            rows = [row for row in await sc.extract_messages_bulk() if row.get("data_id")]
+            ids = [row["data_id"] for row in rows]
+            if seeking in ids:
+                seeking = None
+            reached_until = until is not None and until in ids
+            if reached_until:
+                rows = rows[ids.index(until) + 1:]
+
+            # Rows are oldest first, the newest unseen ones are kept when the limit cuts a window.
+            fresh = [row for row in rows if row["data_id"] not in seen]
+            seen.update(row["data_id"] for row in fresh)
+            if limit is not None:
+                fresh = fresh[max(0, len(fresh) - (limit - report["stored"])):]
+            stored = await self._store_backfill_rows(chat, fresh)
+            report["stored"] += stored
+            collected += stored
+
+            if rows and not seeking and rows[0]["data_id"] != oldest:
+                oldest = rows[0]["data_id"]
+                await self.storage.set_backfill_checkpoint(chat.chat_id, oldest, collected)
+
+            if reached_until:
+                report["reason"] = "until"
+                break
+            if limit is not None and report["stored"] >= limit:
+                report["reason"] = "limit"
+                break
+
+            first_id = ids[0] if ids else None
+            state = await sc.scroll_messages(-step)
+            report["steps"] += 1
+            if state is None:
+                raise MessageProcessorError("Message panel not rendered, cannot backfill.")
+            if state["first_id"] != first_id or state["top"] > 0:
+                # Older rows rendered (or still inside the rendered buffer): keep speeding up.
+                step = min(max_step, step * 2)
+                continue
+
+            # At the top: WhatsApp loads the previous page of history, if there is one.
+            waited = await self._await_older_rows(first_id, settle_timeout)
+            if waited is None:
+                step = max(min_step, step // 2)
+                idle += 1
+                if idle >= idle_rounds:
+                    report["complete"] = True
+                    break
+                continue
+            idle = 0
+            if waited < settle_timeout / 4:
+                step = min(max_step, step * 2)
+            else:
+                step = max(min_step, step // 2)
+
+        await self.storage.set_backfill_checkpoint(chat.chat_id, oldest, collected, complete=report["complete"])
+        report.update(collected=collected, oldest_data_id=oldest, duration=time.perf_counter() - started)
+        self.log.info(
+            f"Backfill of {chat.chat_name!r}: {report['stored']} stored in {report['steps']} steps ({report['reason']})."
+        )
+        return report
+
+    async def _store_backfill_rows(self, chat: whatsapp_chat, rows: List[Dict[str, Any]]) -> int:
+        """Store rows not stored yet, committed before the checkpoint moves past them."""
+        if not rows:
+            return 0
+        msgs = [
+            self._wrap_message(
+                chat=chat,
+                data_id=row["data_id"],
+                text=row.get("text") or "",
+                direction=row.get("direction") or "out",
+                data_type=row.get("data_type"),
+                message_ui=self.UIConfig.message_by_dataID(row["data_id"])
+            )
+            for row in rows
+        ]
+        new_ids = await self.storage.filter_new([msg.message_id for msg in msgs])
+        new_msgs = [msg for msg in msgs if msg.message_id in new_ids]
+        if new_msgs:
+            await self.storage.enqueue_insert(new_msgs, wait=True)
+        return len(new_msgs)
+
+    async def _await_older_rows(self, first_id: Optional[str], timeout: float) -> Optional[float]:
+        """Seconds until a row older than `first_id` is rendered, None on timeout."""
+        started = time.perf_counter()
+        while True:
+            elapsed = time.perf_counter() - started
+            if elapsed >= timeout:
+                return None
+            await asyncio.sleep(0.05)
+            state = await self.UIConfig.scroll_messages()
+            if state and state["first_id"] != first_id:
+                return time.perf_counter() - started
+
+    async def stream(
+            self,
+            chat: whatsapp_chat,
+            heartbeat: float = 5.0,
+            maxsize: int = 0
+    ) -> AsyncIterator[whatsapp_message]:
+        """
+        Push-based alternative to polling `Fetcher`.
+
+        Opens the chat, installs an in-page MutationObserver on the message panel and yields
+        every message WhatsApp appends below the newest one, as soon as it is rendered. Older
+        history rendered by scrolling up is not streamed. When the panel is swapped for another
+        chat the observer stops and is not re-attached until the chat is shown again. Messages
+        are stored and filtered like in `Fetcher` (per delivered batch), those storage already
+        holds are not yielded again.
+
+        Args:
+            chat: Chat to stream, messages are attributed to it until the stream is closed
+            heartbeat: Idle seconds after which the observer is re-checked / re-attached
+            maxsize: Bound of the internal message queue, 0 = unbounded
+
+        Only one stream per MessageProcessor can be active at a time.
+        """
+        if self._stream_queue is not None:
+            raise MessageProcessorError("A message stream is already active on this processor.")
+
+        if not await self.chat_processor._click_chat(chat):
+            raise MessageProcessorError("Chat click failed, cannot start message stream.")
+
+        if self._stream_binding is None:
+            binding = f"__tweakio_stream_{id(self)}"
+            await self.page.expose_binding(binding, self._on_stream_rows)
+            self._stream_binding = binding
+
+        self._stream_queue = asyncio.Queue(maxsize=maxsize)
+        self._stream_chat = chat
+        try:
+            attached = await self.UIConfig.attach_message_observer(self._stream_binding, chat.chat_name)
+            if not attached:
+                self.log.debug("Message panel not rendered yet, observer will attach on heartbeat.")
+
+            while True:
+                try:
+                    first = await asyncio.wait_for(self._stream_queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    # Idle: make sure the observer survived re-renders / reloads.
+                    was_attached = attached
+                    attached = await self.UIConfig.attach_message_observer(self._stream_binding, chat.chat_name)
+                    if was_attached and not attached:
+                        self.log.warning(f"Message panel no longer shows {chat.chat_name!r}, stream paused.")
+                    continue
+
+                batch = [first]
+                while not self._stream_queue.empty():
+                    batch.append(self._stream_queue.get_nowait())
+
+                for msg in await self._deliver(batch):
+                    yield msg
+        finally:
+            self._stream_queue = None
+            self._stream_chat = None
+            try:
+                await self.UIConfig.detach_message_observer()
+            except Exception as e:
+                self.log.debug(f"Detaching message observer failed: {e}")
+
+    def _on_stream_rows(self, source: Any, rows: List[Dict[str, Any]]) -> None:
+        """Page binding callback, wraps rows pushed by the observer into the stream queue."""
+        queue, chat = self._stream_queue, self._stream_chat
+        if queue is None or chat is None:
+            return
+
+        for row in rows or []:
+            if not row.get("data_id"):
+                continue
+            msg = self._wrap_message(
+                chat=chat,
+                data_id=row["data_id"],
+                text=row.get("text") or "",
+                direction=row.get("direction") or "out",
+                data_type=row.get("data_type"),
+                message_ui=self.UIConfig.message_by_dataID(row["data_id"])
+            )
+            try:
+                queue.put_nowait(msg)
+            except asyncio.QueueFull:
+                self.log.warning(f"Message stream queue full, dropping {msg.data_id}")
+
+    async def _deliver(self, msgList: List[whatsapp_message]) -> List[whatsapp_message]:
+        """Store and filter a batch of streamed messages."""
+        if self.storage and msgList:
+            new_ids = await self.storage.filter_new([msg.message_id for msg in msgList])
+            new_msgs = [msg for msg in msgList if msg.message_id in new_ids]
             if new_msgs:
                 await self.storage.enqueue_insert(new_msgs)
-                self.log.debug(f"Enqueued {len(new_msgs)}/{len(msgList)} new messages for storage.")
+            msgList = new_msgs
 
         if self.filter:
             msgList = self.filter.apply(msgList)
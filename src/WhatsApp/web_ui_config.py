@@ -8,11 +8,292 @@ Conventions:
 """
 import re
 import logging
-from typing import Union, Optional
+from typing import Any, Dict, List, Union, Optional
 
 from playwright.async_api import ElementHandle, Locator, Page
 
 from src.Interfaces.web_ui_selector import WebUISelectorCapable
+from src.WhatsApp.DerivedTypes.Message import MessageType
+
+# Shared in-page helpers: `extractRow` mirrors get_message_text / get_dataID /
+# the message type checkers for a single message node.
+# `classify` checks every type rule with one querySelectorAll over the node,
+# TYPE_RULES order is the precedence (a GIF also shows a play icon, a video a data: thumbnail).
+_ROW_EXTRACT_JS = """
+    const visible = (el) => !!el && !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    const TYPE_RULES = [
+        ["sticker", "img[alt*='animated sticker' i], img[alt*='sticker with no label' i], "
+            + "button[aria-label*='sticker' i] img[src*='blob:']"],
+        ["gif", "div[role='button'][aria-label*='play gif' i], span[data-icon*='media-gif' i]"],
+        ["video", "span[data-icon='media-play'], span[data-icon='msg-video']"],
+        ["voice", "button[aria-label*='voice message' i], span[data-icon*='audio-play' i]"],
+        ["image", "[role='button'][aria-label*='open picture' i], img[src*='data:image/']"],
+    ];
+    const TYPE_SELECTOR = TYPE_RULES.map((rule) => rule[1]).join(", ");
+    const classify = (el, text) => {
+        const found = new Set();
+        for (const node of el.querySelectorAll(TYPE_SELECTOR)) {
+            if (!visible(node)) continue;
+            for (const [type, sel] of TYPE_RULES) {
+                if (!found.has(type) && node.matches(sel)) found.add(type);
+            }
+        }
+        const quoted = !!el.querySelector("span.quoted-mention");
+        let type = quoted ? "quoted" : (text ? "text" : "unknown");
+        for (const [rule] of TYPE_RULES) {
+            if (found.has(rule)) { type = rule; break; }
+        }
+        return { type, found, quoted };
+    };
+    const messageText = (el) => {
+        const span = el.querySelector("span[data-testid='selectable-text']");
+        if (span) return visible(span) ? (span.textContent || "") : "";
+        return el.innerText || "";
+    };
+    const extractRow = (el, i) => {
+        const text = messageText(el);
+        const kind = classify(el, text);
+        return {
+            data_id: el.getAttribute("data-id"),
+            index: i,
+            text: text,
+            direction: el.querySelector(".message-in") ? "in" : "out",
+            data_type: kind.type,
+            is_video: kind.found.has("video"),
+            is_voice: kind.found.has("voice"),
+            is_gif: kind.found.has("gif"),
+            is_sticker: kind.found.has("sticker"),
+            is_picture: kind.found.has("image"),
+            is_quoted: kind.quoted,
+        };
+    };
+"""
+
+# In-page script for `WebSelectorConfig.extract_messages_bulk`, runs over every matched node in one call.
+_BULK_MESSAGES_JS = """
+(nodes, [stopAt, hint]) => {
+""" + _ROW_EXTRACT_JS + """
+    // With a watermark, start at the watermark row (inclusive) instead of the top.
+    // `hint` is the DOM position it was last seen at; otherwise walk back from the newest row.
+    let start = 0;
+    if (stopAt) {
+        if (hint !== null && hint >= 0 && hint < nodes.length && nodes[hint].getAttribute("data-id") === stopAt) {
+            start = hint;
+        } else {
+            for (let i = nodes.length - 1; i >= 0; i--) {
+                if (nodes[i].getAttribute("data-id") === stopAt) { start = i; break; }
+            }
+        }
+    }
+
+    const out = [];
+    for (let i = start; i < nodes.length; i++) {
+        if (nodes[i].getAttribute("data-id")) out.push(extractRow(nodes[i], i));
+    }
+    return out;
+}
+"""
+
+# In-page script for `WebSelectorConfig.classify_messages`: data-id -> type for every (or the wanted) rows.
+_CLASSIFY_MESSAGES_JS = """
+(nodes, ids) => {
+""" + _ROW_EXTRACT_JS + """
+    const wanted = ids ? new Set(ids) : null;
+    const out = {};
+    for (const el of nodes) {
+        const id = el.getAttribute("data-id");
+        if (!id || (wanted && !wanted.has(id))) continue;
+        out[id] = classify(el, messageText(el)).type;
+    }
+    return out;
+}
+"""
+
+# In-page script for `WebSelectorConfig.attach_message_observer`.
+# Watches the #main message panel and pushes rows appended below the newest row seen to the
+# exposed binding. Rows rendered at attach time, and older history rendered above them (scrolling
+# up, backfill), are never forwarded; while the newest row is scrolled out of the DOM nothing is.
+# When WhatsApp swaps the #main node (re-render / chat switch) the observer re-attaches itself only
+# if the header still shows the streamed chat, otherwise it stops (attach returns false).
+_MESSAGE_OBSERVER_JS = """
+function attach({ binding, chat }) {
+""" + _ROW_EXTRACT_JS + """
+    const ROW_SEL = '[role="row"] div[data-id]';
+    const headerName = (panel) => {
+        for (const el of panel.querySelectorAll('header span[title], header span[dir="auto"]')) {
+            const name = (el.getAttribute("title") || el.textContent || "").trim();
+            if (name) return name.toLowerCase();
+        }
+        return null;
+    };
+
+    const state = window.__tweakioStream = window.__tweakioStream || {};
+    const reattach = state.binding === binding && state.chat === chat;
+    if (reattach && state.panel && state.panel.isConnected) return true;
+    if (state.stop) state.stop();
+    if (!reattach) {
+        state.seen = new Set();
+        state.newest = null;
+    }
+
+    const panel = document.querySelector("#main");
+    if (!panel || !panel.parentElement) return false;
+    const shown = headerName(panel);
+    // A swapped panel must prove it is still the streamed chat, a fresh attach follows the chat click
+    if (chat && (shown ? shown !== chat.toLowerCase() : reattach)) {
+        state.binding = null;
+        return false;
+    }
+
+    const lastId = (rows) => rows.length ? rows[rows.length - 1].getAttribute("data-id") : null;
+    const forwardAppended = () => {
+        const rows = panel.querySelectorAll(ROW_SEL);
+        const last = lastId(rows);
+        if (state.newest === null) {
+            state.newest = last;
+            return;
+        }
+        if (last === null || last === state.newest) return;
+        // Walk up from the bottom to the newest row seen, everything below it was appended
+        const added = [];
+        for (let i = rows.length - 1; i >= 0; i--) {
+            const id = rows[i].getAttribute("data-id");
+            if (id === state.newest) {
+                state.newest = last;
+                added.reverse();
+                added.forEach((el) => state.seen.add(el.getAttribute("data-id")));
+                if (added.length) window[binding](added.map((el) => extractRow(el, -1)));
+                return;
+            }
+            if (id && !state.seen.has(id)) added.push(rows[i]);
+        }
+        // Newest row not rendered (scrolled away): wait until it is back
+    };
+
+    const rows = panel.querySelectorAll(ROW_SEL);
+    if (state.newest === null) rows.forEach((el) => state.seen.add(el.getAttribute("data-id")));
+    if (state.newest !== null && !Array.prototype.some.call(rows, (el) => el.getAttribute("data-id") === state.newest)) {
+        state.newest = lastId(rows);  // fresh render of the chat bottom, missed rows are left to Fetcher
+    }
+    forwardAppended();
+
+    const panelObserver = new MutationObserver(forwardAppended);
+    panelObserver.observe(panel, { childList: true, subtree: true });
+
+    const parentObserver = new MutationObserver(() => {
+        if (!panel.isConnected) {
+            state.stop();
+            attach({ binding, chat });
+        }
+    });
+    parentObserver.observe(panel.parentElement, { childList: true });
+
+    state.binding = binding;
+    state.chat = chat;
+    state.panel = panel;
+    state.stop = () => {
+        panelObserver.disconnect();
+        parentObserver.disconnect();
+        state.panel = null;
+    };
+    return true;
+}
+"""
+
+# In-page script for `WebSelectorConfig.scroll_messages`: moves the message list's scroll container.
+_SCROLL_MESSAGES_JS = """
+(delta) => {
+    const rows = document.querySelectorAll('#main [role="row"] div[data-id]');
+    if (!rows.length) return null;
+    let box = rows[0].parentElement;
+    while (box && !(box.scrollHeight > box.clientHeight && /(auto|scroll)/.test(getComputedStyle(box).overflowY))) {
+        box = box.parentElement;
+    }
+    if (!box) return null;
+    if (delta) {
+        // Never scroll up further than the oldest rendered row can stay in view, so windows overlap.
+        const oldest = rows[0].getBoundingClientRect().top - box.getBoundingClientRect().top + box.scrollTop;
+        const maxUp = Math.max(1, box.scrollTop - oldest + box.clientHeight * 0.9);
+        box.scrollTop = Math.max(0, box.scrollTop + Math.max(delta, -maxUp));
+    }
+    return {
+        top: box.scrollTop,
+        height: box.scrollHeight,
+        first_id: rows[0].getAttribute("data-id"),
+        count: rows.length,
+    };
+}
+"""
+
+# In-page script for `WebSelectorConfig.extract_chat_rows`, mirrors getChatName / is_community / is_unread.
+# The name is the first span[title] (second in community rows), the preview the span[title] after it
+# and the time the element next to the name's container.
+_CHAT_ROWS_JS = """
+(rows) => {
+    const visible = (el) => !!el && !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    const extractChatRow = (row, i) => {
+        const community = visible(row.querySelector("span[data-icon='default-community-refreshed']"));
+        const titles = row.querySelectorAll("span[title]");
+        const offset = community ? 1 : 0;
+        const nameEl = titles[offset];
+
+        let time = "";
+        if (nameEl) {
+            let header = nameEl;
+            while (!header.nextElementSibling && header.parentElement && header.parentElement !== row) {
+                header = header.parentElement;
+            }
+            if (header.nextElementSibling) time = (header.nextElementSibling.textContent || "").trim();
+        }
+
+        // A badge without a number is a chat marked as unread.
+        const badge = row.querySelector("[aria-label*='unread' i]");
+        let unread = 0;
+        if (badge) {
+            const count = parseInt((badge.textContent || "").trim(), 10);
+            unread = Number.isNaN(count) ? 1 : count;
+        }
+
+        return {
+            index: Number(row.getAttribute("aria-rowindex") || i),
+            name: nameEl ? (nameEl.getAttribute("title") || "") : "",
+            preview: titles[offset + 1] ? (titles[offset + 1].getAttribute("title") || "") : "",
+            time: time,
+            unread: unread,
+            community: community,
+        };
+    };
+    return rows.map(extractChatRow);
+}
+"""
+
+# In-page script for `WebSelectorConfig.scroll_chat_list`, runs on the chat list grid.
+_SCROLL_CHAT_LIST_JS = """
+(grid, [pages, toTop]) => {
+    let box = grid;
+    while (box && !(box.scrollHeight > box.clientHeight && /(auto|scroll)/.test(getComputedStyle(box).overflowY))) {
+        box = box.parentElement;
+    }
+    const total = Number(grid.getAttribute("aria-rowcount") || 0);
+    if (!box) return { top: 0, height: 0, at_end: true, total: total };
+    if (toTop) box.scrollTop = 0;
+    else if (pages) box.scrollTop = Math.max(0, box.scrollTop + pages * box.clientHeight);
+    return {
+        top: box.scrollTop,
+        height: box.scrollHeight,
+        at_end: box.scrollTop + box.clientHeight >= box.scrollHeight - 2,
+        total: total,
+    };
+}
+"""
+
+_DETACH_OBSERVER_JS = """
+() => {
+    const state = window.__tweakioStream;
+    if (state && state.stop) state.stop();
+    if (state) state.binding = state.chat = null;
+}
+"""
 
 
 class WebSelectorConfig(WebUISelectorCapable):
@@ -80,6 +361,32 @@ class WebSelectorConfig(WebUISelectorCapable):
             return list_locator
         return None
 
+    def chat_by_name(self, name: str) -> Locator:
+        """Returns a lazy locator for the chat list row titled `name` (resolves once the row is rendered)."""
+        escaped = name.replace("\\", "\\\\").replace('"', '\\"')
+        return self.chat_list().get_by_role("row").filter(
+            has=self.page.locator(f'span[title="{escaped}"]')
+        ).first
+
+    async def extract_chat_rows(self) -> List[Dict[str, Any]]:
+        """
+        Extracts every rendered chat list row in one in-page evaluation.
+
+        Each entry is a dict with keys:
+            index (aria-rowindex), name, preview, time (as displayed),
+            unread (badge count, 1 for a chat marked unread, 0 otherwise), community
+        """
+        return await self.chat_list().get_by_role("row").evaluate_all(_CHAT_ROWS_JS) or []
+
+    async def scroll_chat_list(self, pages: float = 0.0, to_top: bool = False) -> Dict[str, Any]:
+        """
+        Scrolls the virtualised chat list by `pages` viewport heights (negative = up), or back to the top.
+
+        Returns the state after scrolling as a dict with keys:
+            top (scrollTop), height (scrollHeight), at_end (bottom reached), total (aria-rowcount)
+        """
+        return await self.chat_list().evaluate(_SCROLL_CHAT_LIST_JS, [pages, to_top])
+
     @staticmethod
     async def getChat_low_Quality_Img(chat: Union[ElementHandle, Locator]) -> str:
         """Extracts the low-quality image (thumbnail) from a chat preview item."""
@@ -200,6 +507,68 @@ class WebSelectorConfig(WebUISelectorCapable):
     # def get_message_text(element: Locator | ElementHandle) -> str:
     #     return element.inner_text().strip()
 
+    async def extract_messages_bulk(
+            self,
+            stop_at: Optional[str] = None,
+            hint: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Extracts every rendered message of the open chat in one in-page evaluation.
+
+        Each entry is a dict with keys:
+            data_id, index (DOM position), text, direction ("in" | "out"),
+            data_type (a MessageType value, see classify_messages),
+            is_video, is_voice, is_gif, is_sticker, is_picture, is_quoted
+
+        If `stop_at` (a data-id) is rendered, only that row and the rows after it are returned.
+        `hint` is the DOM position `stop_at` was last seen at, checked before scanning.
+        Nodes without a data-id are skipped.
+        """
+        messages = await self.messages()
+        return await messages.evaluate_all(_BULK_MESSAGES_JS, [stop_at, hint]) or []
+
+    async def classify_messages(self, data_ids: Optional[List[str]] = None) -> Dict[str, MessageType]:
+        """
+        Types of the rendered messages (all of them, or only `data_ids`) in one in-page pass.
+
+        Applies the same rules as isSticker / is_gif / isVideo / is_Voice_Message / pic_handle /
+        isQuotedText, first match wins in that order. Messages without media are QUOTED when
+        they quote another message, TEXT when they have text and UNKNOWN otherwise.
+        """
+        messages = await self.messages()
+        types = await messages.evaluate_all(_CLASSIFY_MESSAGES_JS, data_ids) or {}
+        return {data_id: MessageType.parse(value) for data_id, value in types.items()}
+
+    async def attach_message_observer(self, binding: str, chat_name: Optional[str] = None) -> bool:
+        """
+        Installs a MutationObserver on the message panel that calls the exposed
+        `binding` with a list of new message rows (same shape as `extract_messages_bulk`).
+        Only rows appended below the newest row are forwarded, not history rendered by scrolling up.
+
+        With `chat_name` the observer stops when a swapped panel's header shows another chat.
+        Idempotent, returns False if the panel is not rendered yet or shows another chat.
+        """
+        return bool(await self.page.evaluate(_MESSAGE_OBSERVER_JS, {"binding": binding, "chat": chat_name}))
+
+    async def detach_message_observer(self) -> None:
+        """Disconnects the observer installed by `attach_message_observer`."""
+        await self.page.evaluate(_DETACH_OBSERVER_JS)
+
+    async def scroll_messages(self, delta: int = 0) -> Optional[Dict[str, Any]]:
+        """
+        Scrolls the open chat's message list by `delta` pixels (negative = towards older messages).
+        Upward scrolls are capped so the oldest rendered row stays in view (consecutive windows overlap).
+
+        Returns the state after scrolling as a dict with keys:
+            top (scrollTop), height (scrollHeight), first_id (data-id of the oldest rendered row), count
+        or None if no message list is rendered. `delta=0` only reads the state.
+        """
+        return await self.page.evaluate(_SCROLL_MESSAGES_JS, delta)
+
+    def message_by_dataID(self, data_id: str) -> Locator:
+        """Returns a lazy locator for the message node carrying the given data-id."""
+        return self.page.locator(f'[role="row"] div[data-id="{data_id}"]')
+
     @staticmethod
     async def is_message_out(message: Union[ElementHandle, Locator]) -> bool:
         """Returns True if the message is outgoing (sent by bot)."""
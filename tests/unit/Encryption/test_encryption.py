@@ -3,7 +3,7 @@ Unit tests for Encryption module.
 """
 import pytest
 
-from src.Encryption import MessageEncryptor, MessageDecryptor, KeyManager
+from src.Encryption import MessageEncryptor, MessageDecryptor, KeyManager, BlindIndexer
 from cryptography.exceptions import InvalidTag
 
 
@@ -279,3 +279,39 @@ class TestKeyManager:
 
         with pytest.raises(ValueError, match="Salt must be at least"):
             key_manager.derive_key(password, b"")
+
+
+class TestBlindIndexer:
+    """Test cases for BlindIndexer."""
+
+    def test_tokens_deterministic_and_normalised(self):
+        """Test same words give the same tokens regardless of case and spacing."""
+        indexer = BlindIndexer(b'0' * 32)
+
+        assert indexer.query_tokens("Hello WORLD") == indexer.query_tokens("hello   world")
+        assert indexer.exact_token("Hello  World") == indexer.exact_token("hello world")
+        assert len(indexer.word_token("hello")) == 16
+
+    def test_tokens_depend_on_key(self):
+        """Test different keys give unrelated tokens."""
+        assert BlindIndexer(b'0' * 32).word_token("hello") != BlindIndexer(b'1' * 32).word_token("hello")
+
+    def test_message_tokens(self):
+        """Test a message yields its exact token plus distinct word tokens."""
+        indexer = BlindIndexer(b'0' * 32)
+        tokens = indexer.message_tokens("a test, a TEST again")
+
+        assert tokens[0] == indexer.exact_token("a test, a TEST again")
+        assert tokens[1:] == [indexer.word_token("test"), indexer.word_token("again")]
+        assert indexer.message_tokens("") == []
+
+    def test_derive_subkey(self):
+        """Test HKDF subkeys are deterministic and bound to their purpose."""
+        key_manager = KeyManager()
+        key = KeyManager.generate_random_key()
+
+        assert key_manager.derive_subkey(key, "a") == key_manager.derive_subkey(key, "a")
+        assert key_manager.derive_subkey(key, "a") != key_manager.derive_subkey(key, "b")
+        assert key_manager.derive_subkey(key, "a") != key
+        with pytest.raises(ValueError, match="Purpose cannot be empty"):
+            key_manager.derive_subkey(key, "")
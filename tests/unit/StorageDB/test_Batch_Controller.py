@@ -0,0 +1,99 @@
+"""
+Unit tests for AdaptiveBatchController and its use by the SQLite writer.
+Tests cover growth under backlog, shrinking on slow commits and the latency budget.
+"""
+
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from src.StorageDB.batch_controller import AdaptiveBatchController
+from src.StorageDB.sqlite_db import SQLITE_DB
+
+
+# ============================================================================
+# TESTS
+# ============================================================================
+
+def test_grows_under_backlog():
+    """Test batch size doubles while a backlog remains and commits are cheap."""
+    ctl = AdaptiveBatchController(target_latency=1.0, min_batch=10, max_batch=80)
+    for expected in (20, 40, 80, 80):
+        ctl.record_commit(rows=ctl.batch_size, commit_seconds=0.01, persist_seconds=0.1, queue_depth=500)
+        assert ctl.batch_size == expected
+    assert ctl.last_decision == "grow"
+
+
+def test_shrinks_on_slow_commits():
+    """Test batch size halves when a commit alone takes over half the budget."""
+    ctl = AdaptiveBatchController(target_latency=1.0, min_batch=10, max_batch=1000)
+    ctl.batch_size = 400
+    ctl.record_commit(rows=400, commit_seconds=0.8, persist_seconds=1.5, queue_depth=5000)
+    assert ctl.batch_size == 200
+    assert ctl.last_decision == "shrink"
+
+
+def test_decays_when_idle():
+    """Test batch size slowly returns to the minimum when the queue is empty."""
+    ctl = AdaptiveBatchController(min_batch=10)
+    ctl.batch_size = 100
+    ctl.record_commit(rows=3, commit_seconds=0.001, persist_seconds=0.01, queue_depth=0)
+    assert ctl.batch_size == 90
+    assert ctl.last_decision == "decay"
+
+
+def test_flush_interval_is_latency_budget():
+    """Test flush interval is the target minus p99 commit time, clamped."""
+    ctl = AdaptiveBatchController(target_latency=0.5, min_interval=0.05, max_interval=2.0)
+    ctl.record_commit(rows=10, commit_seconds=0.2, persist_seconds=0.3, queue_depth=0)
+    assert ctl.flush_interval == pytest.approx(0.3)
+
+    ctl.record_commit(rows=10, commit_seconds=0.49, persist_seconds=0.6, queue_depth=0)
+    assert ctl.flush_interval == pytest.approx(0.05)
+
+    stats = ctl.stats()
+    assert stats["commits"] == 2 and stats["rows"] == 20
+    assert stats["commit_p99"] == pytest.approx(0.49)
+
+
+def test_invalid_arguments():
+    """Test constructor validation."""
+    with pytest.raises(ValueError):
+        AdaptiveBatchController(target_latency=0)
+    with pytest.raises(ValueError):
+        AdaptiveBatchController(min_batch=10, max_batch=5)
+
+
+@pytest.mark.asyncio
+async def test_writer_uses_controller(tmp_path):
+    """Test the writer feeds commits to the controller and applies its decisions."""
+    ctl = AdaptiveBatchController(target_latency=0.2, min_batch=5, max_batch=500, min_interval=0.01)
+    db = SQLITE_DB(queue=asyncio.Queue(), log=logging.getLogger("test"), db_path=str(tmp_path / "m.db"),
+                   batch_controller=ctl)
+    assert db.batch_size == 5
+
+    chat = SimpleNamespace(chat_name="c", chat_id="c")
+    await db.init_db()
+    await db.create_table()
+    try:
+        for i in range(40):
+            await db.enqueue_insert([
+                SimpleNamespace(message_id=f"m{i}-{j}", raw_data="x", encrypted_message=None, encryption_nonce=None,
+                                data_type="text", direction="in", parent_chat=chat, system_hit_time=0.0)
+                for j in range(25)
+            ])
+        await db.start_writer()
+        for _ in range(200):
+            if db.queue_stats()["in_flight"] == 0:
+                break
+            await asyncio.sleep(0.02)
+
+        stats = db.queue_stats()
+        assert stats["in_flight"] == 0
+        assert stats["batch_controller"]["commits"] >= 1
+        assert stats["batch_controller"]["rows"] == 1000
+        assert stats["batch_size"] == ctl.batch_size > 5
+    finally:
+        await db.close_db()
@@ -0,0 +1,57 @@
+"""
+Unit tests for the zstd raw_data codec.
+Tests cover dictionary training, versioned frames and plain-text passthrough.
+"""
+
+import pytest
+
+from src.StorageDB.codec import ZstdCodec
+
+
+def _samples(n=300):
+    return [f"Hey, are we still meeting at {i % 12} pm near the office? Let me know asap #{i}" for i in range(n)]
+
+
+# ============================================================================
+# TESTS
+# ============================================================================
+
+def test_passthrough_without_dictionary():
+    """Test text is stored plain until a dictionary exists."""
+    codec = ZstdCodec()
+    assert codec.encode("hello there, this is long enough") == "hello there, this is long enough"
+    assert codec.decode("plain") == "plain"
+    assert codec.decode(None) is None
+
+
+def test_roundtrip_with_trained_dictionary():
+    """Test trained dictionary shrinks short messages and decodes them back."""
+    codec = ZstdCodec()
+    codec.load(1, ZstdCodec.train(_samples(), dict_size=4096))
+
+    text = "Hey, are we still meeting at 3 pm near the office? Let me know asap #999"
+    encoded = codec.encode(text)
+    assert isinstance(encoded, bytes)
+    assert len(encoded) < len(text.encode()) // 2
+    assert codec.decode(encoded) == text
+    assert codec.encode("short") == "short"
+
+
+def test_old_versions_still_decode():
+    """Test rows written with an older dictionary decode after retraining."""
+    codec = ZstdCodec()
+    codec.load(1, ZstdCodec.train(_samples(), dict_size=4096))
+    old = codec.encode(_samples()[5])
+
+    codec.load(2, ZstdCodec.train([s.upper() for s in _samples()], dict_size=4096))
+    assert codec.current_version == 2
+    assert codec.decode(old) == _samples()[5]
+
+    with pytest.raises(KeyError, match="Unknown compression dictionary version"):
+        ZstdCodec().decode(old)
+
+
+def test_train_needs_samples():
+    """Test training refuses tiny sample sets."""
+    with pytest.raises(ValueError, match="at least 8"):
+        ZstdCodec.train(["a", "b"])
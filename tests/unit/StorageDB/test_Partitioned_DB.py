@@ -0,0 +1,284 @@
+"""
+Unit tests for PartitionedSQLiteDB.
+Tests cover partition routing, fan-out reads, dedup through the router and dropping partitions.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from src.Exceptions.base import StorageError
+from src.Interfaces.message_interface import MessageInterface
+from src.StorageDB.partitioned_db import PartitionedSQLiteDB
+from src.StorageDB.seen_index import SeenIndex
+
+
+@pytest.fixture
+def mock_logger():
+    return Mock(spec=logging.Logger)
+
+
+def _msg(message_id, text="hi", chat_name="Chat A", hit_time=1.0):
+    msg = Mock(spec=MessageInterface)
+    msg.message_id = message_id
+    msg.raw_data = text
+    msg.encrypted_message = None
+    msg.encryption_nonce = None
+    msg.data_type = "text"
+    msg.direction = "in"
+    msg.system_hit_time = hit_time
+    msg.parent_chat = Mock()
+    msg.parent_chat.chatName = chat_name
+    msg.parent_chat.chatID = chat_name.lower()
+    return msg
+
+
+async def _open(tmp_path, mock_logger, **kwargs):
+    db = PartitionedSQLiteDB(queue=asyncio.Queue(), log=mock_logger, db_path=str(tmp_path / "messages.db"), **kwargs)
+    await db.init_db()
+    await db.create_table()
+    return db
+
+
+# ============================================================================
+# TESTS
+# ============================================================================
+
+def test_rejects_unsupported_options(mock_logger):
+    with pytest.raises(ValueError, match="full_text_search"):
+        PartitionedSQLiteDB(queue=asyncio.Queue(), log=mock_logger, full_text_search=True)
+    with pytest.raises(ValueError, match="database file"):
+        PartitionedSQLiteDB(queue=asyncio.Queue(), log=mock_logger, db_path=":memory:")
+    with pytest.raises(ValueError, match="max_attached"):
+        PartitionedSQLiteDB(queue=asyncio.Queue(), log=mock_logger, max_attached=10)
+
+
+@pytest.mark.asyncio
+async def test_rows_partitions_and_fan_out_pages(tmp_path, mock_logger):
+    """Test rows roll over into new files and keyset pages walk across them in id order."""
+    db = await _open(tmp_path, mock_logger, partition_by="rows", rows_per_partition=3)
+    try:
+        for start in range(0, 9, 3):
+            await db._insert_batch_internally(
+                [_msg(f"m{i}", chat_name="A" if i % 2 else "B", hit_time=float(i)) for i in range(start, start + 3)]
+            )
+
+        partitions = await db.list_partitions()
+        assert [(p["name"], p["row_count"], p["min_id"], p["max_id"]) for p in partitions] == [
+            ("n000001", 3, 1, 3), ("n000002", 3, 4, 6), ("n000003", 3, 7, 9)
+        ]
+        assert all((tmp_path / f"messages.{p['name']}.db").exists() for p in partitions)
+
+        seen, cursor = [], None
+        while True:
+            rows, cursor = await db.get_messages_page(cursor=cursor, limit=4)
+            seen.extend(r["message_id"] for r in rows)
+            if cursor is None:
+                break
+        assert seen == [f"m{i}" for i in range(8, -1, -1)]
+
+        rows, _ = await db.get_messages_page(chat_name="A", since=2.0, until=7.0)
+        assert [r["message_id"] for r in rows] == ["m5", "m3"]
+        assert [r["message_id"] for r in await db.get_all_messages_async(limit=2, offset=3)] == ["m5", "m4"]
+        assert [r["message_id"] for r in db.get_all_messages(limit=2, offset=3)] == ["m5", "m4"]
+        assert [m.message_id async for m in db.iter_messages(row_format="record")] == [f"m{i}" for i in range(9)]
+
+        assert (await db.get_chat_summary("a"))["message_count"] == 4
+        assert await db.filter_new(["m1", "m8", "new"]) == {"new"}
+        assert await db.check_message_if_exists_async("m4")
+    finally:
+        await db.close_db()
+
+
+@pytest.mark.asyncio
+async def test_duplicates_are_ignored_across_partitions(tmp_path, mock_logger):
+    """Test a message already stored in an older partition is not stored again."""
+    db = await _open(tmp_path, mock_logger, partition_by="rows", rows_per_partition=2)
+    try:
+        events = db.subscribe()
+        await db._insert_batch_internally([_msg("m1"), _msg("m2")])
+        await db._insert_batch_internally([_msg("m1"), _msg("m3"), _msg("m3")])
+
+        assert [p["row_count"] for p in await db.list_partitions()] == [2, 1]
+        assert (await db.get_chat_summary("chat a"))["message_count"] == 3
+        first, second = await events.__anext__(), await events.__anext__()
+        assert [m.message_id for m in second.messages] == ["m3"]
+        assert second.messages[0].parent_chat_name == "Chat A"
+    finally:
+        await db.close_db()
+
+
+@pytest.mark.asyncio
+async def test_time_bounds_prune_partitions(tmp_path, mock_logger, monkeypatch):
+    """Test month partitions outside the requested time range are never attached."""
+    assert PartitionedSQLiteDB(queue=asyncio.Queue(), log=mock_logger)._target_partition() == \
+        time.strftime("%Y_%m", time.gmtime())
+
+    db = await _open(tmp_path, mock_logger, read_pool_size=0)
+    try:
+        for month, hit_time in (("2026_01", 100.0), ("2026_02", 200.0), ("2026_03", 300.0)):
+            monkeypatch.setattr(db, "_target_partition", lambda month=month: month)
+            await db._insert_batch_internally([_msg(f"m{month}", hit_time=hit_time)])
+
+        # Reads go through the writer connection here, start from a clean slate
+        for name in list(db._attached[id(db._conn)]):
+            await db._conn.execute(f"DETACH DATABASE p_{name}")
+        db._attached.clear()
+
+        rows, _ = await db.get_messages_page(since=150.0, until=250.0)
+        assert [r["message_id"] for r in rows] == ["m2026_02"]
+        assert list(db._attached[id(db._conn)]) == ["2026_02"]
+    finally:
+        await db.close_db()
+
+
+@pytest.mark.asyncio
+async def test_attached_partitions_are_bounded(tmp_path, mock_logger):
+    """Test readers keep at most max_attached partitions attached."""
+    db = await _open(tmp_path, mock_logger, partition_by="rows", rows_per_partition=1, max_attached=2,
+                     profile="balanced")
+    try:
+        for i in range(5):
+            await db._insert_batch_internally([_msg(f"m{i}")])
+        assert len(await db.list_partitions()) == 5
+
+        assert [r["message_id"] async for r in db.iter_messages(newest_first=True)] == [f"m{i}" for i in range(4, -1, -1)]
+        assert all(len(names) <= 2 for names in db._attached.values())
+    finally:
+        await db.close_db()
+
+
+@pytest.mark.asyncio
+async def test_write_while_iterating(tmp_path, mock_logger):
+    """Test iter_messages without a read pool (default profile) lets the consumer write between rows."""
+    db = await _open(tmp_path, mock_logger, partition_by="rows", rows_per_partition=3, flush_interval=0.01)
+    await db.start_writer()
+    try:
+        await db._insert_batch_internally([_msg(f"m{i}") for i in range(5)])
+        assert db._read_pool is None
+
+        async def copy():
+            seen = []
+            async for row in db.iter_messages(chunk_size=2):
+                seen.append(row["message_id"])
+                await db.enqueue_insert([_msg(f"copy-{row['message_id']}")], wait=True)
+                await db.set_watermark("chat a", row["message_id"], len(seen))
+            return seen
+
+        assert await asyncio.wait_for(copy(), timeout=5) == [f"m{i}" for i in range(5)]
+        assert await db.filter_new([f"copy-m{i}" for i in range(5)]) == set()
+    finally:
+        await db.close_db()
+
+
+@pytest.mark.asyncio
+async def test_drop_partition(tmp_path, mock_logger):
+    """Test dropping keeps ids known by default, forget_ids lets them be stored again."""
+    db = await _open(tmp_path, mock_logger, partition_by="rows", rows_per_partition=2, seen_index=SeenIndex(capacity=100))
+    try:
+        await db._insert_batch_internally([_msg("m1"), _msg("m2")])
+        await db._insert_batch_internally([_msg("m3"), _msg("m4")])
+        await db._insert_batch_internally([_msg("m5")])
+        await db.get_all_messages_async()  # read connection has every partition attached
+
+        with pytest.raises(StorageError, match="currently written"):
+            await db.drop_partition("n000003")
+        with pytest.raises(StorageError, match="Unknown partition"):
+            await db.drop_partition("n000099")
+
+        assert await db.drop_partition("n000001") == 2
+        assert not (tmp_path / "messages.n000001.db").exists()
+        assert await db.filter_new(["m1"]) == set()
+        assert [r["message_id"] for r in await db.get_all_messages_async()] == ["m5", "m4", "m3"]
+        assert (await db.get_chat_summary("chat a"))["message_count"] == 3
+
+        archived = tmp_path / "messages.n000002.db"
+        assert await db.drop_partition("n000002", delete_file=False, forget_ids=True) == 2
+        assert archived.exists()
+        assert await db.filter_new(["m3", "m4"]) == {"m3", "m4"}
+        assert [r["message_id"] for r in await db.get_all_messages_async()] == ["m5"]
+    finally:
+        await db.close_db()
+
+
+@pytest.mark.asyncio
+async def test_reopen_continues_current_partition(tmp_path, mock_logger):
+    """Test the router state survives a restart."""
+    db = await _open(tmp_path, mock_logger, partition_by="rows", rows_per_partition=3)
+    await db._insert_batch_internally([_msg("m1"), _msg("m2")])
+    await db.set_watermark("chat a", "m2", 1)
+    await db.close_db()
+
+    db = await _open(tmp_path, mock_logger, partition_by="rows", rows_per_partition=3,
+                     seen_index=SeenIndex(capacity=100))
+    try:
+        assert "m1" in db.seen_index
+        await db._insert_batch_internally([_msg("m3"), _msg("m4")])
+        assert [(p["name"], p["row_count"]) for p in await db.list_partitions()] == [("n000001", 4)]
+        assert await db.get_watermark("chat a") == ("m2", 1)
+        await db.set_backfill_checkpoint("chat a", "m1", 2, complete=True)
+        assert (await db.get_backfill_checkpoint("chat a"))["complete"]
+    finally:
+        await db.close_db()
+
+
+@pytest.mark.asyncio
+async def test_reopen_reconciles_torn_commit(tmp_path, mock_logger):
+    """Test a batch that reached only the router or only the partition is repaired on reopen."""
+    db = await _open(tmp_path, mock_logger, partition_by="rows", rows_per_partition=10, profile="balanced")
+    await db._insert_batch_internally([_msg("m1", hit_time=1.0), _msg("m2", hit_time=2.0)])
+    await db._insert_batch_internally([_msg("m3", hit_time=5.0), _msg("m4", hit_time=6.0)])
+    await db.close_db()
+
+    # Router kept the second batch, the partition lost it
+    with sqlite3.connect(tmp_path / "messages.n000001.db") as conn:
+        conn.execute("DELETE FROM messages WHERE id > 2")
+    db = await _open(tmp_path, mock_logger, partition_by="rows", rows_per_partition=10, profile="balanced",
+                     seen_index=SeenIndex(capacity=100))
+    try:
+        assert await db.filter_new(["m1", "m3", "m4"]) == {"m3", "m4"}
+        partition = (await db.list_partitions())[0]
+        assert (partition["row_count"], partition["max_id"]) == (2, 2)
+        cursor = await db._conn.execute("SELECT message_count, first_seen, last_seen FROM chats")
+        assert tuple(await cursor.fetchone()) == (2, 1.0, 2.0)
+    finally:
+        await db.close_db()
+
+    # Partition kept a batch the router lost
+    with sqlite3.connect(tmp_path / "messages.n000001.db") as conn:
+        conn.execute("INSERT INTO messages (id, message_id, chat_ref, system_hit_time) VALUES (3, 'm5', 1, 1.0)")
+    db = await _open(tmp_path, mock_logger, partition_by="rows", rows_per_partition=10, profile="balanced")
+    try:
+        await db._insert_batch_internally([_msg("m3")])
+        rows = await db.get_all_messages_async()
+        assert sorted(r["message_id"] for r in rows) == ["m1", "m2", "m3"]
+        assert (await db.list_partitions())[0]["row_count"] == 3
+    finally:
+        await db.close_db()
+
+
+@pytest.mark.asyncio
+async def test_retention_drops_expired_partitions(tmp_path, mock_logger, monkeypatch):
+    """Test max_age retention drops whole partitions and other limits are rejected."""
+    from src.StorageDB.retention import RetentionPolicy
+
+    with pytest.raises(ValueError, match="max_age"):
+        PartitionedSQLiteDB(queue=asyncio.Queue(), log=mock_logger, retention=RetentionPolicy(max_bytes=10))
+
+    now = time.time()
+    db = await _open(tmp_path, mock_logger, retention=RetentionPolicy(max_age=3600))
+    try:
+        for month, hit_time in (("2026_01", now - 7200), ("2026_02", now - 10), ("2026_03", now - 7200)):
+            monkeypatch.setattr(db, "_target_partition", lambda month=month: month)
+            await db._insert_batch_internally([_msg(f"m{month}", hit_time=hit_time)])
+
+        report = await db.enforce_retention()
+        assert report["dropped_partitions"] == ["2026_01"]  # 2026_03 is current
+        assert report["expired"] == 1 and report["reclaimed_bytes"] > 0
+        assert [p["name"] for p in await db.list_partitions()] == ["2026_02", "2026_03"]
+    finally:
+        await db.close_db()
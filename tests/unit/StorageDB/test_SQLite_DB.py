@@ -6,6 +6,7 @@ Tests cover database initialization, table creation, and message operations.
 import asyncio
 import logging
 import sqlite3
+import time
 from unittest.mock import Mock, AsyncMock, patch
 
 import pytest
@@ -67,12 +68,65 @@ async def test_init_db_failure(db_instance):
 @pytest.mark.asyncio
 async def test_create_table_success(db_instance, mock_conn):
     db_instance._conn = mock_conn
+    mock_cursor = AsyncMock()
+    mock_cursor.fetchone.return_value = (0,)
+    mock_conn.execute.return_value = mock_cursor
     await db_instance.create_table()
     
-    # Should execute CREATE TABLE and CREATE INDEX
-    assert mock_conn.execute.call_count == 2
+    # Should execute CREATE TABLE, the watermark table and the schema migrations
+    statements = [c[0][0] for c in mock_conn.execute.call_args_list]
     mock_conn.commit.assert_called_once()
-    assert "CREATE TABLE" in mock_conn.execute.call_args_list[0][0][0]
+    assert "CREATE TABLE" in statements[0]
+    assert "DROP INDEX IF EXISTS idx_message_id" in statements
+    assert "PRAGMA user_version = 1" in statements
+
+
+@pytest.mark.asyncio
+async def test_create_table_migrates_legacy_schema(tmp_path, mock_logger):
+    """Test the migrations drop the redundant index, move chats to their own table and index the chat query."""
+    db_path = tmp_path / "legacy.db"
+    with sqlite3.connect(db_path) as legacy:
+        legacy.execute("CREATE TABLE messages (id INTEGER PRIMARY KEY AUTOINCREMENT, message_id TEXT UNIQUE NOT NULL, "
+                       "raw_data TEXT, encrypted_message BLOB, encryption_nonce BLOB, data_type TEXT, direction TEXT, "
+                       "parent_chat_name TEXT, parent_chat_id TEXT, system_hit_time REAL, "
+                       "created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+        legacy.execute("CREATE INDEX idx_message_id ON messages(message_id)")
+        legacy.executemany(
+            "INSERT INTO messages (message_id, parent_chat_name, parent_chat_id, system_hit_time) VALUES (?, ?, ?, ?)",
+            [("wa-msg::1", "A", "wa::a", 1.0), ("wa-msg::2", "B", "wa::b", 2.0), ("wa-msg::3", "A", "wa::a", 3.0)]
+        )
+
+    db = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=str(db_path))
+    await db.init_db()
+    try:
+        await db.create_table()
+        await db.create_table()  # idempotent
+
+        cursor = await db._conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+        names = {row[0] for row in await cursor.fetchall()}
+        assert "idx_message_id" not in names
+        assert "idx_messages_chat_ref_id" in names
+
+        rows = await db.get_messages_by_chat("A")
+        assert [(r["message_id"], r["parent_chat_id"]) for r in rows] == [("wa-msg::3", "wa::a"), ("wa-msg::1", "wa::a")]
+        assert (await db.get_chat_summary("wa::a"))["message_count"] == 2
+
+        # AUTOINCREMENT continues after the rebuilt table's ids
+        await db._insert_batch_internally([_text_msg("wa-msg::4", "x", chat_name="A")])
+        assert (await db.get_messages_page(limit=1))[0][0]["id"] == 4
+
+        from src.StorageDB.sqlite_db import _MESSAGE_SELECT
+        clause, refs = db._chat_ref_clause(await db._chat_refs(db._conn, "A"))
+        cursor = await db._conn.execute(
+            f"EXPLAIN QUERY PLAN {_MESSAGE_SELECT} WHERE {clause} ORDER BY m.id DESC LIMIT ?",
+            (*refs, 10)
+        )
+        plan = " ".join(row[3] for row in await cursor.fetchall())
+        assert "idx_messages_chat_ref_id" in plan
+        assert "SCAN m" not in plan
+        assert await db.get_messages_by_chat("missing") == []
+    finally:
+        await db.close_db()
 
 
 @pytest.mark.asyncio
@@ -103,11 +157,17 @@ async def test_insert_batch_success(db_instance, mock_conn):
     msg.parent_chat = Mock()
     msg.parent_chat.chatName = "Chat1"
     msg.parent_chat.chatID = "c1"
+    mock_cursor = AsyncMock()
+    mock_cursor.fetchall.return_value = [("c1", 1)]
+    mock_conn.execute.return_value = mock_cursor
 
     await db_instance._insert_batch_internally([msg])
 
-    mock_conn.executemany.assert_called_once()
+    # Chat row first, then the message referencing it
+    assert mock_conn.executemany.call_count == 2
+    assert mock_conn.executemany.call_args[0][1] == [("msg123", "data", None, None, "text", "in", 1, 100.0)]
     mock_conn.commit.assert_called_once()
+    assert db_instance._chat_cache == {"c1": 1}
 
 @pytest.mark.asyncio
 async def test_insert_batch_no_conn(db_instance):
@@ -141,7 +201,8 @@ async def test_enqueue_insert(db_instance):
     
     assert db_instance.queue.qsize() == 1
     item = await db_instance.queue.get()
-    assert item == msg
+    assert item == [msg]
+    assert db_instance.queue_stats()["in_flight"] == 1
 
 @pytest.mark.asyncio
 async def test_enqueue_insert_empty(db_instance):
@@ -191,6 +252,7 @@ async def test_close_db(db_instance, mock_conn):
             pass
             
     db_instance._writer_task = asyncio.create_task(dummy_writer())
+    db_instance.drain_timeout = 0.1
     
     await db_instance.close_db()
     
@@ -228,10 +290,9 @@ async def test_get_all_messages_async(db_instance, mock_conn):
     
     assert len(result) == 1
     assert result[0]["data"] == "test"
-    mock_conn.execute.assert_called_with(
-        "SELECT * FROM messages ORDER BY id DESC LIMIT ? OFFSET ?",
-        (5, 0)
-    )
+    sql, params = mock_conn.execute.call_args[0]
+    assert sql.endswith("FROM messages m LEFT JOIN chats c ON c.id = m.chat_ref ORDER BY m.id DESC LIMIT ? OFFSET ?")
+    assert params == (5, 0)
 
 @pytest.mark.asyncio
 async def test_writer_loop_flush(db_instance):
@@ -344,11 +405,14 @@ async def test_check_message_exists_sync(db_instance):
 async def test_get_messages_by_chat(db_instance, mock_conn):
     """Test get_messages_by_chat async."""
     db_instance._conn = mock_conn
+    refs_cursor = AsyncMock()
+    refs_cursor.fetchall.return_value = [(7,)]
     mock_cursor = AsyncMock()
     mock_cursor.fetchall.return_value = [{"id": 1, "data": "chat_msg"}]
-    mock_conn.execute.return_value = mock_cursor
+    mock_conn.execute.side_effect = [refs_cursor, mock_cursor]
     
     rows = await db_instance.get_messages_by_chat("ChatA")
+    assert mock_conn.execute.call_args.args[1] == (7, 100)
     assert rows[0]["data"] == "chat_msg"
 
 @pytest.mark.asyncio
@@ -359,3 +423,697 @@ async def test_get_messages_by_chat_error(db_instance, mock_conn):
     
     rows = await db_instance.get_messages_by_chat("ChatA")
     assert rows == []
+
+
+@pytest.mark.asyncio
+async def test_watermark_roundtrip(db_instance):
+    """Test set_watermark upserts and get_watermark reads it back."""
+    await db_instance.init_db()
+    await db_instance.create_table()
+    try:
+        assert await db_instance.get_watermark("wa::chat") is None
+
+        await db_instance.set_watermark("wa::chat", "id-1", 3)
+        await db_instance.set_watermark("wa::chat", "id-2", 7)
+
+        assert await db_instance.get_watermark("wa::chat") == ("id-2", 7)
+    finally:
+        await db_instance.close_db()
+
+
+@pytest.mark.asyncio
+async def test_backfill_checkpoint_roundtrip(db_instance):
+    """Test set_backfill_checkpoint upserts and get_backfill_checkpoint reads it back."""
+    await db_instance.init_db()
+    await db_instance.create_table()
+    try:
+        assert await db_instance.get_backfill_checkpoint("wa::chat") is None
+
+        await db_instance.set_backfill_checkpoint("wa::chat", "id-9", 10)
+        await db_instance.set_backfill_checkpoint("wa::chat", "id-1", 25, complete=True)
+
+        checkpoint = await db_instance.get_backfill_checkpoint("wa::chat")
+        assert {k: checkpoint[k] for k in ("oldest_data_id", "collected", "complete")} == {
+            "oldest_data_id": "id-1", "collected": 25, "complete": True
+        }
+    finally:
+        await db_instance.close_db()
+
+
+@pytest.mark.asyncio
+async def test_filter_new(db_instance):
+    """Test filter_new returns only ids that are not stored yet."""
+    await db_instance.init_db()
+    await db_instance.create_table()
+    try:
+        await db_instance._conn.execute("INSERT INTO messages (message_id) VALUES ('wa-msg::a')")
+        await db_instance._conn.commit()
+
+        new_ids = await db_instance.filter_new(["wa-msg::a", "wa-msg::b", "wa-msg::b"])
+
+        assert new_ids == {"wa-msg::b"}
+        assert await db_instance.filter_new([]) == set()
+    finally:
+        await db_instance.close_db()
+
+
+@pytest.mark.asyncio
+async def test_filter_new_no_conn(db_instance):
+    """Test filter_new treats everything as new without a connection."""
+    assert await db_instance.filter_new(["x", "y"]) == {"x", "y"}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("profile, journal, synchronous", [
+    ("durable", "delete", 2),
+    ("balanced", "wal", 1),
+    ("throughput", "wal", 1),
+])
+async def test_init_db_applies_profile(tmp_path, mock_logger, profile, journal, synchronous):
+    """Test each PRAGMA profile is applied on init_db."""
+    db = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=str(tmp_path / "m.db"), profile=profile)
+    await db.init_db()
+    try:
+        cursor = await db._conn.execute("PRAGMA journal_mode")
+        assert (await cursor.fetchone())[0] == journal
+        cursor = await db._conn.execute("PRAGMA synchronous")
+        assert (await cursor.fetchone())[0] == synchronous
+    finally:
+        await db.close_db()
+
+
+def test_unknown_profile(mock_queue, mock_logger):
+    """Test constructing with an unknown profile fails fast."""
+    with pytest.raises(ValueError, match="Unknown SQLite profile"):
+        SQLITE_DB(queue=mock_queue, log=mock_logger, profile="yolo")
+
+
+@pytest.mark.asyncio
+async def test_read_pool_serves_reads(tmp_path, mock_logger):
+    """Test reads go through the read-only pool and see committed writes."""
+    db = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=str(tmp_path / "m.db"),
+                   profile="balanced", read_pool_size=2)
+    await db.init_db()
+    await db.create_table()
+    try:
+        assert db._read_pool is not None
+        await db._insert_batch_internally([_text_msg("wa-msg::a", "hi", chat_name="Chat A")])
+
+        assert await db.check_message_if_exists_async("wa-msg::a") is True
+        rows = await db.get_messages_by_chat("Chat A")
+        assert [r["message_id"] for r in rows] == ["wa-msg::a"]
+
+        async with db.acquire_reader() as conn:
+            with pytest.raises(sqlite3.OperationalError):
+                await conn.execute("DELETE FROM messages")
+    finally:
+        await db.close_db()
+    assert db._read_pool is None
+
+
+@pytest.mark.asyncio
+async def test_read_pool_bounded_acquire(tmp_path, mock_logger):
+    """Test acquire waits for a free connection and times out with StorageError."""
+    db = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=str(tmp_path / "m.db"),
+                   profile="balanced", read_pool_size=1)
+    await db.init_db()
+    try:
+        async with db.acquire_reader():
+            assert db._read_pool.in_use == 1
+            with pytest.raises(StorageError, match="No read connection available"):
+                async with db.acquire_reader(timeout=0.05):
+                    pass
+        assert db._read_pool.in_use == 0
+    finally:
+        await db.close_db()
+
+
+@pytest.mark.asyncio
+async def test_default_profile_keeps_rollback_journal(tmp_path, mock_logger):
+    """Test existing databases are not moved to WAL unless a WAL profile is chosen."""
+    db = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=str(tmp_path / "m.db"))
+    await db.init_db()
+    try:
+        assert db.profile == "durable"
+        cursor = await db._conn.execute("PRAGMA journal_mode")
+        assert (await cursor.fetchone())[0].upper() == "DELETE"
+    finally:
+        await db.close_db()
+    assert not (tmp_path / "m.db-wal").exists()
+
+
+@pytest.mark.asyncio
+async def test_durable_profile_has_no_read_pool(tmp_path, mock_logger):
+    """Test the rollback-journal profile keeps reads on the writer connection."""
+    db = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=str(tmp_path / "m.db"), profile="durable")
+    await db.init_db()
+    try:
+        assert db._read_pool is None
+        async with db.acquire_reader() as conn:
+            assert conn is db._conn
+    finally:
+        await db.close_db()
+
+
+@pytest.mark.asyncio
+async def test_get_messages_page_keyset(tmp_path, mock_logger):
+    """Test cursor pagination walks all rows once, with chat and time filters."""
+    db = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=str(tmp_path / "m.db"))
+    await db.init_db()
+    await db.create_table()
+    try:
+        await db._insert_batch_internally(
+            [_text_msg(f"wa-msg::{i}", "x", chat_name="A" if i % 2 else "B", hit_time=float(i)) for i in range(10)]
+        )
+
+        seen, cursor = [], None
+        while True:
+            rows, cursor = await db.get_messages_page(cursor=cursor, limit=3)
+            seen.extend(r["message_id"] for r in rows)
+            if cursor is None:
+                break
+        assert seen == [f"wa-msg::{i}" for i in reversed(range(10))]
+
+        rows, cursor = await db.get_messages_page(chat_name="A", since=3.0, until=8.0, limit=10)
+        assert [r["message_id"] for r in rows] == ["wa-msg::7", "wa-msg::5", "wa-msg::3"]
+        assert cursor is None
+
+        with pytest.raises(StorageError, match="Invalid page cursor"):
+            await db.get_messages_page(cursor="not-a-cursor")
+    finally:
+        await db.close_db()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("row_format", ["dict", "tuple", "record"])
+async def test_iter_messages_chunks(tmp_path, mock_logger, row_format):
+    """Test iter_messages streams every row in chunks in the requested format."""
+    from src.StorageDB.records import StoredMessage
+
+    db = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=str(tmp_path / "m.db"))
+    await db.init_db()
+    await db.create_table()
+    try:
+        await db._insert_batch_internally(
+            [_text_msg(f"wa-msg::{i}", "x", chat_name="A" if i % 2 else "B") for i in range(7)]
+        )
+
+        rows = [row async for row in db.iter_messages(chunk_size=2, row_format=row_format, chat_name="A")]
+
+        assert len(rows) == 3
+        if row_format == "record":
+            assert isinstance(rows[0], StoredMessage)
+            assert [r.message_id for r in rows] == ["wa-msg::1", "wa-msg::3", "wa-msg::5"]
+        elif row_format == "tuple":
+            assert rows[0][1] == "wa-msg::1"
+        else:
+            assert rows[-1]["message_id"] == "wa-msg::5"
+    finally:
+        await db.close_db()
+
+
+def _text_msg(message_id, text, chat_name="Chat A", hit_time=1.0):
+    msg = Mock(spec=MessageInterface)
+    msg.message_id = message_id
+    msg.raw_data = text
+    msg.encrypted_message = None
+    msg.encryption_nonce = None
+    msg.data_type = "text"
+    msg.direction = "in"
+    msg.system_hit_time = hit_time
+    msg.parent_chat = Mock()
+    msg.parent_chat.chatName = chat_name
+    msg.parent_chat.chatID = chat_name.lower()
+    return msg
+
+
+@pytest.mark.asyncio
+async def test_full_text_search(tmp_path, mock_logger):
+    """Test FTS5 index is kept in sync by inserts and returns ranked, paginated snippets."""
+    db = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=str(tmp_path / "m.db"), full_text_search=True)
+    await db.init_db()
+    await db.create_table()
+    try:
+        await db._insert_batch_internally([
+            _text_msg("m1", "the deploy failed again"),
+            _text_msg("m2", "deploy succeeded", chat_name="Chat B"),
+            _text_msg("m3", "lunch?"),
+        ])
+
+        results, cursor = await db.search("deploy", limit=1)
+        assert len(results) == 1 and cursor is not None
+        more, cursor = await db.search("deploy", limit=1, cursor=cursor)
+        assert cursor is None
+        assert {results[0]["message_id"], more[0]["message_id"]} == {"m1", "m2"}
+
+        results, _ = await db.search("deploy", chat_name="Chat A")
+        assert [r["message_id"] for r in results] == ["m1"]
+        assert "[deploy]" in results[0]["snippet"]
+    finally:
+        await db.close_db()
+
+    # Switching it off drops the index and its triggers
+    db = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=str(tmp_path / "m.db"))
+    await db.init_db()
+    await db.create_table()
+    try:
+        cursor = await db._conn.execute("SELECT name FROM sqlite_master WHERE name LIKE 'messages_fts%'")
+        assert await cursor.fetchall() == []
+        with pytest.raises(StorageError, match="Full-text search is disabled"):
+            await db.search("deploy")
+    finally:
+        await db.close_db()
+
+
+@pytest.mark.asyncio
+async def test_search_encrypted_blind_index(tmp_path, mock_logger):
+    """Test keyword and exact lookups go through the token table and only matches are decrypted."""
+    from src.Encryption import BlindIndexer, MessageDecryptor, MessageEncryptor
+
+    key = MessageEncryptor.generate_key()
+    encryptor = MessageEncryptor(key)
+
+    def encrypted(data_id, text, chat_name="Chat A"):
+        msg = _text_msg(f"wa-msg::{data_id}", text, chat_name=chat_name)
+        msg.encryption_nonce, msg.encrypted_message = encryptor.encrypt_message(text, data_id)
+        return msg
+
+    db = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=str(tmp_path / "m.db"),
+                   blind_indexer=BlindIndexer(key))
+    await db.init_db()
+    await db.create_table()
+    try:
+        await db._insert_batch_internally([
+            encrypted("d1", "Invoice PAID for March"),
+            encrypted("d2", "invoice pending", chat_name="Chat B"),
+            encrypted("d3", "see you tomorrow"),
+        ])
+        cursor = await db._conn.execute("SELECT token FROM message_tokens")
+        assert all(b"invoice" not in row[0] for row in await cursor.fetchall())
+
+        decryptor = MessageDecryptor(key)
+        rows = await db.search_encrypted("invoice", decryptor=decryptor)
+        assert [r["text"] for r in rows] == ["invoice pending", "Invoice PAID for March"]
+
+        rows = await db.search_encrypted("paid INVOICE", decryptor=decryptor)
+        assert [r["message_id"] for r in rows] == ["wa-msg::d1"]
+
+        rows = await db.search_encrypted("invoice", decryptor=decryptor, chat_name="Chat B")
+        assert [r["message_id"] for r in rows] == ["wa-msg::d2"]
+
+        rows = await db.search_encrypted("see  you TOMORROW", decryptor=decryptor, exact=True)
+        assert [r["text"] for r in rows] == ["see you tomorrow"]
+        assert await db.search_encrypted("see you", exact=True) == []
+
+        # Wrong key: tokens don't match at all
+        other = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=str(tmp_path / "m.db"),
+                          blind_indexer=BlindIndexer(MessageEncryptor.generate_key()))
+        other._conn = db._conn
+        assert await other.search_encrypted("invoice") == []
+
+        await db._conn.execute("DELETE FROM messages WHERE message_id = 'wa-msg::d3'")
+        cursor = await db._conn.execute("SELECT COUNT(*) FROM message_tokens WHERE message_rowid = 3")
+        assert (await cursor.fetchone())[0] == 0
+    finally:
+        await db.close_db()
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_rolled_back(tmp_path, mock_logger, monkeypatch):
+    """Test a batch failing mid-transaction leaves nothing behind for the next commit to persist."""
+    from src.Encryption import BlindIndexer, MessageEncryptor
+
+    db = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=str(tmp_path / "m.db"),
+                   blind_indexer=BlindIndexer(MessageEncryptor.generate_key()))
+    await db.init_db()
+    await db.create_table()
+    try:
+        async def failing_tokens(records):
+            raise RuntimeError("tokenizer broke")
+
+        monkeypatch.setattr(db, "_index_tokens", failing_tokens)
+        with pytest.raises(StorageError, match="Batch insert failed"):
+            await db._insert_batch_internally([_text_msg("wa-msg::lost", "hello", chat_name="Chat Lost")])
+
+        await db.set_watermark("wa::chat", "id-1", 0)  # commits on the same connection
+
+        for table in ("messages", "chats", "message_tokens"):
+            cursor = await db._conn.execute(f"SELECT COUNT(*) FROM {table}")
+            assert (await cursor.fetchone())[0] == 0, table
+    finally:
+        await db.close_db()
+
+
+@pytest.mark.asyncio
+async def test_search_encrypted_disabled(db_instance):
+    """Test search_encrypted without a blind indexer."""
+    with pytest.raises(StorageError, match="Blind index is not enabled"):
+        await db_instance.search_encrypted("x")
+
+
+@pytest.mark.asyncio
+async def test_enqueue_insert_block_policy(mock_logger):
+    """Test block policy waits until the writer releases in-flight messages."""
+    db = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=":memory:", max_in_flight=2)
+    await db.enqueue_insert([Mock(), Mock()])
+
+    producer = asyncio.create_task(db.enqueue_insert([Mock()]))
+    await asyncio.sleep(0.01)
+    assert not producer.done()
+
+    await db._release(2)
+    await asyncio.wait_for(producer, timeout=1)
+    stats = db.queue_stats()
+    assert stats["in_flight"] == 1 and stats["high_water"] == 2 and stats["blocked"] == 1
+
+
+@pytest.mark.asyncio
+async def test_enqueue_insert_drop_oldest_policy(mock_logger):
+    """Test drop_oldest discards queued batches to make room."""
+    db = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=":memory:",
+                   max_in_flight=3, overflow="drop_oldest")
+    old, new = [Mock(), Mock()], [Mock(), Mock()]
+    await db.enqueue_insert(old)
+    await db.enqueue_insert(new)
+
+    assert db.queue.qsize() == 1
+    assert db.queue.get_nowait() == new
+    assert db.queue_stats()["dropped"] == 2
+
+
+@pytest.mark.asyncio
+async def test_enqueue_insert_spill_policy(tmp_path, mock_logger):
+    """Test spill policy writes overflow to disk and the writer replays it."""
+    db = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=str(tmp_path / "m.db"),
+                   max_in_flight=1, overflow="spill")
+    await db.init_db()
+    await db.create_table()
+    try:
+        first, overflow = _text_msg("m1", "first"), _text_msg("m2", "spilled")
+        overflow.encrypted_message, overflow.encryption_nonce = b"\x00cipher", b"n" * 12
+        await db.enqueue_insert([first])
+        await db.enqueue_insert([overflow])
+        assert db.queue.qsize() == 1
+        assert db.queue_stats()["spill_pending"] == 1
+        assert (tmp_path / "m.db.spill").exists()
+
+        await db.start_writer()
+        for _ in range(100):
+            if await db.check_message_if_exists_async("m2") and await db.check_message_if_exists_async("m1"):
+                break
+            await asyncio.sleep(0.05)
+        rows = {r["message_id"]: r for r in await db.get_all_messages_async()}
+        assert rows["m2"]["encrypted_message"] == b"\x00cipher"
+        assert db.queue_stats()["spill_pending"] == 0
+        assert not (tmp_path / "m.db.spill").exists()
+    finally:
+        await db.close_db()
+
+
+@pytest.mark.asyncio
+async def test_enqueue_insert_wait_for_commit(tmp_path, mock_logger):
+    """Test enqueue_insert(wait=True) returns only once the writer committed the batch."""
+    db = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=str(tmp_path / "m.db"), flush_interval=0.05)
+    await db.init_db()
+    await db.create_table()
+    await db.start_writer()
+    try:
+        await asyncio.wait_for(db.enqueue_insert([_text_msg("m1", "one")], wait=True), timeout=5)
+        assert await db.check_message_if_exists_async("m1")
+
+        async def failing_insert(batch):
+            raise StorageError("Batch insert failed")
+
+        db._insert_batch_internally = failing_insert
+        with pytest.raises(StorageError, match="Batch insert failed"):
+            await asyncio.wait_for(db.enqueue_insert([_text_msg("m2", "two")], wait=True), timeout=5)
+    finally:
+        await db.close_db()
+
+
+@pytest.mark.asyncio
+async def test_enqueue_insert_wait_dropped(mock_logger):
+    """Test a waiting batch discarded by drop_oldest fails instead of hanging."""
+    db = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=":memory:",
+                   max_in_flight=2, overflow="drop_oldest")
+    db._writer_task = asyncio.create_task(asyncio.sleep(10))  # writer "running" but not consuming
+    try:
+        waiting = asyncio.create_task(db.enqueue_insert([Mock(), Mock()], wait=True))
+        await asyncio.sleep(0.01)
+        await db.enqueue_insert([Mock(), Mock()])
+
+        with pytest.raises(StorageError, match="drop_oldest"):
+            await asyncio.wait_for(waiting, timeout=1)
+    finally:
+        db._writer_task.cancel()
+
+
+def test_unknown_overflow_policy(mock_logger):
+    """Test constructor rejects unknown overflow policies."""
+    with pytest.raises(ValueError, match="Unknown overflow policy"):
+        SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, overflow="explode")
+
+
+@pytest.mark.asyncio
+async def test_spool_replays_after_crash(tmp_path, mock_logger):
+    """Test messages enqueued but never committed are recovered from the spool on the next start."""
+    db_path = str(tmp_path / "m.db")
+    crashed = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=db_path, spool=True)
+    await crashed.init_db()
+    await crashed.create_table()
+    await crashed.enqueue_insert([_text_msg("m1", "one"), _text_msg("m2", "two")])
+    assert crashed.queue_stats()["spool_pending"] == 2
+    # Process dies: the queue is lost, nothing was committed
+    crashed._spool._file.close()
+    await crashed._conn.close()
+
+    db = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=db_path, spool=True)
+    await db.init_db()
+    try:
+        # Not before create_table has migrated the schema
+        assert not await db.check_message_if_exists_async("m1")
+        await db.create_table()
+        assert await db.check_message_if_exists_async("m1")
+        assert await db.check_message_if_exists_async("m2")
+        assert db._spool.segments() == []
+    finally:
+        await db.close_db()
+
+
+@pytest.mark.asyncio
+async def test_close_db_drains_queue(tmp_path, mock_logger):
+    """Test close_db commits queued messages instead of cancelling the writer."""
+    db_path = tmp_path / "m.db"
+    db = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=str(db_path),
+                   flush_interval=30, batch_size=1000, spool=True)
+    await db.init_db()
+    await db.create_table()
+    await db.start_writer()
+    await db.enqueue_insert([_text_msg(f"m{i}", "x") for i in range(10)])
+    await db.close_db()
+
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0] == 10
+    assert list(tmp_path.glob("m.db.spool.*")) == []
+
+
+@pytest.mark.asyncio
+async def test_commit_subscription(tmp_path, mock_logger):
+    """Test subscribers get only newly committed rows, with bounded buffers and lag reporting."""
+    db = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=str(tmp_path / "m.db"))
+    await db.init_db()
+    await db.create_table()
+    try:
+        sub = db.subscribe()
+        small = db.subscribe(maxsize=1)
+        received = []
+        db.subscribe(callback=received.append)
+
+        await db._insert_batch_internally([_text_msg("m1", "one"), _text_msg("m2", "two")])
+        await db._insert_batch_internally([_text_msg("m2", "two"), _text_msg("m3", "three")])
+        await db._insert_batch_internally([_text_msg("m1", "one")])  # nothing new, nothing published
+
+        first = await asyncio.wait_for(sub.__anext__(), timeout=1)
+        assert first.seq == 1
+        assert [m.message_id for m in first.messages] == ["m1", "m2"]
+        assert first.messages[0].id == 1 and first.messages[0].raw_data == "one"
+        assert sub.lag == 1
+
+        second = await asyncio.wait_for(sub.__anext__(), timeout=1)
+        assert [m.message_id for m in second.messages] == ["m3"]
+        assert sub.lag == 0
+
+        assert small.stats()["dropped"] == 1 and small.lag == 2
+        await asyncio.sleep(0)
+        assert [e.seq for e in received] == [1, 2]
+    finally:
+        await db.close_db()
+
+    # close_db ends the iterators
+    assert [e async for e in sub] == []
+    assert db.subscriber_stats() == []
+
+
+@pytest.mark.asyncio
+async def test_raw_data_compression(tmp_path, mock_logger):
+    """Test raw_data is compressed after training, decoded on read and dictionaries persist."""
+    from src.StorageDB.codec import ZstdCodec
+
+    db_path = str(tmp_path / "m.db")
+    db = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=db_path, raw_data_codec=ZstdCodec())
+    await db.init_db()
+    await db.create_table()
+    try:
+        texts = [f"Reminder: the team sync moves to room {i % 7} at {i % 12}:30, bring your notes #{i}"
+                 for i in range(200)]
+        await db._insert_batch_internally([_text_msg(f"m{i}", t) for i, t in enumerate(texts)])
+        assert await db.train_raw_data_dictionary(dict_size=4096) == 1
+
+        await db._insert_batch_internally([_text_msg("new", texts[3] + " updated")])
+        assert await db.recompress_raw_data(batch_size=50) == 200
+
+        cursor = await db._conn.execute("SELECT typeof(raw_data), COUNT(*) FROM messages GROUP BY 1")
+        assert dict(await cursor.fetchall()) == {"blob": 201}
+
+        page, _ = await db.get_messages_page(limit=1)
+        assert page[0]["raw_data"] == texts[3] + " updated"
+        rows = [r async for r in db.iter_messages(row_format="record")]
+        assert [r.raw_data for r in rows[:200]] == texts
+    finally:
+        await db.close_db()
+
+    reopened = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=db_path, raw_data_codec=ZstdCodec())
+    await reopened.init_db()
+    await reopened.create_table()
+    try:
+        rows = await reopened.get_messages_by_chat("Chat A", limit=1)
+        assert rows[0]["raw_data"] == texts[3] + " updated"
+    finally:
+        await reopened.close_db()
+
+
+def test_compression_rejects_fts(mock_logger):
+    """Test compression and FTS cannot be combined."""
+    from src.StorageDB.codec import ZstdCodec
+
+    with pytest.raises(ValueError, match="full_text_search"):
+        SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, raw_data_codec=ZstdCodec(), full_text_search=True)
+
+
+@pytest.mark.asyncio
+async def test_chat_summaries(tmp_path, mock_logger):
+    """Test chats are stored once and their summary follows inserts and deletes."""
+    db = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=str(tmp_path / "m.db"))
+    await db.init_db()
+    await db.create_table()
+    try:
+        await db._insert_batch_internally([
+            _text_msg("m1", "a", chat_name="Chat A", hit_time=10.0),
+            _text_msg("m2", "b", chat_name="Chat B", hit_time=20.0),
+            _text_msg("m3", "c", chat_name="Chat A", hit_time=30.0),
+        ])
+        await db._insert_batch_internally([_text_msg("m3", "c", chat_name="Chat A", hit_time=30.0)])  # duplicate
+
+        cursor = await db._conn.execute("SELECT COUNT(*) FROM chats")
+        assert (await cursor.fetchone())[0] == 2
+        summaries = await db.get_chat_summaries()
+        assert [(s["chat_name"], s["message_count"], s["first_seen"], s["last_seen"]) for s in summaries] == [
+            ("Chat A", 2, 10.0, 30.0), ("Chat B", 1, 20.0, 20.0)
+        ]
+
+        await db._conn.execute("DELETE FROM messages WHERE message_id = 'm1'")
+        await db._conn.commit()
+        assert (await db.get_chat_summary("chat a"))["message_count"] == 1
+        assert await db.get_chat_summary("nope") is None
+    finally:
+        await db.close_db()
+
+
+def test_retention_policy_validation():
+    from src.StorageDB.retention import RetentionPolicy
+    with pytest.raises(ValueError, match="max_age"):
+        RetentionPolicy(max_age=0)
+    with pytest.raises(ValueError, match="batch_size"):
+        RetentionPolicy(max_age=1, batch_size=0)
+
+
+@pytest.mark.asyncio
+async def test_retention_age_and_rows_per_chat(tmp_path, mock_logger):
+    """Test expired and excess rows are deleted in batches and leave no trace in side tables."""
+    from src.StorageDB.retention import RetentionPolicy
+    from src.StorageDB.seen_index import SeenIndex
+
+    now = time.time()
+    db = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=str(tmp_path / "m.db"), full_text_search=True,
+                   seen_index=SeenIndex(capacity=100), retention=RetentionPolicy(max_age=3600, max_rows_per_chat=3,
+                                                                                 batch_size=2, pause=0))
+    await db.init_db()
+    await db.create_table()
+    try:
+        await db._insert_batch_internally(
+            [_text_msg(f"old{i}", "stale words", hit_time=now - 7200) for i in range(3)]
+            + [_text_msg(f"a{i}", "fresh words", chat_name="A", hit_time=now) for i in range(5)]
+            + [_text_msg("b0", "fresh words", chat_name="B", hit_time=now)]
+        )
+
+        report = await db.enforce_retention()
+        assert (report["expired"], report["chat_overflow"], report["deleted"]) == (3, 2, 5)
+        assert db.last_retention_report is report
+
+        rows, _ = await db.get_messages_page()
+        assert sorted(r["message_id"] for r in rows) == ["a2", "a3", "a4", "b0"]
+        assert (await db.get_chat_summary("a"))["message_count"] == 3
+        assert (await db.get_chat_summary("chat a"))["message_count"] == 0
+        assert "old0" not in db.seen_index
+        assert (await db.search("stale"))[0] == []
+        assert len((await db.search("fresh"))[0]) == 4
+    finally:
+        await db.close_db()
+
+
+@pytest.mark.asyncio
+async def test_retention_max_bytes_reclaims_space(tmp_path, mock_logger):
+    """Test the size limit deletes oldest rows and incremental_vacuum shrinks the file."""
+    from src.StorageDB.retention import RetentionPolicy
+
+    db = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=str(tmp_path / "m.db"),
+                   retention=RetentionPolicy(max_bytes=200_000, batch_size=200, pause=0))
+    await db.init_db()
+    await db.create_table()
+    try:
+        for start in range(0, 2000, 500):
+            await db._insert_batch_internally([_text_msg(f"m{i}", "x" * 400) for i in range(start, start + 500)])
+        await db._checkpoint("TRUNCATE")
+        assert await db._used_bytes() > 200_000
+
+        report = await db.enforce_retention()
+        assert report["size_overflow"] > 0
+        assert await db._used_bytes() <= 200_000
+        assert report["reclaimed_bytes"] > 0
+        assert (tmp_path / "m.db").stat().st_size <= 250_000
+        newest = (await db.get_all_messages_async(limit=1))[0]["message_id"]
+        assert newest == "m1999"
+    finally:
+        await db.close_db()
+
+
+@pytest.mark.asyncio
+async def test_retention_runs_in_background(tmp_path, mock_logger):
+    """Test start_writer schedules the retention task and close_db stops it."""
+    from src.StorageDB.retention import RetentionPolicy
+
+    db = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=str(tmp_path / "m.db"),
+                   retention=RetentionPolicy(max_age=60, interval=0.01))
+    await db.init_db()
+    await db.create_table()
+    await db._insert_batch_internally([_text_msg("m1", "x", hit_time=1.0)])
+    await db.start_writer()
+    try:
+        for _ in range(100):
+            if db.last_retention_report:
+                break
+            await asyncio.sleep(0.01)
+        assert db.last_retention_report["expired"] == 1
+    finally:
+        await db.close_db()
+    assert db._retention_task is None
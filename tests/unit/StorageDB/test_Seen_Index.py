@@ -0,0 +1,99 @@
+"""
+Unit tests for SeenIndex and the Bloom filters behind it.
+Tests cover bounded memory, partitioning and the no-false-positive guarantee.
+"""
+
+import asyncio
+import logging
+from unittest.mock import Mock
+
+import pytest
+
+from src.StorageDB.seen_index import BloomFilter, ScalableBloomFilter, SeenIndex
+from src.StorageDB.sqlite_db import SQLITE_DB
+
+
+# ============================================================================
+# TESTS
+# ============================================================================
+
+def test_bloom_filter_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [f"wa-msg::{i}" for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+
+    assert all(item in bloom for item in items)
+    false_positives = sum(f"other::{i}" in bloom for i in range(10_000))
+    assert false_positives < 300
+
+
+def test_scalable_bloom_grows_and_saturates():
+    bloom = ScalableBloomFilter(initial_capacity=10, error_rate=0.01, max_items=50)
+    for i in range(50):
+        assert bloom.add(str(i)) is True
+
+    assert len(bloom.filters) > 1
+    assert bloom.add("overflow") is False
+    assert bloom.saturated is True
+    assert all(str(i) in bloom for i in range(50))
+
+
+def test_seen_index_lru_is_bounded():
+    index = SeenIndex(capacity=3)
+    index.add_many(["a", "b", "c", "d"])
+
+    assert len(index) == 3
+    assert "a" not in index
+    stored, new, uncertain = index.partition(["b", "a"])
+    assert stored == {"b"}
+    assert new == set()
+    assert uncertain == {"a"}
+
+
+def test_seen_index_bloom_only_decides_negatives_when_complete():
+    index = SeenIndex(capacity=2, mode="bloom")
+    index.add_many(["a", "b", "c"])
+
+    # Not complete yet: misses must fall through
+    _, new, uncertain = index.partition(["a", "zzz"])
+    assert new == set()
+    assert uncertain == {"a", "zzz"}
+
+    index.complete = True
+    stored, new, uncertain = index.partition(["a", "c", "zzz"])
+    assert stored == {"c"}
+    assert "zzz" in new
+    # "a" was evicted from the LRU, a Bloom hit is never trusted as stored
+    assert "a" in uncertain
+
+
+def test_seen_index_invalid_args():
+    with pytest.raises(ValueError):
+        SeenIndex(capacity=0)
+    with pytest.raises(ValueError):
+        SeenIndex(mode="cuckoo")
+
+
+@pytest.mark.asyncio
+async def test_sqlite_filter_new_uses_seen_index(tmp_path):
+    """Test the index is warmed at init_db and short-circuits filter_new."""
+    db_path = tmp_path / "messages.db"
+    db = SQLITE_DB(queue=asyncio.Queue(), log=Mock(spec=logging.Logger), db_path=str(db_path))
+    await db.init_db()
+    await db.create_table()
+    await db._conn.execute("INSERT INTO messages (message_id) VALUES ('wa-msg::old')")
+    await db._conn.commit()
+    await db.close_db()
+
+    index = SeenIndex(capacity=10, mode="bloom")
+    db = SQLITE_DB(queue=asyncio.Queue(), log=Mock(spec=logging.Logger), db_path=str(db_path), seen_index=index)
+    await db.init_db()
+    try:
+        assert "wa-msg::old" in index
+        assert index.complete is True
+
+        assert await db.filter_new(["wa-msg::old", "wa-msg::new"]) == {"wa-msg::new"}
+        assert index.stats()["misses"] == 0
+    finally:
+        await db.close_db()
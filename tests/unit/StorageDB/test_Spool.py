@@ -0,0 +1,63 @@
+"""
+Unit tests for the write-ahead Spool.
+Tests cover group fsync, segment rotation and acknowledgement.
+"""
+
+import asyncio
+
+import pytest
+
+from src.StorageDB.spool import Spool
+
+
+def _record(i):
+    return (f"m{i}", "text", b"\x01cipher", None, "text", "in", "chat", "chat-id", 1.0)
+
+
+# ============================================================================
+# TESTS
+# ============================================================================
+
+@pytest.mark.asyncio
+async def test_concurrent_appends_share_fsync(tmp_path):
+    """Test appends issued together are covered by one fsync."""
+    spool = Spool(tmp_path / "s.spool", fsync_window=0.01)
+    segments = await asyncio.gather(*(spool.append([_record(i)]) for i in range(20)))
+
+    assert set(segments) == {0}
+    assert spool.pending == 20
+    assert spool.fsyncs == 1
+    spool.close()
+
+
+@pytest.mark.asyncio
+async def test_ack_truncates_and_deletes_segments(tmp_path):
+    """Test committed segments are deleted and the live one is truncated."""
+    spool = Spool(tmp_path / "s.spool", fsync_window=0, segment_bytes=100)
+    first = await spool.append([_record(1), _record(2)])
+    second = await spool.append([_record(3)])
+    assert second == first + 1
+    assert spool.segments() == [first, second]
+
+    spool.ack(first, 2)
+    assert spool.segments() == [second]
+
+    spool.ack(second, 1)
+    assert spool.pending == 0
+    assert (tmp_path / f"s.spool.{second}").stat().st_size == 0
+    spool.close()
+    assert spool.segments() == []
+
+
+@pytest.mark.asyncio
+async def test_leftovers_roundtrip(tmp_path):
+    """Test records of an earlier instance are read back intact, a torn line is skipped."""
+    old = Spool(tmp_path / "s.spool", fsync_window=0)
+    await old.append([_record(1), _record(2)])
+    old._file.write('["torn')
+    old._file.close()
+
+    spool = Spool(tmp_path / "s.spool")
+    assert spool.read_leftovers() == [_record(1), _record(2)]
+    spool.discard_leftovers()
+    assert spool.segments() == []
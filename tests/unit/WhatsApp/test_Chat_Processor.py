@@ -268,3 +268,92 @@ async def test_do_unread_timeout(chat_processor_instance, mock_page):
 
     with pytest.raises(ChatUnreadError, match="Timeout while checking unread badge"):
         await chat_processor_instance.do_unread(chat=mock_chat)
+
+
+class _VirtualChatList:
+    """Fake chat grid: `viewport` rendered rows out of `total`, scrolled by whole rows."""
+
+    def __init__(self, total=25, viewport=10, rowcount=None):
+        self.total = total
+        self.viewport = viewport
+        self.rowcount = total if rowcount is None else rowcount
+        self.top = 0
+        self.extractions = 0
+
+    async def extract_chat_rows(self):
+        self.extractions += 1
+        return [
+            {"index": i + 1, "name": f"Chat {i}", "preview": f"msg {i}", "time": "10:00",
+             "unread": i % 3, "community": i == 0}
+            for i in range(self.top, min(self.total, self.top + self.viewport))
+        ]
+
+    async def scroll_chat_list(self, pages=0.0, to_top=False):
+        if to_top:
+            self.top = 0
+        else:
+            self.top = max(0, min(self.total - self.viewport, self.top + int(pages * self.viewport)))
+        return {"top": self.top, "height": self.total, "at_end": self.top + self.viewport >= self.total,
+                "total": self.rowcount}
+
+    def chat_by_name(self, name):
+        return f"locator::{name}"
+
+
+@pytest.mark.asyncio
+async def test_fetch_all_chats_crawls_whole_list(mock_page, mock_logger):
+    """Test the crawler scrolls past the viewport and returns every chat once, in list order."""
+    processor = ChatProcessor(page=mock_page, log=mock_logger, UIConfig=_VirtualChatList(rowcount=0))
+
+    chats = await processor.fetch_all_chats()
+
+    assert [c.chat_name for c in chats] == [f"Chat {i}" for i in range(25)]
+    assert chats[0].is_community and not chats[1].is_community
+    assert (chats[2].unread_count, chats[2].preview, chats[2].last_activity) == (2, "msg 2", "10:00")
+    assert chats[5].chat_ui == "locator::Chat 5"
+
+
+@pytest.mark.asyncio
+async def test_iter_all_chats_stops_early(mock_page, mock_logger):
+    """Test the crawl stops at max_chats and once aria-rowcount chats were seen."""
+    processor = ChatProcessor(page=mock_page, log=mock_logger, UIConfig=_VirtualChatList())
+    assert [c.chat_name async for c in processor.iter_all_chats(max_chats=3)] == ["Chat 0", "Chat 1", "Chat 2"]
+
+    grid = _VirtualChatList(total=8)
+    processor = ChatProcessor(page=mock_page, log=mock_logger, UIConfig=grid)
+    assert len([c async for c in processor.iter_all_chats()]) == 8
+    assert grid.extractions == 1
+
+
+@pytest.mark.asyncio
+async def test_fetch_all_chats_empty(mock_page, mock_logger):
+    processor = ChatProcessor(page=mock_page, log=mock_logger, UIConfig=_VirtualChatList(total=0, rowcount=0))
+
+    with pytest.raises(ChatNotFoundError):
+        await processor.fetch_all_chats()
+
+
+@pytest.mark.asyncio
+async def test_scan_unread_single_evaluate(mock_page, mock_logger):
+    """Test scan_unread maps every rendered row to its unread count from one extraction."""
+    grid = _VirtualChatList(total=4)
+    processor = ChatProcessor(page=mock_page, log=mock_logger, UIConfig=grid)
+
+    assert await processor.scan_unread() == {"wa::chat 0": 0, "wa::chat 1": 1, "wa::chat 2": 2, "wa::chat 3": 0}
+    assert grid.extractions == 1
+
+
+@pytest.mark.asyncio
+async def test_prioritised_chats(mock_page, mock_logger):
+    """Test prioritised_chats orders unread chats by the scheduler and skips read ones."""
+    from src.WhatsApp.chat_scheduler import ChatScheduler
+
+    scheduler = ChatScheduler()
+    for i in range(6):
+        scheduler.mark_served(f"wa::chat {i}")
+    processor = ChatProcessor(page=mock_page, log=mock_logger, UIConfig=_VirtualChatList(total=6))
+
+    chats = await processor.prioritised_chats(scheduler)
+    assert [c.chat_name for c in chats] == ["Chat 2", "Chat 5", "Chat 1", "Chat 4"]
+    assert chats[0].chat_ui == "locator::Chat 2"
+    assert len(await processor.prioritised_chats(scheduler, limit=2)) == 2
@@ -0,0 +1,40 @@
+"""
+Unit tests for ChatScheduler.
+Tests cover scoring by unread count and staleness, and ranking.
+"""
+
+import pytest
+
+from src.WhatsApp.chat_scheduler import ChatScheduler
+
+
+def test_rank_by_unread_then_staleness():
+    """Test unread counts dominate and staleness breaks ties."""
+    scheduler = ChatScheduler(staleness_weight=0.01, max_staleness=100)
+    scheduler.mark_served("a", at=990.0)
+    scheduler.mark_served("b", at=900.0)
+    scheduler.mark_served("c", at=999.0)
+
+    ranked = scheduler.rank({"a": 3, "b": 3, "c": 5, "d": 0}, now=1000.0)
+
+    assert [chat_id for chat_id, _ in ranked] == ["c", "b", "a", "d"]
+    assert ranked[-1][1] == pytest.approx(1.0)  # never served: capped staleness
+    assert [chat_id for chat_id, _ in scheduler.rank({"a": 0, "b": 1}, only_unread=True)] == ["b"]
+
+
+def test_staleness_lifts_quiet_chats():
+    """Test a long-unserved read chat can outrank a freshly served chat with one unread message."""
+    scheduler = ChatScheduler(staleness_weight=1 / 60)
+    scheduler.mark_served("quiet", at=0.0)
+    scheduler.mark_served("busy", at=3590.0)
+
+    assert [chat_id for chat_id, _ in scheduler.rank({"busy": 1, "quiet": 0}, now=3600.0)] == ["quiet", "busy"]
+    assert scheduler.last_served("busy") == 3590.0
+    assert scheduler.last_served("unknown") is None
+
+
+def test_rejects_bad_weights():
+    with pytest.raises(ValueError, match="negative"):
+        ChatScheduler(unread_weight=-1)
+    with pytest.raises(ValueError, match="max_staleness"):
+        ChatScheduler(max_staleness=0)
@@ -0,0 +1,241 @@
+"""
+Unit tests for IndexedDBMessageProcessor.
+Tests cover schema probing, chat resolution, batched reads, watermarks and the DOM fallback.
+"""
+
+import logging
+from unittest.mock import Mock, AsyncMock
+
+import pytest
+from playwright.async_api import Page
+
+from src.Interfaces.storage_interface import StorageInterface
+from src.WhatsApp.DerivedTypes.Chat import whatsapp_chat
+from src.WhatsApp.chat_processor import ChatProcessor
+from src.WhatsApp.indexeddb_processor import (
+    IndexedDBMessageProcessor, _IDB_CHATS_JS, _IDB_MESSAGES_JS, _IDB_PROBE_JS, _IDB_RECENT_JS
+)
+from src.WhatsApp.web_ui_config import WebSelectorConfig
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def mock_logger():
+    return Mock(spec=logging.Logger)
+
+
+@pytest.fixture
+def mock_ui_config():
+    config = Mock(spec=WebSelectorConfig)
+    config.message_by_dataID = Mock(side_effect=lambda d: f"locator::{d}")
+    return config
+
+
+@pytest.fixture
+def mock_chat_processor():
+    cp = Mock(spec=ChatProcessor)
+    cp._click_chat = AsyncMock(return_value=True)
+    return cp
+
+
+CHATS = [
+    {"id": "111@c.us", "primary": ["Alice"], "secondary": ["Ali", "+111"]},
+    {"id": "222@g.us", "primary": ["Team"], "secondary": ["Alice", "+222"]},
+]
+
+RECORDS = [
+    {"data_id": "false_111@c.us_A", "t": 10, "text": "hi", "direction": "in", "data_type": "text"},
+    {"data_id": "true_111@c.us_C", "t": 15, "text": "yo", "direction": "out", "data_type": "quoted"},
+    {"data_id": "false_222@g.us_X", "t": 18, "text": "other chat", "direction": "in", "data_type": "text"},
+    {"data_id": "false_111@c.us_B", "t": 20, "text": "", "direction": "in", "data_type": "sticker"},
+]
+
+# Key-range batches of the fallback reader (no time index)
+BATCHES = [
+    {"rows": [
+        {"data_id": "false_111@c.us_B", "t": 20, "text": "", "direction": "in", "data_type": "sticker"},
+        {"data_id": "false_111@c.us_A", "t": 10, "text": "hi", "direction": "in", "data_type": "text"},
+    ], "next": [0, "false_111@c.us_B"]},
+    {"rows": [
+        {"data_id": "true_111@c.us_C", "t": 15, "text": "yo", "direction": "out", "data_type": "quoted"},
+    ], "next": None},
+]
+
+
+def _walk_recent(records, arg):
+    """One step of _IDB_RECENT_JS over `records`: newest first, bounded by stopAt and limit."""
+    by_id = {r["data_id"]: r for r in records}
+    stop = by_id.get(arg["stopAt"])
+    before = tuple(arg["before"]) if arg["before"] else None
+    prefixes = (f"false_{arg['jid']}_", f"true_{arg['jid']}_")
+    rows, scanned = [], 0
+    for record in sorted(records, key=lambda r: (r["t"], r["data_id"]), reverse=True):
+        entry = (record["t"], record["data_id"])
+        if stop is not None and record["t"] < stop["t"]:
+            break
+        if before is not None and entry >= before:
+            continue
+        if record is stop:
+            return {"rows": rows, "next": None, "stopped": True, "bounded": True}
+        if record["data_id"].startswith(prefixes):
+            rows.append(record)
+        scanned += 1
+        if scanned >= arg["limit"]:
+            return {"rows": rows, "next": list(entry), "stopped": False, "bounded": stop is not None}
+    return {"rows": rows, "next": None, "stopped": False, "bounded": stop is not None}
+
+
+def _page(probe_ok=True, time_index=True, chats=CHATS, records=RECORDS, batches=BATCHES):
+    page = AsyncMock(spec=Page)
+    remaining = list(batches)
+
+    async def evaluate(script, arg=None):
+        if script is _IDB_PROBE_JS:
+            return {"ok": probe_ok, "reason": "" if probe_ok else "missing stores: message", "time_index": time_index}
+        if script is _IDB_CHATS_JS:
+            return chats
+        if script is _IDB_RECENT_JS:
+            return _walk_recent(records, arg)
+        if script is _IDB_MESSAGES_JS:
+            return remaining.pop(0)
+        raise AssertionError("unexpected script")
+
+    page.evaluate = AsyncMock(side_effect=evaluate)
+    return page
+
+
+def _processor(page, mock_logger, mock_ui_config, mock_chat_processor, **kwargs):
+    return IndexedDBMessageProcessor(
+        page=page,
+        log=mock_logger,
+        UIConfig=mock_ui_config,
+        chat_processor=mock_chat_processor,
+        storage_obj=kwargs.pop("storage_obj", None),
+        filter_obj=None,
+        **kwargs
+    )
+
+
+# ============================================================================
+# TESTS
+# ============================================================================
+
+@pytest.mark.asyncio
+async def test_reads_messages_without_clicking(mock_logger, mock_ui_config, mock_chat_processor):
+    """Test messages come from bounded newest-first IndexedDB steps, oldest first, and the chat is never clicked."""
+    page = _page()
+    processor = _processor(page, mock_logger, mock_ui_config, mock_chat_processor, batch_size=2)
+
+    msgs = await processor.Fetcher(whatsapp_chat(chat_name="alice", chat_ui=None), retry=1)
+
+    mock_chat_processor._click_chat.assert_not_called()
+    mock_ui_config.messages.assert_not_called()
+    assert [m.data_id for m in msgs] == ["false_111@c.us_A", "true_111@c.us_C", "false_111@c.us_B"]
+    assert [m.direction for m in msgs] == ["in", "out", "in"]
+    assert [m.data_type for m in msgs] == ["text", "quoted", "sticker"]
+    assert msgs[0].message_ui == "locator::false_111@c.us_A"
+
+    recent_calls = [c[0][1] for c in page.evaluate.call_args_list if c[0][0] is _IDB_RECENT_JS]
+    assert [c["before"] for c in recent_calls] == [None, [18, "false_222@g.us_X"], [10, "false_111@c.us_A"]]
+    assert all(c["jid"] == "111@c.us" and c["limit"] == 2 and c["stopAt"] is None for c in recent_calls)
+
+
+@pytest.mark.asyncio
+async def test_stops_at_watermark(mock_logger, mock_ui_config, mock_chat_processor):
+    """Test the newest-first walk ends at the watermark row, older records are never read."""
+    page = _page()
+    processor = _processor(page, mock_logger, mock_ui_config, mock_chat_processor, batch_size=1)
+
+    rows = await processor._read_indexeddb(whatsapp_chat(chat_name="Alice", chat_ui=None), ("true_111@c.us_C", 3))
+
+    assert [r["data_id"] for r in rows] == ["false_111@c.us_B"]
+    recent_calls = [c for c in page.evaluate.call_args_list if c[0][0] is _IDB_RECENT_JS]
+    assert len(recent_calls) == 3  # B, X, then C stops the walk before A
+
+
+@pytest.mark.asyncio
+async def test_incremental_watermark(mock_logger, mock_ui_config, mock_chat_processor):
+    """Test only messages after the stored watermark are returned and the newest is stored with position -1."""
+    storage = AsyncMock(spec=StorageInterface)
+    storage.get_watermark.return_value = ("false_111@c.us_A", 7)
+    storage.filter_new.side_effect = lambda ids: set(ids)
+    processor = _processor(_page(), mock_logger, mock_ui_config, mock_chat_processor,
+                           storage_obj=storage, incremental=True)
+    chat = whatsapp_chat(chat_name="Alice", chat_ui=None)
+
+    msgs = await processor.Fetcher(chat, retry=1)
+
+    assert [m.data_id for m in msgs] == ["true_111@c.us_C", "false_111@c.us_B"]
+    storage.set_watermark.assert_awaited_once_with(chat.chat_id, "false_111@c.us_B", -1)
+
+
+@pytest.mark.asyncio
+async def test_chat_resolution_and_max_messages(mock_logger, mock_ui_config, mock_chat_processor):
+    """Test saved names win over push names and reading ends once the newest max_messages are read."""
+    page = _page()
+    processor = _processor(page, mock_logger, mock_ui_config, mock_chat_processor, max_messages=1, batch_size=1)
+
+    assert await processor._resolve_chat(whatsapp_chat(chat_name="Alice", chat_ui=None)) == "111@c.us"
+    assert await processor._resolve_chat(whatsapp_chat(chat_name="+222", chat_ui=None)) == "222@g.us"
+
+    msgs = await processor._get_wrapped_Messages(whatsapp_chat(chat_name="Alice", chat_ui=None), retry=1)
+    assert [m.data_id for m in msgs] == ["false_111@c.us_B"]
+    assert len([c for c in page.evaluate.call_args_list if c[0][0] is _IDB_RECENT_JS]) == 1
+
+    # A watermark IndexedDB does not hold does not bound the walk, max_messages does
+    rows = await processor._read_indexeddb(whatsapp_chat(chat_name="Alice", chat_ui=None), ("gone", 0))
+    assert [r["data_id"] for r in rows] == ["false_111@c.us_B"]
+
+
+@pytest.mark.asyncio
+async def test_key_ranges_without_time_index(mock_logger, mock_ui_config, mock_chat_processor):
+    """Test every record of the chat is read in key-range batches when the store has no time index."""
+    page = _page(time_index=False)
+    processor = _processor(page, mock_logger, mock_ui_config, mock_chat_processor, batch_size=2)
+
+    rows = await processor._read_indexeddb(whatsapp_chat(chat_name="Alice", chat_ui=None), ("false_111@c.us_A", 0))
+
+    assert [r["data_id"] for r in rows] == ["true_111@c.us_C", "false_111@c.us_B"]
+    message_calls = [c[0][1] for c in page.evaluate.call_args_list if c[0][0] is _IDB_MESSAGES_JS]
+    assert [c["after"] for c in message_calls] == [None, [0, "false_111@c.us_B"]]
+    assert not any(c[0][0] is _IDB_RECENT_JS for c in page.evaluate.call_args_list)
+
+
+@pytest.mark.asyncio
+async def test_unrecognised_schema_falls_back_to_dom(mock_logger, mock_ui_config, mock_chat_processor):
+    """Test the DOM extraction is used (chat clicked) when the IndexedDB probe fails."""
+    page = _page(probe_ok=False)
+    processor = _processor(page, mock_logger, mock_ui_config, mock_chat_processor, bulk_extraction=True)
+    mock_ui_config.extract_messages_bulk = AsyncMock(return_value=[
+        {"data_id": "false_111@c.us_A", "text": "hi", "direction": "in", "data_type": "text"},
+    ])
+
+    for _ in range(2):
+        msgs = await processor._get_wrapped_Messages(whatsapp_chat(chat_name="Alice", chat_ui=None), retry=1)
+        assert [m.data_id for m in msgs] == ["false_111@c.us_A"]
+
+    assert mock_chat_processor._click_chat.await_count == 2
+    assert page.evaluate.await_count == 1  # probe result is cached
+    mock_logger.warning.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_unknown_chat_falls_back_to_dom(mock_logger, mock_ui_config, mock_chat_processor):
+    """Test a chat missing from IndexedDB is scraped from the DOM."""
+    processor = _processor(_page(), mock_logger, mock_ui_config, mock_chat_processor, bulk_extraction=True)
+    mock_ui_config.extract_messages_bulk = AsyncMock(return_value=[
+        {"data_id": "id-1", "text": "hello", "direction": "out"},
+    ])
+
+    msgs = await processor._get_wrapped_Messages(whatsapp_chat(chat_name="Bob", chat_ui=None), retry=1)
+
+    assert [m.data_id for m in msgs] == ["id-1"]
+    mock_chat_processor._click_chat.assert_awaited_once()
+
+
+def test_rejects_bad_batch_size(mock_logger, mock_ui_config, mock_chat_processor):
+    with pytest.raises(ValueError, match="batch_size"):
+        _processor(_page(), mock_logger, mock_ui_config, mock_chat_processor, batch_size=0)
@@ -3,17 +3,18 @@ Unit tests for MessageProcessor class.
 Tests cover sorting, fetching, storage interaction, and filtering of messages.
 """
 
+import asyncio
 import logging
 from unittest.mock import Mock, AsyncMock
 
 import pytest
 from playwright.async_api import Page, Locator, ElementHandle
 
-from src.Exceptions import MessageNotFoundError, MessageListEmptyError, MessageProcessorError, WhatsAppError
+from src.Exceptions import MessageNotFoundError, MessageListEmptyError, MessageProcessorError, StorageError, WhatsAppError
 from src.FIlter.message_filter import MessageFilter
 from src.Interfaces.storage_interface import StorageInterface
 from src.WhatsApp.DerivedTypes.Chat import whatsapp_chat
-from src.WhatsApp.DerivedTypes.Message import whatsapp_message
+from src.WhatsApp.DerivedTypes.Message import MessageType, whatsapp_message
 from src.WhatsApp.chat_processor import ChatProcessor
 from src.WhatsApp.message_processor import MessageProcessor
 from src.WhatsApp.web_ui_config import WebSelectorConfig
@@ -49,6 +50,7 @@ def mock_chat_processor():
 def mock_storage():
     storage = AsyncMock(spec=StorageInterface)
     storage.check_message_if_exists.return_value = False
+    storage.filter_new.side_effect = lambda ids: set(ids)
     return storage
 
 
@@ -152,6 +154,7 @@ async def test_get_wrapped_messages_success(message_processor_instance, mock_ui_
     
     mock_ui_config.isReacted = AsyncMock(return_value=False)
     mock_ui_config.pic_handle = AsyncMock(return_value=False)
+    mock_ui_config.classify_messages = AsyncMock(return_value={"msg-123": MessageType.QUOTED})
 
     # Execution
     msgs = await message_processor_instance._get_wrapped_Messages(chat=mock_chat, retry=1)
@@ -161,6 +164,8 @@ async def test_get_wrapped_messages_success(message_processor_instance, mock_ui_
     assert msgs[0].raw_data == "Hello"
     assert msgs[0].data_id == "msg-123"
     assert msgs[0].direction == "in"
+    assert msgs[0].data_type == "quoted"
+    mock_ui_config.classify_messages.assert_awaited_once_with(["msg-123"])
 
 @pytest.mark.asyncio
 async def test_get_wrapped_messages_exception(message_processor_instance, mock_ui_config):
@@ -195,19 +200,75 @@ async def test_fetcher_with_storage_deduplication(
     processor._get_wrapped_Messages = AsyncMock(return_value=[msg1, msg2])
     
     # Mock storage existence check: msg-1 exists, msg-2 is new
-    mock_storage.check_message_if_exists.side_effect = lambda mid: mid == "msg-1"
+    mock_storage.filter_new.side_effect = lambda ids: {mid for mid in ids if mid != "msg-1"}
     
     # Execution
     await processor.Fetcher(chat=Mock(), retry=1)
     
     # Verification
-    # Should only enqueue msg-2
+    # One bulk lookup, and should only enqueue msg-2
+    mock_storage.filter_new.assert_awaited_once_with(["msg-1", "msg-2"])
+    mock_storage.check_message_if_exists.assert_not_called()
     mock_storage.enqueue_insert.assert_called_once()
     args, _ = mock_storage.enqueue_insert.call_args
     assert len(args[0]) == 1
     assert args[0][0].message_id == "msg-2"
 
 
+class _ListStorage(StorageInterface):
+    """Third-party style backend implementing only the required methods."""
+
+    def __init__(self):
+        super().__init__(queue=asyncio.Queue(), log=Mock(spec=logging.Logger))
+        self.stored = []
+
+    async def init_db(self, **kwargs): ...
+
+    async def create_table(self, **kwargs): ...
+
+    async def start_writer(self, **kwargs): ...
+
+    async def enqueue_insert(self, msgs, **kwargs):
+        await self._insert_batch_internally(msgs)
+
+    async def _insert_batch_internally(self, msgs, **kwargs):
+        self.stored.extend(msg.message_id for msg in msgs)
+
+    def check_message_if_exists(self, msg_id, **kwargs):
+        return msg_id in self.stored
+
+    def get_all_messages(self, **kwargs):
+        return [{"message_id": msg_id} for msg_id in self.stored]
+
+    async def close_db(self, **kwargs): ...
+
+
+@pytest.mark.asyncio
+async def test_fetcher_with_minimal_backend(mock_page, mock_logger, mock_ui_config, mock_chat_processor):
+    """Test a backend without filter_new / watermarks dedupes through check_message_if_exists and fetches fully."""
+    storage = _ListStorage()
+    storage.stored.append("msg-1")
+    processor = MessageProcessor(
+        page=mock_page,
+        log=mock_logger,
+        UIConfig=mock_ui_config,
+        chat_processor=mock_chat_processor,
+        storage_obj=storage,
+        filter_obj=None,
+        incremental=True
+    )
+    msg1, msg2 = Mock(spec=whatsapp_message), Mock(spec=whatsapp_message)
+    msg1.message_id, msg2.message_id = "msg-1", "msg-2"
+    processor._get_wrapped_Messages = AsyncMock(return_value=[msg1, msg2])
+
+    assert await storage.filter_new(["msg-1", "msg-2"]) == {"msg-2"}
+    await processor.Fetcher(chat=Mock(), retry=1)
+
+    assert storage.stored == ["msg-1", "msg-2"]
+    assert processor._get_wrapped_Messages.await_args.kwargs["watermark"] is None
+    assert await storage.get_backfill_checkpoint("chat") is None
+
+
 @pytest.mark.asyncio
 async def test_fetcher_with_filter(
     mock_page, mock_logger, mock_ui_config, mock_chat_processor, mock_filter
@@ -298,4 +359,310 @@ async def test_get_wrapped_messages_no_data_id(message_processor_instance, mock_
     # Should be empty list
     assert msgs == []
     # Log should indicate skipping
-    mock_logger.debug.assert_any_call("Data ID in WA / get wrapped Messages , None/Empty. Skipping")
\ No newline at end of file
+    mock_logger.debug.assert_any_call("Data ID in WA / get wrapped Messages , None/Empty. Skipping")
+
+@pytest.mark.asyncio
+async def test_get_wrapped_messages_bulk(mock_page, mock_logger, mock_ui_config, mock_chat_processor):
+    """Test bulk mode wraps rows from a single extraction call."""
+    processor = MessageProcessor(
+        page=mock_page,
+        log=mock_logger,
+        UIConfig=mock_ui_config,
+        chat_processor=mock_chat_processor,
+        storage_obj=None,
+        filter_obj=None,
+        bulk_extraction=True
+    )
+    mock_ui_config.extract_messages_bulk = AsyncMock(return_value=[
+        {"data_id": "id-1", "text": "Hello", "direction": "in", "data_type": "text"},
+        {"data_id": "", "text": "no id", "direction": "out"},
+        {"data_id": "id-2", "text": "", "direction": "out", "data_type": "sticker"},
+    ])
+    mock_ui_config.message_by_dataID = Mock(side_effect=lambda d: f"locator::{d}")
+
+    msgs = await processor._get_wrapped_Messages(chat=whatsapp_chat(chat_name="Chat A", chat_ui=None), retry=1)
+
+    mock_ui_config.extract_messages_bulk.assert_awaited_once()
+    mock_ui_config.messages.assert_not_called()
+    assert [m.data_id for m in msgs] == ["id-1", "id-2"]
+    assert [m.direction for m in msgs] == ["in", "out"]
+    assert msgs[0].raw_data == "Hello"
+    assert msgs[0].message_ui == "locator::id-1"
+    assert [m.data_type for m in msgs] == ["text", "sticker"]
+
+
+@pytest.mark.asyncio
+async def test_get_wrapped_messages_bulk_empty(mock_page, mock_logger, mock_ui_config, mock_chat_processor):
+    """Test bulk mode retries and raises when nothing is rendered."""
+    processor = MessageProcessor(
+        page=mock_page,
+        log=mock_logger,
+        UIConfig=mock_ui_config,
+        chat_processor=mock_chat_processor,
+        storage_obj=None,
+        filter_obj=None,
+        bulk_extraction=True
+    )
+    mock_ui_config.extract_messages_bulk = AsyncMock(return_value=[])
+
+    with pytest.raises(MessageProcessorError, match="failed to wrap messages"):
+        await processor._get_wrapped_Messages(chat=Mock(spec=whatsapp_chat), retry=2)
+    assert mock_ui_config.extract_messages_bulk.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_fetcher_incremental_watermark(
+    mock_page, mock_logger, mock_ui_config, mock_chat_processor, mock_storage
+):
+    """Test incremental Fetcher only wraps rows after the watermark and advances it."""
+    processor = MessageProcessor(
+        page=mock_page,
+        log=mock_logger,
+        UIConfig=mock_ui_config,
+        chat_processor=mock_chat_processor,
+        storage_obj=mock_storage,
+        filter_obj=None,
+        incremental=True
+    )
+    chat = whatsapp_chat(chat_name="Chat A", chat_ui=None)
+    mock_storage.get_watermark.return_value = ("id-1", 4)
+    mock_ui_config.extract_messages_bulk = AsyncMock(return_value=[
+        {"data_id": "id-1", "index": 4, "text": "old", "direction": "in"},
+        {"data_id": "id-2", "index": 5, "text": "new", "direction": "in"},
+    ])
+    mock_ui_config.message_by_dataID = Mock()
+
+    result = await processor.Fetcher(chat=chat, retry=1)
+
+    assert processor.bulk_extraction is True
+    mock_ui_config.extract_messages_bulk.assert_awaited_once_with(stop_at="id-1", hint=4)
+    assert [m.data_id for m in result] == ["id-2"]
+    assert mock_storage.enqueue_insert.await_args.kwargs["wait"] is True
+    mock_storage.set_watermark.assert_awaited_once_with(chat.chat_id, "id-2", 5)
+
+
+@pytest.mark.asyncio
+async def test_fetcher_keeps_watermark_when_batch_fails(
+    mock_page, mock_logger, mock_ui_config, mock_chat_processor, mock_storage
+):
+    """Test the watermark is not advanced past rows whose batch did not commit."""
+    processor = MessageProcessor(
+        page=mock_page,
+        log=mock_logger,
+        UIConfig=mock_ui_config,
+        chat_processor=mock_chat_processor,
+        storage_obj=mock_storage,
+        filter_obj=None,
+        incremental=True
+    )
+    chat = whatsapp_chat(chat_name="Chat A", chat_ui=None)
+    mock_storage.get_watermark.return_value = None
+    mock_storage.enqueue_insert.side_effect = StorageError("Batch insert failed")
+    mock_ui_config.extract_messages_bulk = AsyncMock(return_value=[
+        {"data_id": "id-1", "index": 0, "text": "new", "direction": "in"},
+    ])
+    mock_ui_config.message_by_dataID = Mock()
+
+    result = await processor.Fetcher(chat=chat, retry=1)
+
+    assert [m.data_id for m in result] == ["id-1"]
+    mock_storage.set_watermark.assert_not_called()
+    assert chat.chat_id not in processor._pending_watermarks
+
+
+@pytest.mark.asyncio
+async def test_fetcher_incremental_nothing_new(
+    mock_page, mock_logger, mock_ui_config, mock_chat_processor, mock_storage
+):
+    """Test incremental Fetcher returns nothing when only the watermark row is rendered."""
+    processor = MessageProcessor(
+        page=mock_page,
+        log=mock_logger,
+        UIConfig=mock_ui_config,
+        chat_processor=mock_chat_processor,
+        storage_obj=mock_storage,
+        filter_obj=None,
+        incremental=True
+    )
+    chat = whatsapp_chat(chat_name="Chat A", chat_ui=None)
+    mock_storage.get_watermark.return_value = ("id-1", 4)
+    mock_ui_config.extract_messages_bulk = AsyncMock(return_value=[
+        {"data_id": "id-1", "index": 2, "text": "old", "direction": "in"},
+    ])
+
+    result = await processor.Fetcher(chat=chat, retry=1)
+
+    assert result == []
+    mock_storage.enqueue_insert.assert_not_called()
+    mock_storage.set_watermark.assert_awaited_once_with(chat.chat_id, "id-1", 2)
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_pushed_rows(
+    mock_page, mock_logger, mock_ui_config, mock_chat_processor, mock_storage
+):
+    """Test stream yields messages pushed through the page binding and stores them."""
+    processor = MessageProcessor(
+        page=mock_page,
+        log=mock_logger,
+        UIConfig=mock_ui_config,
+        chat_processor=mock_chat_processor,
+        storage_obj=mock_storage,
+        filter_obj=None
+    )
+    mock_ui_config.attach_message_observer = AsyncMock(return_value=True)
+    mock_ui_config.detach_message_observer = AsyncMock()
+    mock_ui_config.message_by_dataID = Mock()
+    chat = whatsapp_chat(chat_name="Chat A", chat_ui=None)
+
+    stream = processor.stream(chat, heartbeat=0.01)
+    first = asyncio.ensure_future(stream.__anext__())
+    while not mock_ui_config.attach_message_observer.await_count:
+        await asyncio.sleep(0)
+
+    binding, callback = mock_page.expose_binding.call_args[0]
+    mock_ui_config.attach_message_observer.assert_awaited_with(binding, "Chat A")
+    callback(None, [{"data_id": "id-1", "text": "hi", "direction": "in"}, {"data_id": ""}])
+
+    msg = await asyncio.wait_for(first, timeout=1)
+    assert msg.data_id == "id-1"
+    assert msg.parent_chat is chat
+    mock_storage.enqueue_insert.assert_awaited_once()
+
+    await stream.aclose()
+    mock_ui_config.detach_message_observer.assert_awaited_once()
+    assert processor._stream_queue is None
+
+
+@pytest.mark.asyncio
+async def test_stream_skips_stored_rows_and_pauses_on_chat_switch(
+    mock_page, mock_logger, mock_ui_config, mock_chat_processor, mock_storage
+):
+    """Test rows storage already holds are neither stored nor yielded, and a lost panel is reported."""
+    processor = MessageProcessor(
+        page=mock_page,
+        log=mock_logger,
+        UIConfig=mock_ui_config,
+        chat_processor=mock_chat_processor,
+        storage_obj=mock_storage,
+        filter_obj=None
+    )
+    attaches = iter([True])
+    mock_ui_config.attach_message_observer = AsyncMock(side_effect=lambda *args: next(attaches, False))
+    mock_ui_config.detach_message_observer = AsyncMock()
+    mock_ui_config.message_by_dataID = Mock()
+    mock_storage.filter_new.side_effect = lambda ids: set(ids[1:])  # id-1 is stored already
+
+    stream = processor.stream(whatsapp_chat(chat_name="Chat A", chat_ui=None), heartbeat=0.01)
+    first = asyncio.ensure_future(stream.__anext__())
+    while not mock_page.expose_binding.call_args:
+        await asyncio.sleep(0)
+    while mock_ui_config.attach_message_observer.await_count < 3:
+        await asyncio.sleep(0.01)
+    mock_logger.warning.assert_called_once()
+
+    _, callback = mock_page.expose_binding.call_args[0]
+    callback(None, [{"data_id": "id-1", "text": "old"}, {"data_id": "id-2", "text": "new"}])
+
+    msg = await asyncio.wait_for(first, timeout=1)
+    assert msg.data_id == "id-2"
+    stored = mock_storage.enqueue_insert.await_args[0][0]
+    assert [m.data_id for m in stored] == ["id-2"]
+    await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_stream_click_failure(mock_page, mock_logger, mock_ui_config, mock_chat_processor):
+    """Test stream refuses to start when the chat cannot be opened."""
+    mock_chat_processor._click_chat.return_value = False
+    processor = MessageProcessor(
+        page=mock_page,
+        log=mock_logger,
+        UIConfig=mock_ui_config,
+        chat_processor=mock_chat_processor,
+        storage_obj=None,
+        filter_obj=None
+    )
+
+    with pytest.raises(MessageProcessorError, match="Chat click failed"):
+        await processor.stream(whatsapp_chat(chat_name="Chat A", chat_ui=None)).__anext__()
+
+
+class _VirtualPanel:
+    """Fake message panel: `window` rendered rows of 100px, upward scrolls capped like the real one."""
+
+    def __init__(self, total=30, window=10):
+        self.ids = [f"id-{i:03d}" for i in range(total)]
+        self.window = window
+        self.pos = total - window
+        self.scrolls = []
+
+    async def extract_messages_bulk(self, stop_at=None, hint=None):
+        return [
+            {"data_id": d, "index": i, "text": d, "direction": "in", "data_type": "text"}
+            for i, d in enumerate(self.ids[self.pos:self.pos + self.window])
+        ]
+
+    async def scroll_messages(self, delta=0):
+        if delta:
+            self.scrolls.append(delta)
+            self.pos = max(0, self.pos + max(delta // 100, -(self.window - 1)))
+        return {"top": self.pos * 100, "height": len(self.ids) * 100, "first_id": self.ids[self.pos],
+                "count": self.window}
+
+    def message_by_dataID(self, data_id):
+        return f"locator::{data_id}"
+
+
+@pytest.mark.asyncio
+async def test_backfill_resumes_from_checkpoint(tmp_path, mock_page, mock_logger, mock_chat_processor):
+    """Test backfill stores older windows, stops at the limit and a second run resumes to the history start."""
+    from src.StorageDB.sqlite_db import SQLITE_DB
+
+    storage = SQLITE_DB(queue=asyncio.Queue(), log=mock_logger, db_path=str(tmp_path / "messages.db"),
+                        flush_interval=0.01)
+    await storage.init_db()
+    await storage.create_table()
+    await storage.start_writer()  # rows go through the writer queue like every other insert
+    chat = whatsapp_chat(chat_name="Chat A", chat_ui=None)
+    try:
+        def processor(panel):
+            return MessageProcessor(page=mock_page, log=mock_logger, UIConfig=panel,
+                                    chat_processor=mock_chat_processor, storage_obj=storage, filter_obj=None)
+
+        first = await processor(_VirtualPanel()).backfill(chat, limit=12, settle_timeout=0.1, idle_rounds=1)
+        assert (first["stored"], first["reason"], first["complete"]) == (12, "limit", False)
+        checkpoint = await storage.get_backfill_checkpoint(chat.chat_id)
+        assert checkpoint["collected"] == 12 and not checkpoint["complete"]
+
+        panel = _VirtualPanel()
+        second = await processor(panel).backfill(chat, min_step=100, max_step=400, settle_timeout=0.1, idle_rounds=1)
+        assert (second["stored"], second["collected"], second["complete"]) == (18, 30, True)
+        assert second["oldest_data_id"] == "id-000"
+        assert panel.scrolls[0] == -400  # seeks back to the checkpoint at full step
+        stored = await storage.get_all_messages_async(limit=100)
+        assert sorted(row["message_id"] for row in stored) == [f"wa-msg::id-{i:03d}" for i in range(30)]
+        assert {row["data_type"] for row in stored} == {"text"}
+
+        third = await processor(_VirtualPanel()).backfill(chat)
+        assert third["reason"] == "already_complete"
+        assert mock_chat_processor._click_chat.await_count == 2
+    finally:
+        await storage.close_db()
+
+
+@pytest.mark.asyncio
+async def test_backfill_stops_at_until(mock_page, mock_logger, mock_storage, mock_chat_processor):
+    """Test backfill stops at the `until` data-id without storing it or anything older."""
+    mock_storage.get_backfill_checkpoint.return_value = None
+    processor = MessageProcessor(page=mock_page, log=mock_logger, UIConfig=_VirtualPanel(),
+                                 chat_processor=mock_chat_processor, storage_obj=mock_storage, filter_obj=None)
+
+    report = await processor.backfill(whatsapp_chat(chat_name="Chat A", chat_ui=None), until="id-015")
+
+    assert (report["reason"], report["stored"]) == ("until", 14)
+    calls = mock_storage.enqueue_insert.await_args_list
+    assert all(call.kwargs["wait"] for call in calls)  # committed before the checkpoint moves
+    inserted = [m.data_id for call in calls for m in call[0][0]]
+    assert sorted(inserted) == [f"id-{i:03d}" for i in range(16, 30)]
+    mock_storage.set_backfill_checkpoint.assert_awaited_with("wa::chat a", "id-016", 14, complete=False)
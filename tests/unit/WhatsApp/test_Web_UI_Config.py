@@ -9,6 +9,7 @@ from unittest.mock import Mock, AsyncMock
 import pytest
 from playwright.async_api import Page, Locator, ElementHandle
 
+from src.WhatsApp.DerivedTypes.Message import MessageType
 from src.WhatsApp.web_ui_config import WebSelectorConfig
 
 
@@ -107,3 +108,53 @@ async def test_is_message_out_locator(config_instance):
 
     result = await WebSelectorConfig.is_message_out(mock_msg)
     assert result is True
+
+
+@pytest.mark.asyncio
+async def test_extract_messages_bulk(mock_page):
+    """Test extract_messages_bulk runs one evaluate_all over the message locator."""
+    config = WebSelectorConfig(page=mock_page, log=Mock(spec=logging.Logger))
+    mock_locator = AsyncMock(spec=Locator)
+    mock_locator.evaluate_all.return_value = [{"data_id": "id-1", "text": "hi", "direction": "in"}]
+    mock_page.locator = Mock(return_value=mock_locator)
+
+    rows = await config.extract_messages_bulk()
+
+    assert rows == [{"data_id": "id-1", "text": "hi", "direction": "in"}]
+    mock_locator.evaluate_all.assert_awaited_once()
+    assert mock_locator.evaluate_all.call_args[0][1] == [None, None]
+    mock_page.locator.assert_called_with('[role="row"] div[data-id]')
+
+
+@pytest.mark.asyncio
+async def test_extract_and_scroll_chat_rows(mock_page):
+    """Test chat rows are extracted by one evaluate_all and scrolling runs on the chat list grid."""
+    config = WebSelectorConfig(page=mock_page, log=Mock(spec=logging.Logger))
+    mock_grid = AsyncMock(spec=Locator)
+    mock_rows = AsyncMock(spec=Locator)
+    mock_grid.get_by_role = Mock(return_value=mock_rows)
+    mock_rows.evaluate_all.return_value = [{"index": 1, "name": "Alice", "unread": 2}]
+    mock_grid.evaluate.return_value = {"top": 0, "height": 900, "at_end": False, "total": 40}
+    config.chat_list = Mock(return_value=mock_grid)
+
+    assert await config.extract_chat_rows() == [{"index": 1, "name": "Alice", "unread": 2}]
+    mock_grid.get_by_role.assert_called_with("row")
+    mock_rows.evaluate_all.assert_awaited_once()
+
+    assert (await config.scroll_chat_list(0.8))["total"] == 40
+    assert mock_grid.evaluate.call_args[0][1] == [0.8, False]
+
+
+@pytest.mark.asyncio
+async def test_classify_messages(mock_page):
+    """Test classify_messages types all wanted rows in one evaluate_all call."""
+    config = WebSelectorConfig(page=mock_page, log=Mock(spec=logging.Logger))
+    mock_locator = AsyncMock(spec=Locator)
+    mock_locator.evaluate_all.return_value = {"id-1": "gif", "id-2": "text", "id-3": "hologram"}
+    mock_page.locator = Mock(return_value=mock_locator)
+
+    types = await config.classify_messages(["id-1", "id-2", "id-3"])
+
+    assert types == {"id-1": MessageType.GIF, "id-2": MessageType.TEXT, "id-3": MessageType.UNKNOWN}
+    mock_locator.evaluate_all.assert_awaited_once()
+    assert mock_locator.evaluate_all.call_args[0][1] == ["id-1", "id-2", "id-3"]